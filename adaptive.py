@@ -0,0 +1,139 @@
+"""Adaptive assessment: interleaved question order and early stopping.
+
+Questions are asked round-robin across styles. After every answer the
+running per-style weighted totals bound each style's final score: every
+remaining question adds between weight * MIN_SCORE and weight * MAX_SCORE
+(whether or not it is reverse-keyed). Bounds are compared on the engine's
+normalized scale, the one primary styles are picked on. As soon as the
+leader's lowest possible score beats every other style's highest possible
+score, more answers cannot change the outcome and the assessment stops.
+
+Optionally it also stops earlier once the leader is ahead with a given
+confidence. Each style's remaining keyed answers (reverse-keyed ones
+flipped) are modelled as independent draws around its observed mean. The spread of the projected total counts
+both the draws and the uncertainty of the mean itself. Every pairwise lead
+must be at least z standard deviations, with the error budget split
+across the comparisons (Bonferroni).
+"""
+import math
+from collections import namedtuple
+from statistics import NormalDist
+
+from answer_codec import MAX_SCORE, MIN_SCORE, UNANSWERED
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MIN_ANSWERS_PER_STYLE = 2  # Answers needed from every style before the confidence rule applies
+PRIOR_VARIANCE = 2.0  # Variance of a uniform 1-5 answer, used until a style has two answers
+MIN_VARIANCE = 0.5  # Floor, so a few identical answers don't look like certainty
+
+Decision = namedtuple('Decision', ['decided', 'leader', 'reason'])
+UNDECIDED = Decision(False, None, None)
+
+
+class AdaptivePlan:
+    """Question order and stopping rule for one catalog. Built once per catalog snapshot."""
+
+    def __init__(self, engine):
+        self.style_names = engine.style_names
+        self.question_styles = engine.question_styles
+        self.question_weights = engine.question_weights
+        self.question_reversed = engine.question_reversed
+        self.score_floors = engine.score_floors
+        self.percent_factors = engine.percent_factors
+        positions_by_style = [[] for _ in self.style_names]
+        for position, style_index in enumerate(self.question_styles):
+            if style_index >= 0:
+                positions_by_style[style_index].append(position)
+        self.question_counts = tuple(len(positions) for positions in positions_by_style)
+        # Round-robin: first question of every style, then the second of every style, ...
+        self.order = tuple(
+            positions[k]
+            for k in range(max(self.question_counts, default=0))
+            for positions in positions_by_style if k < len(positions)
+        )
+
+    def __len__(self):
+        return len(self.order)
+
+    def _tally(self, answers):
+        """Per style: weighted total, sum and sum of squares of keyed answers, answered count, and the
+        sum and sum of squares of the weights still unanswered."""
+        style_count = len(self.style_names)
+        totals = [0] * style_count
+        sums = [0] * style_count
+        squares = [0] * style_count
+        answered = [0] * style_count
+        remaining_weight = [0] * style_count
+        remaining_weight_squares = [0] * style_count
+        for style_index, score, weight, reverse in zip(self.question_styles, answers, self.question_weights,
+                                                       self.question_reversed):
+            if style_index < 0:
+                continue
+            if score == UNANSWERED:
+                remaining_weight[style_index] += weight
+                remaining_weight_squares[style_index] += weight * weight
+                continue
+            keyed = MIN_SCORE + MAX_SCORE - score if reverse else score
+            totals[style_index] += weight * keyed
+            sums[style_index] += keyed
+            squares[style_index] += keyed * keyed
+            answered[style_index] += 1
+        return totals, sums, squares, answered, remaining_weight, remaining_weight_squares
+
+    def _normalize(self, values):
+        return [(value - floor) * factor for value, floor, factor in zip(values, self.score_floors, self.percent_factors)]
+
+    def decision(self, answers, confidence=DEFAULT_CONFIDENCE, min_answers_per_style=DEFAULT_MIN_ANSWERS_PER_STYLE):
+        """Returns a Decision: whether to stop, the leading style and 'certain' or 'confident'.
+
+        A confidence of 1 or more disables the statistical rule, so only a certain outcome stops.
+        """
+        if len(self.style_names) < 2:
+            return UNDECIDED
+        totals, sums, squares, answered, remaining_weight, remaining_weight_squares = self._tally(answers)
+
+        lowest = self._normalize([total + left * MIN_SCORE for total, left in zip(totals, remaining_weight)])
+        highest = self._normalize([total + left * MAX_SCORE for total, left in zip(totals, remaining_weight)])
+        leader = max(range(len(lowest)), key=lowest.__getitem__)
+        if all(lowest[leader] > highest[j] for j in range(len(highest)) if j != leader):
+            return Decision(True, self.style_names[leader], 'certain')
+
+        if confidence >= 1 or min(answered) < min_answers_per_style:
+            return UNDECIDED
+        z = NormalDist().inv_cdf(1 - (1 - confidence) / (len(self.style_names) - 1))
+        means = [total / n for total, n in zip(sums, answered)]
+        variances = [
+            max(MIN_VARIANCE, (square - n * mean * mean) / (n - 1)) if n > 1 else PRIOR_VARIANCE
+            for square, n, mean in zip(squares, answered, means)
+        ]
+        projected = self._normalize([total + left * mean for total, left, mean in zip(totals, remaining_weight, means)])
+        # Variance of each projected total: the remaining (weighted) draws plus the error of the estimated mean
+        spreads = [(left_squares * variance + left * left * variance / n) * factor * factor
+                   for left, left_squares, variance, n, factor
+                   in zip(remaining_weight, remaining_weight_squares, variances, answered, self.percent_factors)]
+        leader = max(range(len(projected)), key=projected.__getitem__)
+        for j in range(len(projected)):
+            if j == leader:
+                continue
+            lead = projected[leader] - projected[j]
+            spread = math.sqrt(spreads[leader] + spreads[j])
+            if lead <= 0 or lead < z * spread:
+                return UNDECIDED
+        return Decision(True, self.style_names[leader], 'confident')
+
+    def complete(self, answers):
+        """Fills unanswered questions with the rounded mean of the style's given (keyed) answers.
+
+        Scoring the completed vector puts an early-stopped assessment on the same scale
+        (totals and percentages) as a full one. Reverse-keyed questions get the mirrored answer.
+        """
+        _, sums, _, answered, _, _ = self._tally(answers)
+        fill = [
+            min(MAX_SCORE, max(MIN_SCORE, round(total / n))) if n else (MIN_SCORE + MAX_SCORE) // 2
+            for total, n in zip(sums, answered)
+        ]
+        return [
+            (MIN_SCORE + MAX_SCORE - fill[style_index] if reverse else fill[style_index])
+            if score == UNANSWERED and style_index >= 0 else score
+            for style_index, score, reverse in zip(self.question_styles, answers, self.question_reversed)
+        ]
@@ -0,0 +1,213 @@
+"""Item analysis over completed assessments: which questions actually measure their style.
+
+For one catalog version, ItemStatistics tracks per-question means and
+variances, each question's covariance with its style total, and the
+covariance matrix of the style totals. Those are enough to report:
+
+* item mean and variance,
+* corrected item-total correlation (the item against the rest of its
+  style's items; low or negative values flag items that do not discriminate),
+* Cronbach's alpha per style,
+* the correlation matrix between style totals.
+
+add() folds in one response with a multivariate Welford update, so the
+statistics follow new results without rescanning history. from_matrix()
+recomputes them from a full response matrix in two column-wise passes.
+State is O(questions + styles^2), whatever the number of responses.
+Only complete responses (every question answered) are used. Adaptive runs
+that stopped early are counted as skipped. Reverse-keyed questions are
+flipped before anything is computed. Style totals are unweighted sums of
+the keyed answers, as the usual definition of alpha expects.
+
+ResponseAnalytics keeps one ItemStatistics per catalog version and feeds
+it from the results warehouse, reading only rows it has not seen yet.
+"""
+import math
+import threading
+from operator import mul
+
+from answer_codec import MAX_SCORE, MIN_SCORE, UNANSWERED
+
+# Corrected item-total correlations below this usually mean the item does not measure its style
+WEAK_ITEM_CORRELATION = 0.2
+
+
+def _correlation(comoment, moment_a, moment_b):
+    denominator = moment_a * moment_b
+    return comoment / math.sqrt(denominator) if denominator > 0 else None
+
+
+class ItemStatistics:
+
+    def __init__(self, question_styles, style_count, question_reversed=None):
+        """question_styles holds each question's style index (as in ScoringEngine.question_styles)."""
+        self.question_styles = tuple(question_styles)
+        self.question_reversed = tuple(question_reversed or (False,) * len(self.question_styles))
+        self.style_count = style_count
+        self.n = 0
+        self.skipped = 0
+        k = len(self.question_styles)
+        self.item_means = [0.0] * k
+        self.item_m2 = [0.0] * k  # Sum of squared deviations per item
+        self.item_total_m2 = [0.0] * k  # Co-moment of each item with its own style's total
+        self.total_means = [0.0] * style_count
+        self.total_m2 = [[0.0] * style_count for _ in range(style_count)]  # Co-moments between style totals
+
+    @classmethod
+    def for_engine(cls, engine):
+        return cls(engine.question_styles, len(engine.style_names), engine.question_reversed)
+
+    def _keyed(self, answers):
+        if not any(self.question_reversed):
+            return answers
+        return [MIN_SCORE + MAX_SCORE - score if reverse else score
+                for score, reverse in zip(answers, self.question_reversed)]
+
+    def _totals(self, answers):
+        totals = [0] * self.style_count
+        for score, style in zip(answers, self.question_styles):
+            if style >= 0:
+                totals[style] += score
+        return totals
+
+    def _is_complete(self, answers):
+        return len(answers) == len(self.question_styles) and UNANSWERED not in answers
+
+    def add(self, answers):
+        """Folds in one response. Returns False (and counts it as skipped) if it is incomplete."""
+        if not self._is_complete(answers):
+            self.skipped += 1
+            return False
+        answers = self._keyed(answers)
+        self.n += 1
+        n = self.n
+        totals = self._totals(answers)
+
+        item_deltas = [x - mean for x, mean in zip(answers, self.item_means)]
+        self.item_means = [mean + delta / n for mean, delta in zip(self.item_means, item_deltas)]
+        total_deltas = [t - mean for t, mean in zip(totals, self.total_means)]
+        self.total_means = [mean + delta / n for mean, delta in zip(self.total_means, total_deltas)]
+        # Co-moments grow by (x - old mean) * (y - new mean)
+        total_new_deltas = [t - mean for t, mean in zip(totals, self.total_means)]
+        self.item_m2 = [m2 + delta * (x - mean)
+                        for m2, delta, x, mean in zip(self.item_m2, item_deltas, answers, self.item_means)]
+        self.item_total_m2 = [c + delta * total_new_deltas[style] if style >= 0 else c
+                              for c, delta, style in zip(self.item_total_m2, item_deltas, self.question_styles)]
+        for row, delta in zip(self.total_m2, total_deltas):
+            row[:] = [c + delta * new_delta for c, new_delta in zip(row, total_new_deltas)]
+        return True
+
+    @classmethod
+    def from_matrix(cls, question_styles, style_count, responses, question_reversed=None):
+        """Computes the statistics from a full response matrix (rows of answers) in column-wise passes."""
+        stats = cls(question_styles, style_count, question_reversed)
+        rows = []
+        for answers in responses:
+            if stats._is_complete(answers):
+                rows.append(stats._keyed(answers))
+            else:
+                stats.skipped += 1
+        if not rows:
+            return stats
+        n = stats.n = len(rows)
+        item_columns = list(zip(*rows))
+        total_columns = list(zip(*(stats._totals(answers) for answers in rows)))
+
+        def centered(column):
+            mean = math.fsum(column) / n
+            return mean, [value - mean for value in column]
+
+        items = [centered(column) for column in item_columns]
+        totals = [centered(column) for column in total_columns]
+        stats.item_means = [mean for mean, _ in items]
+        stats.total_means = [mean for mean, _ in totals]
+        stats.item_m2 = [math.fsum(map(mul, deviations, deviations)) for _, deviations in items]
+        stats.item_total_m2 = [math.fsum(map(mul, deviations, totals[style][1])) if style >= 0 else 0.0
+                               for (_, deviations), style in zip(items, stats.question_styles)]
+        stats.total_m2 = [[math.fsum(map(mul, a, b)) for _, b in totals] for _, a in totals]
+        return stats
+
+    def report(self, style_names, questions=None):
+        """Returns the item, style and correlation statistics as plain dicts, ready for JSON.
+
+        Variances use n - 1; statistics that need more data (or variance) are None.
+        """
+        divisor = self.n - 1 if self.n > 1 else None
+        style_items = [[] for _ in range(self.style_count)]
+        for position, style in enumerate(self.question_styles):
+            if style >= 0:
+                style_items[style].append(position)
+
+        items = []
+        for position, style in enumerate(self.question_styles):
+            m2, item_total = self.item_m2[position], self.item_total_m2[position]
+            rest_correlation = None
+            if divisor and style >= 0 and len(style_items[style]) > 1:
+                total_m2 = self.total_m2[style][style]
+                rest_correlation = _correlation(item_total - m2, m2, total_m2 - 2 * item_total + m2)
+            items.append({
+                'id': questions[position]['id'] if questions else position + 1,
+                'style': style_names[style] if style >= 0 else None,
+                'mean': self.item_means[position] if self.n else None,
+                'variance': m2 / divisor if divisor else None,
+                'item_rest_correlation': rest_correlation
+            })
+
+        styles = {}
+        for style, name in enumerate(style_names):
+            positions = style_items[style]
+            total_m2 = self.total_m2[style][style]
+            alpha = None
+            if divisor and len(positions) > 1 and total_m2 > 0:
+                k = len(positions)
+                alpha = k / (k - 1) * (1 - math.fsum(self.item_m2[p] for p in positions) / total_m2)
+            styles[name] = {
+                'items': len(positions),
+                'mean': self.total_means[style] if self.n else None,
+                'variance': total_m2 / divisor if divisor else None,
+                'alpha': alpha
+            }
+
+        correlations = {
+            name: {other: _correlation(self.total_m2[a][b], self.total_m2[a][a], self.total_m2[b][b]) if divisor else None
+                   for b, other in enumerate(style_names)}
+            for a, name in enumerate(style_names)
+        }
+        return {'responses': self.n, 'skipped': self.skipped, 'items': items, 'styles': styles,
+                'correlations': correlations}
+
+
+class ResponseAnalytics:
+    """Per-catalog-version ItemStatistics, kept up to date from the results warehouse."""
+
+    def __init__(self):
+        self._stats = {}  # catalog version -> (ItemStatistics, id of the last result folded in)
+        self._lock = threading.Lock()
+
+    def update(self, warehouse, catalog):
+        """Folds in the catalog version's results recorded since the last call and returns the statistics."""
+        with self._lock:
+            stats, last_id = self._stats.get(catalog.version) or (ItemStatistics.for_engine(catalog.engine), 0)
+            for last_id, answers in warehouse.iter_answers(catalog.version, after_id=last_id):
+                stats.add(answers)
+            self._stats[catalog.version] = (stats, last_id)
+            return stats
+
+    def recompute(self, warehouse, catalog):
+        """Rebuilds the catalog version's statistics from every stored result in one batch pass."""
+        with self._lock:
+            last_id = 0
+
+            def responses():
+                nonlocal last_id
+                for last_id, answers in warehouse.iter_answers(catalog.version):
+                    yield answers
+
+            engine = catalog.engine
+            stats = ItemStatistics.from_matrix(engine.question_styles, len(engine.style_names), responses(),
+                                               engine.question_reversed)
+            self._stats[catalog.version] = (stats, last_id)
+            return stats
+
+    def __len__(self):
+        return len(self._stats)
@@ -0,0 +1,52 @@
+import hashlib
+import json
+
+# In-progress answers are packed as "<catalog version>:<one digit per question>",
+# e.g. "3f2a9c1e:5400". A 0 marks an unanswered question; the style of each
+# position is implied by ALL_QUESTIONS, so it is never stored in the session.
+UNANSWERED = 0
+MIN_SCORE = 1
+MAX_SCORE = 5
+VERSION_LENGTH = 8
+
+
+def catalog_version(questions, scoring=None):
+    """Returns a short hash identifying the question order, texts and styles.
+
+    scoring (see scoring.scoring_settings) is hashed in too when not empty, so reweighting a
+    catalog changes its version while plain catalogs keep theirs.
+    """
+    content = [[q['style'], q['text']] for q in questions]
+    if scoring:
+        content.append(scoring)
+    fingerprint = json.dumps(content, separators=(',', ':'))
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:VERSION_LENGTH]
+
+
+def empty_answers(question_count):
+    return [UNANSWERED] * question_count
+
+
+def encode_answers(answers, version):
+    return f"{version}:{''.join(str(score) for score in answers)}"
+
+
+def decode_answers(packed, version, question_count):
+    """Unpacks an encoded answer string.
+
+    Returns None when the value is malformed, has the wrong length, or was
+    stamped with a different catalog version than the one currently loaded.
+    """
+    if not isinstance(packed, str):
+        return None
+    stamped_version, _, digits = packed.partition(':')
+    if stamped_version != version or len(digits) != question_count or not digits.isdigit():
+        return None
+    answers = [int(digit) for digit in digits]
+    if any(score > MAX_SCORE for score in answers):
+        return None
+    return answers
+
+
+def answered_count(answers):
+    return sum(1 for score in answers if score != UNANSWERED)
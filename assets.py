@@ -0,0 +1,245 @@
+"""Static asset pipeline: vendored third-party assets, fingerprinting and precompression.
+
+`flask --app main vendor-assets` downloads Materialize and the Material
+Icons font into static/vendor/ once, so pages need no CDN (and work on an
+offline classroom network). `flask --app main build-assets` then copies
+every file under static/ into static/dist/ with a content hash in its name
+(style.css -> dist/style.3f9a0c1d2b4e.css), minifying CSS, rewriting url()
+references to the hashed names and writing .gz (and .br, if the optional
+`brotli` package is installed) variants next to each text asset. The
+mapping is saved in static/dist/manifest.json.
+
+At runtime StaticAssets makes url_for('static', ...) emit the hashed name,
+serves hashed files with a year-long immutable Cache-Control and the best
+precompressed variant the client accepts, and leaves everything else to
+Flask's normal static handling. Without a manifest nothing changes.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import urllib.request
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are built without it
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+HASH_LENGTH = 12
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.ttf'}
+# Preferred first; each maps to the file suffix of its precompressed variant
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+mimetypes.add_type('font/woff2', '.woff2')
+
+# Third-party files the templates use: path under static/ -> pinned download URL
+VENDOR_ASSETS = {
+    'vendor/materialize.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/materialize/1.0.0/css/materialize.min.css',
+    'vendor/materialize.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/materialize/1.0.0/js/materialize.min.js',
+    'vendor/MaterialIcons-Regular.woff2':
+        'https://cdnjs.cloudflare.com/ajax/libs/material-design-icons/3.0.1/iconfont/MaterialIcons-Regular.woff2',
+}
+# Where the templates load each vendor stylesheet/script from until it has been downloaded
+CDN_FALLBACKS = {
+    'vendor/materialize.min.css': VENDOR_ASSETS['vendor/materialize.min.css'],
+    'vendor/materialize.min.js': VENDOR_ASSETS['vendor/materialize.min.js'],
+    'vendor/material-icons.css': 'https://fonts.googleapis.com/icon?family=Material+Icons',
+}
+# Replaces the Google Fonts stylesheet; written next to the downloaded font
+MATERIAL_ICONS_CSS = """@font-face {
+  font-family: 'Material Icons';
+  font-style: normal;
+  font-weight: 400;
+  font-display: block;
+  src: url(MaterialIcons-Regular.woff2) format('woff2');
+}
+
+.material-icons {
+  font-family: 'Material Icons';
+  font-weight: normal;
+  font-style: normal;
+  font-size: 24px;
+  line-height: 1;
+  letter-spacing: normal;
+  text-transform: none;
+  display: inline-block;
+  white-space: nowrap;
+  word-wrap: normal;
+  direction: ltr;
+  -webkit-font-feature-settings: 'liga';
+  -webkit-font-smoothing: antialiased;
+  font-feature-settings: 'liga';
+}
+"""
+
+_STRINGS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(text):
+    """Drops comments and insignificant whitespace. Quoted strings are left untouched."""
+    parts = _STRINGS.split(_CSS_COMMENT.sub('', text))
+    for i in range(0, len(parts), 2):  # Odd indexes are the quoted strings
+        code = re.sub(r'\s+', ' ', parts[i])
+        code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+        parts[i] = re.sub(r':\s+', ':', code)
+    return ''.join(parts).replace(';}', '}').strip()
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def vendor_assets(static_folder, fetch=None):
+    """Downloads VENDOR_ASSETS into static_folder and writes the icon stylesheet. Returns the paths written."""
+    fetch = fetch or (lambda url: urllib.request.urlopen(url, timeout=30).read())
+    written = []
+    for name, url in VENDOR_ASSETS.items():
+        _write_atomic(os.path.join(static_folder, name), fetch(url))
+        written.append(name)
+    _write_atomic(os.path.join(static_folder, 'vendor', 'material-icons.css'), MATERIAL_ICONS_CSS.encode('utf-8'))
+    written.append('vendor/material-icons.css')
+    return written
+
+
+def _source_files(static_folder):
+    for directory, subdirectories, files in os.walk(static_folder):
+        relative_directory = os.path.relpath(directory, static_folder)
+        if relative_directory == DIST_DIR:
+            subdirectories[:] = []
+            continue
+        subdirectories.sort()
+        for name in sorted(files):
+            if '.tmp' not in name:
+                yield os.path.normpath(os.path.join(relative_directory, name)).replace(os.sep, '/')
+
+
+def _rewrite_css_urls(text, name, manifest):
+    """Points url() references at the hashed files, relative to the stylesheet's own hashed location."""
+    base = os.path.dirname(name)
+    hashed_base = os.path.join(DIST_DIR, base)  # Hashed files keep their directory under dist/
+
+    def replace(match):
+        quote, reference = match.groups()
+        if re.match(r'^([a-z]+:|/|#)', reference):
+            return match.group(0)
+        path, _, suffix = reference.partition('?')
+        target = os.path.normpath(os.path.join(base, path)).replace(os.sep, '/')
+        if target not in manifest:
+            return match.group(0)
+        relative = os.path.relpath(manifest[target], hashed_base).replace(os.sep, '/')
+        return f"url({quote}{relative}{'?' + suffix if suffix else ''}{quote})"
+
+    return _CSS_URL.sub(replace, text)
+
+
+def build_assets(static_folder, clean=False):
+    """Fingerprints and precompresses everything under static_folder into static_folder/dist. Returns the manifest."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    if clean and os.path.isdir(dist):
+        shutil.rmtree(dist)
+    names = list(_source_files(static_folder))
+    # Stylesheets last, so the files they reference already have their hashed names
+    names.sort(key=lambda name: name.endswith('.css'))
+    files = {}
+    encodings = {}
+    for name in names:
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            data = f.read()
+        stem, extension = os.path.splitext(name)
+        if extension == '.css':
+            text = data.decode('utf-8')
+            if not stem.endswith('.min'):
+                text = minify_css(text)
+            data = _rewrite_css_urls(text, name, files).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        hashed = f"{DIST_DIR}/{stem}.{digest}{extension}"
+        files[name] = hashed
+        hashed_path = os.path.join(static_folder, hashed)
+        _write_atomic(hashed_path, data)
+        if extension in COMPRESSIBLE:
+            variants = [('gzip', '.gz', gzip.compress(data, 9, mtime=0))]
+            if brotli is not None:
+                variants.insert(0, ('br', '.br', brotli.compress(data, quality=11)))
+            encodings[hashed] = []
+            for encoding, suffix, compressed in variants:
+                if len(compressed) < len(data):
+                    _write_atomic(hashed_path + suffix, compressed)
+                    encodings[hashed].append(encoding)
+    manifest = {'files': files, 'encodings': {hashed: found for hashed, found in encodings.items() if found}}
+    _write_atomic(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+class StaticAssets:
+
+    def __init__(self, static_folder, logger=None):
+        self.static_folder = static_folder
+        self.logger = logger or logging.getLogger(__name__)
+        self.files = {}  # logical name -> hashed name
+        self.encodings = {}  # hashed name -> available precompressed encodings
+        self.load()
+
+    def load(self):
+        """Reads the build manifest, if there is one. Returns whether fingerprinted assets are in use."""
+        try:
+            with open(os.path.join(self.static_folder, DIST_DIR, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        except ValueError as e:
+            self.logger.error(f"Ignoring unreadable asset manifest: {e}")
+            manifest = {}
+        self.files = manifest.get('files', {})
+        self.encodings = manifest.get('encodings', {})
+        self._hashed = set(self.files.values())
+        self._local = {name for name in CDN_FALLBACKS if os.path.exists(os.path.join(self.static_folder, name))}
+        return bool(self.files)
+
+    def install(self, app):
+        """Hashes static URLs, serves hashed files with long-lived caching and adds asset_url() to templates."""
+        app.url_defaults(self._hash_static_url)
+        self._original_view = app.view_functions['static']
+        app.view_functions['static'] = self._serve
+        app.add_template_global(self.asset_url)
+
+    def _hash_static_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.files:
+            values['filename'] = self.files[values['filename']]
+
+    def asset_url(self, filename):
+        """URL of a static file, falling back to its CDN copy if a vendor file has not been downloaded."""
+        if filename in CDN_FALLBACKS and filename not in self._local and filename not in self.files:
+            return CDN_FALLBACKS[filename]
+        return url_for('static', filename=filename)
+
+    def _serve(self, filename):
+        if filename not in self._hashed:
+            return self._original_view(filename=filename)
+        available = self.encodings.get(filename, ())
+        encoding, suffix = next(((encoding, suffix) for encoding, suffix in ENCODINGS
+                                 if encoding in available and request.accept_encodings[encoding]), (None, ''))
+        response = send_from_directory(self.static_folder, filename + suffix, max_age=IMMUTABLE_MAX_AGE,
+                                       mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if available:
+            response.vary.add('Accept-Encoding')
+        # The name changes whenever the content does, so browsers never need to revalidate
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
@@ -0,0 +1,185 @@
+"""Offline scoring of completed assessments from CSV or JSONL exports.
+
+Input rows are streamed, grouped into fixed-size chunks and scored with a
+ScoringEngine, and the results are written out as they are produced, so
+memory use depends on the chunk size rather than the input size.
+
+CSV input has a header row. An optional 'respondent_id' column identifies
+each respondent; every other column is one answer, in ALL_QUESTIONS order.
+JSONL input has one object per line: {"respondent_id": ..., "answers": [...]}.
+Answers are 1-5, with 0 or blank meaning unanswered.
+"""
+import csv
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from answer_codec import MAX_SCORE
+from scoring import ScoringEngine
+
+DEFAULT_CHUNK_SIZE = 1000
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+
+
+def is_jsonl(path):
+    return path.lower().endswith(JSONL_EXTENSIONS)
+
+
+def parse_answers(values, question_count):
+    """Converts raw answer values to a score list, raising ValueError if any is invalid."""
+    if len(values) != question_count:
+        raise ValueError(f"expected {question_count} answers, got {len(values)}")
+    answers = []
+    for value in values:
+        if value is None or value == '':
+            answers.append(0)
+            continue
+        score = int(value)
+        if not (0 <= score <= MAX_SCORE):
+            raise ValueError(f"score {score} is outside 0-{MAX_SCORE}")
+        answers.append(score)
+    return answers
+
+
+def read_rows(path):
+    """Yields (respondent_id, raw answer values) tuples from a CSV or JSONL file.
+
+    A row that cannot be read yields a ValueError in place of its values, so it becomes an error record.
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        if is_jsonl(path):
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, ValueError(f"invalid JSON: {e}")
+                    continue
+                if not isinstance(record, dict):
+                    yield line_number, ValueError("expected a JSON object")
+                    continue
+                yield record.get('respondent_id', line_number), record.get('answers', [])
+            return
+
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        id_column = header.index('respondent_id') if 'respondent_id' in header else None
+        for row_number, row in enumerate(reader, start=1):
+            if id_column is None:
+                yield row_number, row
+            elif len(row) <= id_column:
+                yield row_number, ValueError("missing respondent_id")
+            else:
+                yield row[id_column], row[:id_column] + row[id_column + 1:]
+
+
+def iter_chunks(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_chunk(engine, chunk):
+    """Scores one chunk of (respondent_id, raw values) rows into output records.
+
+    The chunk is parsed first; the valid vectors are then scored in one engine.score_batch() pass
+    and the error records are merged back in input order.
+    """
+    records = []
+    valid = []  # (position in records, answers)
+    for respondent_id, values in chunk:
+        try:
+            if isinstance(values, ValueError):  # A row read_rows could not parse
+                raise values
+            valid.append((len(records), parse_answers(values, engine.question_count)))
+            records.append({'respondent_id': respondent_id})
+        except (TypeError, ValueError) as e:
+            records.append({'respondent_id': respondent_id, 'error': str(e)})
+    results = engine.score_batch([answers for _, answers in valid])
+    for (position, _), result in zip(valid, results):
+        records[position].update(scores=result.scores, percentages=result.percentages,
+                                 primary_styles=result.primary_styles)
+    return records
+
+
+# Each pool worker builds its own engine once, instead of unpickling one per chunk.
+_worker_engine = None
+
+
+def _init_worker(learning_styles, questions):
+    global _worker_engine
+    _worker_engine = ScoringEngine(learning_styles, questions)
+
+
+def _score_chunk_in_worker(chunk):
+    return score_chunk(_worker_engine, chunk)
+
+
+def score_rows(rows, engine, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """Yields one output record per input row, in input order.
+
+    With workers > 1, chunks are scored in a process pool. At most two chunks
+    per worker are in flight at a time, which keeps memory use flat.
+    """
+    chunks = iter_chunks(rows, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from score_chunk(engine, chunk)
+        return
+
+    # Just what scoring needs (styles, weights, reverse keying, normalization), not the whole catalog
+    learning_styles = {name: {'normalization': normalization}
+                       for name, normalization in zip(engine.style_names, engine.normalizations)}
+    questions = [
+        {'style': engine.style_names[index] if index >= 0 else None, 'weight': weight, 'reverse': reverse}
+        for index, weight, reverse in zip(engine.question_styles, engine.question_weights, engine.question_reversed)
+    ]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(learning_styles, questions)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_score_chunk_in_worker, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_records(records, path, style_names):
+    """Writes output records to a CSV or JSONL file as they arrive; returns the number written."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if is_jsonl(path):
+            for record in records:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+                count += 1
+            return count
+
+        writer = csv.writer(f)
+        writer.writerow(['respondent_id', 'primary_styles']
+                        + [f"{name} score" for name in style_names]
+                        + [f"{name} %" for name in style_names]
+                        + ['error'])
+        for record in records:
+            if 'error' in record:
+                writer.writerow([record['respondent_id'], ''] + [''] * (2 * len(style_names)) + [record['error']])
+            else:
+                writer.writerow([record['respondent_id'], '|'.join(record['primary_styles'])]
+                                + [record['scores'][name] for name in style_names]
+                                + [record['percentages'][name] for name in style_names]
+                                + [''])
+            count += 1
+    return count
+
+
+def score_file(input_path, output_path, engine, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """Scores every respondent in input_path and streams the results to output_path."""
+    records = score_rows(read_rows(input_path), engine, chunk_size=chunk_size, workers=workers)
+    return write_records(records, output_path, engine.style_names)
@@ -0,0 +1,93 @@
+"""Cold start: loading the catalog from JSON vs. from the compiled snapshot.
+
+For each synthetic catalog size, a fresh Python process loads the catalog
+the way a worker does at startup (CatalogSnapshot, including the scoring
+engine and API body) and reports the load time and how much its resident
+memory grew. Each path runs --runs times in new processes; medians are shown.
+
+Run from the project root:
+    python benchmarks/bench_catalog_cold_start.py [--sizes 30,3000,30000,300000] [--runs 5]
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from catalog import compile_catalog  # noqa: E402
+
+STYLES = ['Visual', 'Auditory', 'Reading/Writing', 'Kinesthetic', 'Deep Learning', 'Strategic Learning']
+
+# Runs in the child: import first (not timed), then time only the load itself
+CHILD = """
+import json, os, resource, sys, time
+sys.path.insert(0, {root!r})
+from catalog import CatalogSnapshot
+
+def rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+before = rss_kb()
+start = time.perf_counter()
+snapshot = CatalogSnapshot.from_json_file({path!r}) if {mode!r} == 'json' else CatalogSnapshot.from_compiled({path!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'rss_kb': rss_kb() - before, 'questions': len(snapshot.questions)}}))
+"""
+
+
+def write_catalog(path, question_count):
+    per_style = math.ceil(question_count / len(STYLES))
+    data = [
+        {
+            'style_name': style,
+            'category': 'Synthetic',
+            'description': f"Synthetic {style} style.",
+            'questions': [f"{style}: statement number {i + 1}, phrased for a benchmark." for i in range(per_style)],
+            'recommendations': [f"{style} recommendation {i + 1}" for i in range(5)]
+        }
+        for style in STYLES
+    ]
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def measure(mode, path, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', CHILD.format(root=ROOT, path=path, mode=mode)],
+                                check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output))
+    return (statistics.median(s['seconds'] for s in samples) * 1e3,
+            statistics.median(s['rss_kb'] for s in samples) / 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='30,3000,30000,300000')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'questions':>10}{'file MB':>9}  {'json ms':>9}{'compiled ms':>13}{'speedup':>9}  {'json RSS MB':>12}{'compiled RSS MB':>16}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in (int(s) for s in args.sizes.split(',')):
+            json_path = os.path.join(tmp_dir, f'catalog_{size}.json')
+            write_catalog(json_path, size)
+            compiled_path, _ = compile_catalog(json_path)
+            json_ms, json_rss = measure('json', json_path, args.runs)
+            compiled_ms, compiled_rss = measure('compiled', compiled_path, args.runs)
+            print(f"{size:>10}{os.path.getsize(json_path) / 1e6:>9.2f}  {json_ms:>9.2f}{compiled_ms:>13.2f}"
+                  f"{json_ms / compiled_ms:>8.1f}x  {json_rss:>12.1f}{compiled_rss:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Requests/sec for GET /assessment/<n> with and without the rendered-page cache.
+
+Three modes are measured through the Flask test client:
+  uncached     - every request renders assessment.html through Jinja
+  cached       - pages come from the in-memory PageCache
+  revalidated  - the client sends If-None-Match and gets 304 Not Modified
+
+Run from the project root:
+    python benchmarks/bench_page_cache.py [--requests N]
+"""
+import argparse
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scratch_instance import use_scratch_instance  # noqa: E402
+
+use_scratch_instance()
+
+import main  # noqa: E402
+from page_cache import PageCache  # noqa: E402
+
+
+def run(client, question_count, requests, etags=None):
+    start = time.perf_counter()
+    for i in range(requests):
+        question_num = i % question_count + 1
+        headers = {'If-None-Match': etags[question_num]} if etags else None
+        client.get(f'/assessment/{question_num}', headers=headers)
+    return requests / (time.perf_counter() - start)
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=3000)
+    args = parser.parse_args()
+
+    question_count = len(main.catalog_manager.current.questions)
+    if not question_count:
+        sys.exit("learning_data.json could not be loaded; nothing to benchmark.")
+
+    client = main.app.test_client()
+    client.get('/assessment') # Start a session
+
+    with patch('main.page_cache', PageCache(max_entries=0)):
+        uncached = run(client, question_count, args.requests)
+    with patch('main.page_cache', PageCache()):
+        run(client, question_count, question_count) # Warm the cache
+        cached = run(client, question_count, args.requests)
+        etags = {n: client.get(f'/assessment/{n}').headers['ETag'] for n in range(1, question_count + 1)}
+        revalidated = run(client, question_count, args.requests, etags=etags)
+
+    print(f"{args.requests} requests over {question_count} questions")
+    for label, rate in (('uncached', uncached), ('cached', cached), ('revalidated (304)', revalidated)):
+        print(f"{label:<20}{rate:>10,.0f} req/s")
+
+
+if __name__ == '__main__':
+    main_benchmark()
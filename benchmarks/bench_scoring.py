@@ -0,0 +1,84 @@
+"""Microbenchmark: assessments scored per second.
+
+Compares the original per-request dict loop from results() with the
+precomputed ScoringEngine, for single answer vectors and for a batch.
+The legacy timing covers only its scoring loop (not building the session
+dict it read) and computes no percentages, so it flatters the old code.
+
+Run from the project root:
+    python benchmarks/bench_scoring.py [--assessments N] [--questions-per-style K] [--repeat R]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scoring import ScoringEngine  # noqa: E402
+
+STYLES = ['Visual', 'Auditory', 'Reading/Writing', 'Kinesthetic', 'Deep Learning', 'Strategic Learning']
+
+
+def build_catalog(questions_per_style):
+    learning_styles = {style: {} for style in STYLES}
+    questions = []
+    for style in STYLES:
+        for _ in range(questions_per_style):
+            questions.append({'id': len(questions) + 1, 'text': f"{style} question", 'style': style})
+    return learning_styles, questions
+
+
+def legacy_score(learning_styles, questions, answers):
+    """The scoring loop results() used before the engine, over the old per-question session dict."""
+    submitted_answers = {
+        str(i + 1): {'score': score, 'style': questions[i]['style']} for i, score in enumerate(answers)
+    }
+    start = time.perf_counter()
+    scores = {style_name: 0 for style_name in learning_styles}
+    for answer_data in submitted_answers.values():
+        score = answer_data.get('score')
+        style_for_question = answer_data.get('style')
+        if style_for_question and style_for_question in scores and isinstance(score, int):
+            scores[style_for_question] += score
+    max_score = max(scores.values())
+    [style for style, score_val in scores.items() if score_val == max_score and max_score > 0]
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assessments', type=int, default=50000)
+    parser.add_argument('--questions-per-style', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per method; the fastest one is reported")
+    args = parser.parse_args()
+
+    learning_styles, questions = build_catalog(args.questions_per_style)
+    rng = random.Random(42)
+    vectors = [[rng.randint(1, 5) for _ in questions] for _ in range(args.assessments)]
+    engine = ScoringEngine(learning_styles, questions)
+
+    def score_each():
+        start = time.perf_counter()
+        for vector in vectors:
+            engine.score(vector)
+        return time.perf_counter() - start
+
+    def score_batch():
+        start = time.perf_counter()
+        for _ in engine.score_batch(vectors):
+            pass
+        return time.perf_counter() - start
+
+    methods = (('legacy dict loop', lambda: sum(legacy_score(learning_styles, questions, v) for v in vectors)),
+               ('engine.score', score_each),
+               ('engine.score_batch', score_batch))
+    print(f"{len(questions)} questions, {args.assessments} assessments, best of {args.repeat}")
+    for label, run in methods:
+        seconds = min(run() for _ in range(args.repeat))
+        print(f"{label:<20}{args.assessments / seconds:>14,.0f} assessments/s")
+
+
+if __name__ == '__main__':
+    main()
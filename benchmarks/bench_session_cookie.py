@@ -0,0 +1,75 @@
+"""Compares the session cookie before and after moving results server-side.
+
+"Before" is the legacy cookie that embedded scores, recommendations and the whole
+learning_styles catalog; "after" is the cookie carrying only the result ID.
+For each shape it reports the signed cookie size and the time to sign and to
+verify/deserialize it, which Flask pays on every request that carries the cookie.
+
+Run from the project root:
+    python benchmarks/bench_session_cookie.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scratch_instance import use_scratch_instance  # noqa: E402
+
+use_scratch_instance()
+
+from main import app, catalog_manager, result_store  # noqa: E402
+
+
+def build_payloads(learning_styles):
+    scores = {style_name: 15 for style_name in learning_styles}
+    primary_styles = list(learning_styles)[:1]
+    recommendations = {style: learning_styles[style]['recommendations'] for style in primary_styles}
+    legacy = {
+        'assessment_results': {
+            'scores': scores,
+            'primary_styles': primary_styles,
+            'recommendations': recommendations,
+            'learning_styles_data': learning_styles
+        }
+    }
+    current = {'result_id': result_store.put({'scores': scores, 'primary_styles': primary_styles})}
+    return legacy, current
+
+
+def measure(serializer, payload, iterations):
+    cookie = serializer.dumps(payload)
+    dumps_seconds = timeit.timeit(lambda: serializer.dumps(payload), number=iterations)
+    loads_seconds = timeit.timeit(lambda: serializer.loads(cookie), number=iterations)
+    return len(cookie), dumps_seconds / iterations * 1e6, loads_seconds / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    learning_styles = catalog_manager.current.learning_styles
+    if not learning_styles:
+        sys.exit("learning_data.json could not be loaded; nothing to benchmark.")
+
+    app.secret_key = app.secret_key or 'benchmark'
+    serializer = app.session_interface.get_signing_serializer(app)
+    legacy, current = build_payloads(learning_styles)
+
+    print(f"{'cookie':<22}{'bytes':>8}{'sign (us)':>12}{'verify (us)':>14}")
+    for label, payload in (('before (full catalog)', legacy), ('after (result id)', current)):
+        size, dumps_us, loads_us = measure(serializer, payload, args.iterations)
+        print(f"{label:<22}{size:>8}{dumps_us:>12.1f}{loads_us:>14.1f}")
+
+    # End-to-end: a request that only has to open the session, e.g. /download_results.
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(current)
+    per_request = timeit.timeit(lambda: client.get('/download_results'), number=max(1, args.iterations // 10))
+    print(f"\n/download_results with result-id cookie: {per_request / max(1, args.iterations // 10) * 1e3:.3f} ms/request")
+
+
+if __name__ == '__main__':
+    main()
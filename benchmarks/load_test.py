@@ -0,0 +1,364 @@
+"""Load test: concurrent users walking the full assessment flow against a live server.
+
+For each catalog size the script writes a synthetic learning_data.json,
+starts the app in a separate process on a free local port (threaded
+werkzeug server with keep-alive) and runs --users simulated users, each
+doing:
+
+    GET /assessment -> GET/POST /assessment/<n> ... -> GET /results -> GET /download_results
+
+It reports per-route p50/p95/p99 latency, requests/sec, the size of the
+session cookie the server sets, and per-route server CPU time (thread CPU
+measured inside the server process, so client overhead is excluded).
+
+Large catalogs would take 2 requests per question per user, so each user
+answers at most --answers-per-user questions spread evenly over the
+catalog (always including the last one). The session cookie still carries
+one digit per question, so cookie size and decode cost scale with the
+catalog as they would in a real run.
+
+Results can be saved as a JSON baseline and later runs compared against it:
+    python benchmarks/load_test.py --sizes 30,300,3000 --save-baseline benchmarks/baselines/local.json
+    python benchmarks/load_test.py --sizes 30,300,3000 --compare benchmarks/baselines/local.json
+
+Run from the project root.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from scratch_instance import scratch_environment  # noqa: E402
+
+STYLES = ['Visual', 'Auditory', 'Reading/Writing', 'Kinesthetic', 'Deep Learning', 'Strategic Learning']
+STATS_PATH = '/_bench/cpu'
+PERCENTILES = (50, 95, 99)
+
+
+# --- Server side (runs in the child process started with --serve) ---
+
+def serve(port):
+    import logging
+
+    from flask import jsonify, request
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    import main
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    cpu_seconds = defaultdict(float)
+    counts = defaultdict(int)
+    lock = threading.Lock()
+    local = threading.local()
+
+    @main.app.before_request
+    def start_cpu_clock():
+        local.cpu_start = time.thread_time()
+
+    @main.app.teardown_request
+    def stop_cpu_clock(exc):
+        start = getattr(local, 'cpu_start', None)
+        if start is None or request.path == STATS_PATH:
+            return
+        label = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        elapsed = time.thread_time() - start
+        with lock:
+            cpu_seconds[label] += elapsed
+            counts[label] += 1
+
+    def cpu_stats():
+        with lock:
+            return jsonify({label: {'requests': counts[label], 'cpu_seconds': cpu_seconds[label]} for label in counts})
+
+    main.app.add_url_rule(STATS_PATH, 'bench_cpu_stats', cpu_stats)
+
+    WSGIRequestHandler.protocol_version = 'HTTP/1.1'  # keep-alive, like a real front end
+    make_server('127.0.0.1', port, main.app, threaded=True).serve_forever()
+
+
+# --- Client side ---
+
+def write_synthetic_catalog(path, question_count):
+    per_style = math.ceil(question_count / len(STYLES))
+    data = [
+        {
+            'style_name': style,
+            'category': 'Synthetic',
+            'description': f"Synthetic {style} style for load testing.",
+            'questions': [f"{style} statement number {i + 1} for load testing." for i in range(per_style)],
+            'recommendations': [f"{style} recommendation {i + 1}" for i in range(5)]
+        }
+        for style in STYLES
+    ]
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    return per_style * len(STYLES)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(catalog_path, work_dir):
+    port = free_port()
+    env = dict(os.environ,
+               **scratch_environment(work_dir),
+               LEARNING_DATA_PATH=catalog_path,
+               FLASK_SECRET_KEY='load-test',
+               RATE_LIMITS='off')  # Every simulated user comes from 127.0.0.1
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port)],
+                               cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode} during startup.")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Server did not start within 30s.")
+
+
+class SimulatedUser:
+    """One browser: a keep-alive connection and the session cookie."""
+
+    def __init__(self, port, recorder):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.recorder = recorder
+        self.cookie = None
+
+    def request(self, method, path, label, expected_status, form=None):
+        headers = {}
+        body = None
+        if self.cookie:
+            headers['Cookie'] = f"session={self.cookie}"
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        start = time.perf_counter()
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        for header in response.headers.get_all('Set-Cookie') or []:
+            name, _, value = header.split(';', 1)[0].partition('=')
+            if name == 'session':
+                self.cookie = value or None
+                self.recorder.cookie(len(value))
+        self.recorder.latency(label, elapsed, response.status == expected_status)
+        return response
+
+    def run(self, question_numbers, rng):
+        location = self.request('GET', '/assessment', 'GET /assessment', 302).getheader('Location', '')
+        if not urlsplit(location).path.endswith('/assessment/1'):
+            self.recorder.latency('GET /assessment', 0.0, False)
+        for question_num in question_numbers:
+            self.request('GET', f'/assessment/{question_num}', 'GET /assessment/<n>', 200)
+            self.request('POST', f'/assessment/{question_num}', 'POST /assessment/<n>', 302,
+                         form={'score': str(rng.randint(1, 5))})
+        self.request('GET', '/results', 'GET /results', 200)
+        self.request('GET', '/download_results', 'GET /download_results', 200)
+        self.conn.close()
+
+
+class Recorder:
+    """Thread-safe collection of latencies, errors and cookie sizes."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.cookie_sizes = []
+        self._lock = threading.Lock()
+
+    def latency(self, label, seconds, ok):
+        with self._lock:
+            self.latencies[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+    def cookie(self, size):
+        with self._lock:
+            self.cookie_sizes.append(size)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def sampled_questions(question_count, answers_per_user):
+    """Question numbers a user answers: evenly spread, ending on the last question."""
+    if answers_per_user <= 0 or answers_per_user >= question_count:
+        return list(range(1, question_count + 1))
+    step = question_count / answers_per_user
+    return sorted({min(question_count, int(round((i + 1) * step))) for i in range(answers_per_user)})
+
+
+def fetch_cpu_stats(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('GET', STATS_PATH)
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    return stats
+
+
+def run_size(question_count, args, work_dir):
+    catalog_path = os.path.join(work_dir, f'learning_data_{question_count}.json')
+    question_count = write_synthetic_catalog(catalog_path, question_count)
+    question_numbers = sampled_questions(question_count, args.answers_per_user)
+    process, port = start_server(catalog_path, work_dir)
+    try:
+        recorder = Recorder()
+        users = [SimulatedUser(port, recorder) for _ in range(args.users)]
+        threads = [
+            threading.Thread(target=user.run, args=(question_numbers, random.Random(seed)))
+            for seed, user in enumerate(users)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - start
+        cpu = fetch_cpu_stats(port)
+    finally:
+        process.terminate()
+        process.wait()
+
+    routes = {}
+    total_requests = 0
+    for label, values in sorted(recorder.latencies.items()):
+        values.sort()
+        total_requests += len(values)
+        server = cpu.get(label.replace('<n>', '<int:question_num>'), {})
+        routes[label] = {
+            'requests': len(values),
+            'errors': recorder.errors[label],
+            **{f'p{pct}_ms': round(percentile(values, pct) * 1e3, 3) for pct in PERCENTILES},
+            'cpu_ms_per_request': round(server['cpu_seconds'] / server['requests'] * 1e3, 3) if server.get('requests') else None
+        }
+    cookie_sizes = recorder.cookie_sizes
+    return {
+        'questions': question_count,
+        'users': args.users,
+        'answers_per_user': len(question_numbers),
+        'requests': total_requests,
+        'wall_seconds': round(wall_seconds, 3),
+        'requests_per_second': round(total_requests / wall_seconds, 1),
+        'session_cookie_bytes': {
+            'max': max(cookie_sizes, default=0),
+            'mean': round(sum(cookie_sizes) / len(cookie_sizes), 1) if cookie_sizes else 0
+        },
+        'routes': routes
+    }
+
+
+def print_report(result):
+    print(f"\n{result['questions']} questions, {result['users']} users x {result['answers_per_user']} answers: "
+          f"{result['requests']} requests in {result['wall_seconds']}s = {result['requests_per_second']} req/s; "
+          f"session cookie max {result['session_cookie_bytes']['max']} B, mean {result['session_cookie_bytes']['mean']} B")
+    print(f"  {'route':<26}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'cpu ms':>9}")
+    for label, route in result['routes'].items():
+        cpu = route['cpu_ms_per_request']
+        print(f"  {label:<26}{route['requests']:>9}{route['errors']:>8}{route['p50_ms']:>9.2f}"
+              f"{route['p95_ms']:>9.2f}{route['p99_ms']:>9.2f}{cpu if cpu is not None else float('nan'):>9.3f}")
+
+
+def compare(results, baseline, tolerance):
+    """Prints p95 and CPU regressions beyond tolerance (a fraction). Returns the number of regressions."""
+    regressions = 0
+    for size, result in results.items():
+        base = baseline.get('results', {}).get(size)
+        if base is None:
+            print(f"\n{size} questions: no baseline entry")
+            continue
+        print(f"\n{size} questions vs baseline:")
+        for label, route in result['routes'].items():
+            base_route = base['routes'].get(label)
+            if base_route is None:
+                continue
+            for metric in ('p95_ms', 'cpu_ms_per_request'):
+                old, new = base_route.get(metric), route.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                flag = ''
+                if change > tolerance:
+                    flag = '  REGRESSION'
+                    regressions += 1
+                print(f"  {label:<26}{metric:<20}{old:>9.3f} -> {new:>9.3f} ({change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--sizes', default='30,300,3000', help='Comma-separated catalog sizes (questions).')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent simulated users.')
+    parser.add_argument('--answers-per-user', type=int, default=60,
+                        help='Questions each user answers (0 = all of them).')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Write the results as a JSON baseline.')
+    parser.add_argument('--compare', metavar='PATH', help='Compare against a saved baseline; exit 1 on regressions.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown before a metric counts as a regression (default 0.25 = 25%%).')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in (int(s) for s in args.sizes.split(',') if s.strip()):
+            result = run_size(size, args, work_dir)
+            results[str(result['questions'])] = result
+            print_report(result)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'results': results
+            }, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Points the app's stores at a throwaway directory, for benchmarks that import main.
+
+main.py opens the results warehouse, progress store and export directory when it is
+imported; without this a benchmark run would write into the real instance/ directory.
+Call use_scratch_instance() before importing main. Variables already set are left alone.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+
+def scratch_environment(directory):
+    """The store locations under directory, as environment variables."""
+    return {
+        'RESULTS_WAREHOUSE_PATH': os.path.join(directory, 'results.db'),
+        'PROGRESS_STORE_PATH': os.path.join(directory, 'progress.db'),
+        'EXPORT_DIR': os.path.join(directory, 'exports'),
+    }
+
+
+def use_scratch_instance():
+    directory = tempfile.mkdtemp(prefix='learning-styles-bench-')
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    for name, value in scratch_environment(directory).items():
+        os.environ.setdefault(name, value)
+    return directory
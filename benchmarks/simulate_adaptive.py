@@ -0,0 +1,138 @@
+"""Simulates the adaptive assessment over many answer vectors.
+
+For every vector the adaptive flow is replayed question by question (in
+the interleaved order, checking the stopping rule after each answer) and
+compared with scoring the full vector. Reported per catalog size and
+confidence setting:
+  answered   - mean / p95 share of questions asked before stopping
+  requests   - paginated requests saved per user (2 per skipped question)
+  agreement  - share of users whose primary styles match the full assessment
+  decide us  - server-side cost of one stopping-rule check
+
+Vectors are synthetic ('uniform' random answers, or 'profiled': each
+respondent leans towards some styles) or recorded, read from a CSV/JSONL
+export in the batch-scoring format and scored against learning_data.json.
+
+Run from the project root:
+    python benchmarks/simulate_adaptive.py [--questions-per-style 5,20,100] [--respondents N]
+    python benchmarks/simulate_adaptive.py --recorded answers.csv
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from adaptive import AdaptivePlan  # noqa: E402
+from answer_codec import MAX_SCORE, MIN_SCORE  # noqa: E402
+from batch_scoring import parse_answers, read_rows  # noqa: E402
+from catalog import CatalogSnapshot  # noqa: E402
+from scoring import ScoringEngine  # noqa: E402
+
+STYLES = ['Visual', 'Auditory', 'Reading/Writing', 'Kinesthetic', 'Deep Learning', 'Strategic Learning']
+
+
+def synthetic_engine(questions_per_style):
+    learning_styles = {style: {} for style in STYLES}
+    questions = [{'style': style} for style in STYLES for _ in range(questions_per_style)]
+    return ScoringEngine(learning_styles, questions)
+
+
+def uniform_vectors(engine, count, rng):
+    for _ in range(count):
+        yield [rng.randint(MIN_SCORE, MAX_SCORE) for _ in range(engine.question_count)]
+
+
+def profiled_vectors(engine, count, rng):
+    """Each respondent gets a per-style tendency; answers scatter around it."""
+    for _ in range(count):
+        leanings = [rng.gauss(3, 1) for _ in engine.style_names]
+        yield [
+            min(MAX_SCORE, max(MIN_SCORE, round(rng.gauss(leanings[style_index], 1))))
+            for style_index in engine.question_styles
+        ]
+
+
+def simulate(plan, engine, answers, confidence):
+    """Replays one adaptive run. Returns (questions asked, primary styles, stopping-rule checks, seconds in checks)."""
+    given = [0] * len(answers)
+    check_seconds = 0.0
+    asked = 0
+    for position in plan.order:
+        given[position] = answers[position]
+        asked += 1
+        start = time.perf_counter()
+        decided = plan.decision(given, confidence=confidence).decided
+        check_seconds += time.perf_counter() - start
+        if decided:
+            break
+    primary_styles = engine.score(plan.complete(given)).primary_styles
+    return asked, primary_styles, asked, check_seconds
+
+
+def report(label, engine, vectors, confidences):
+    plan = AdaptivePlan(engine)
+    full_primary = [engine.score(vector).primary_styles for vector in vectors]
+    question_count = engine.question_count
+    print(f"\n{label}: {question_count} questions, {len(vectors)} respondents")
+    print(f"  {'confidence':<12}{'answered':>10}{'p95':>8}{'requests saved':>17}{'agreement':>11}{'decide us':>11}")
+    for confidence in confidences:
+        asked_counts = []
+        agree = 0
+        checks = 0
+        check_seconds = 0.0
+        for vector, expected in zip(vectors, full_primary):
+            asked, primary_styles, run_checks, run_seconds = simulate(plan, engine, vector, confidence)
+            asked_counts.append(asked)
+            agree += primary_styles == expected
+            checks += run_checks
+            check_seconds += run_seconds
+        asked_counts.sort()
+        mean_share = sum(asked_counts) / len(asked_counts) / question_count
+        p95_share = asked_counts[max(0, math.ceil(0.95 * len(asked_counts)) - 1)] / question_count
+        saved = 2 * (question_count - sum(asked_counts) / len(asked_counts))
+        name = 'certain only' if confidence >= 1 else f"{confidence:.2f}"
+        print(f"  {name:<12}{mean_share:>10.0%}{p95_share:>8.0%}{saved:>17.1f}{agree / len(vectors):>11.1%}"
+              f"{check_seconds / checks * 1e6:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions-per-style', default='5,20,100')
+    parser.add_argument('--respondents', type=int, default=300)
+    parser.add_argument('--confidence', default='1.0,0.99,0.95,0.9', help='Comma-separated confidence levels.')
+    parser.add_argument('--recorded', metavar='PATH', help='CSV/JSONL of recorded answer vectors (batch-scoring format).')
+    parser.add_argument('--catalog', default='learning_data.json', help='Catalog for --recorded vectors.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    confidences = [float(c) for c in args.confidence.split(',')]
+    rng = random.Random(args.seed)
+
+    if args.recorded:
+        engine = CatalogSnapshot.from_file(args.catalog).engine
+        vectors = []
+        for respondent_id, values in read_rows(args.recorded):
+            try:
+                vector = parse_answers(values, engine.question_count)
+            except ValueError as e:
+                print(f"Skipping respondent {respondent_id}: {e}", file=sys.stderr)
+                continue
+            if all(vector):  # Only complete runs can be replayed
+                vectors.append(vector)
+        if not vectors:
+            sys.exit(f"No complete answer vectors in {args.recorded}.")
+        report(f"recorded ({args.recorded})", engine, vectors, confidences)
+        return
+
+    for questions_per_style in (int(n) for n in args.questions_per_style.split(',')):
+        engine = synthetic_engine(questions_per_style)
+        for label, generate in (('uniform', uniform_vectors), ('profiled', profiled_vectors)):
+            report(label, engine, list(generate(engine, args.respondents, rng)), confidences)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""Immutable catalog snapshots and a manager that hot-reloads them.
+
+A CatalogSnapshot bundles everything derived from one version of
+learning_data.json (styles, flattened questions, scoring engine,
+adaptive question order, pre-serialized API body). Snapshots are never mutated; a reload builds a
+new one off the request path and swaps it in with a single attribute
+assignment, so request handlers read `manager.current` without locking.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import compiled_catalog
+from adaptive import AdaptivePlan
+from answer_codec import catalog_version
+from scoring import (DEFAULT_NORMALIZATION, DEFAULT_WEIGHT, NORMALIZATIONS, ScoringEngine, question_weight,
+                     scoring_settings)
+
+DEFAULT_RETAIN_SECONDS = 2 * 60 * 60  # How long an unused old snapshot is kept for in-flight sessions
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+def transform_catalog(data):
+    """Turns the raw learning_data.json list into (learning_styles, questions).
+
+    A question is either its text or an object {"text", "weight", "reverse"}. learning_styles
+    keeps only the texts; weight and reverse appear on the flattened questions when they
+    differ from the defaults (1 and false).
+    """
+    learning_styles = {}
+    questions = []
+    for item in data:
+        style_name = item['style_name']
+        texts = []
+        for entry in item.get("questions", []):
+            question = {"id": len(questions) + 1, "text": entry, "style": style_name}
+            if isinstance(entry, dict):
+                question["text"] = entry["text"]
+                weight = question_weight(entry)
+                if weight != DEFAULT_WEIGHT:
+                    question["weight"] = weight
+                if entry.get("reverse"):
+                    question["reverse"] = True
+            texts.append(question["text"])
+            questions.append(question)
+        learning_styles[style_name] = {
+            "questions": texts,
+            "recommendations": item.get("recommendations", []),
+            "category": item.get("category", "N/A"),
+            "description": item.get("description", "N/A"),
+            "normalization": item.get("normalization", DEFAULT_NORMALIZATION)
+        }
+    return learning_styles, questions
+
+
+def _validate_question(style_name, number, question):
+    if isinstance(question, str) and question.strip():
+        return
+    if not isinstance(question, dict) or not isinstance(question.get('text'), str) or not question['text'].strip():
+        raise ValueError(f"Style '{style_name}': question #{number} must be a non-empty string "
+                         "or an object with a non-empty 'text'.")
+    weight = question.get('weight', DEFAULT_WEIGHT)
+    if type(weight) not in (int, float) or not 0 < weight < float('inf'):
+        raise ValueError(f"Style '{style_name}': question #{number} needs a positive number as 'weight'.")
+    if not isinstance(question.get('reverse', False), bool):
+        raise ValueError(f"Style '{style_name}': question #{number} has a non-boolean 'reverse'.")
+    unknown = set(question) - {'text', 'weight', 'reverse'}
+    if unknown:
+        raise ValueError(f"Style '{style_name}': question #{number} has unknown fields: {', '.join(sorted(unknown))}.")
+
+
+def validate_catalog(data):
+    """Checks the learning_data.json schema strictly. Raises ValueError describing the first problem."""
+    if not isinstance(data, list) or not data:
+        raise ValueError("The catalog must be a non-empty list of styles.")
+    seen = set()
+    for position, item in enumerate(data, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Style #{position} must be an object.")
+        name = item.get('style_name')
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError(f"Style #{position} needs a non-empty 'style_name'.")
+        if name in seen:
+            raise ValueError(f"Style '{name}' is defined more than once.")
+        seen.add(name)
+        for field in ('category', 'description'):
+            if not isinstance(item.get(field, ''), str):
+                raise ValueError(f"Style '{name}': '{field}' must be a string.")
+        recommendations = item.get('recommendations', [])
+        if not isinstance(recommendations, list) or not all(isinstance(rec, str) and rec.strip() for rec in recommendations):
+            raise ValueError(f"Style '{name}': 'recommendations' must be a list of non-empty strings.")
+        questions = item.get('questions', [])
+        if not isinstance(questions, list):
+            raise ValueError(f"Style '{name}': 'questions' must be a list.")
+        for number, question in enumerate(questions, start=1):
+            _validate_question(name, number, question)
+        if item.get('normalization', DEFAULT_NORMALIZATION) not in NORMALIZATIONS:
+            raise ValueError(f"Style '{name}': 'normalization' must be one of: {', '.join(NORMALIZATIONS)}.")
+    if not any(item.get('questions') for item in data):
+        raise ValueError("The catalog has no questions.")
+
+
+class CatalogSnapshot:
+    """One loaded catalog and the structures precomputed from it. Treat as read-only."""
+
+    def __init__(self, data, raw_content=None, source=None, mtime=None):
+        self.data = data
+        learning_styles, questions = transform_catalog(data)
+        if raw_content is None:
+            raw_content = json.dumps(data, sort_keys=True)
+        etag = hashlib.sha256(raw_content.encode('utf-8')).hexdigest() if data else ''
+        self._build(learning_styles, questions, etag, source, mtime)
+
+    def _build(self, learning_styles, questions, etag, source, mtime, version=None, api_body=None):
+        self.learning_styles, self.questions = learning_styles, questions
+        self.version = version or catalog_version(self.questions, scoring_settings(learning_styles, questions))
+        self.engine = ScoringEngine(self.learning_styles, self.questions)
+        self.adaptive = AdaptivePlan(self.engine)
+        self.source = source
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.etag = etag
+        # Serialized once so /api/v1/catalog never re-serializes per request
+        if api_body is None:
+            api_body = json.dumps({
+                'version': self.version,
+                'learning_styles': self.learning_styles,
+                'questions': self.questions
+            }, separators=(',', ':')).encode('utf-8') if learning_styles else b''
+        self.api_body = api_body
+
+    @classmethod
+    def empty(cls, source=None):
+        return cls([], source=source)
+
+    @classmethod
+    def from_file(cls, file_path, logger=None):
+        """Loads file_path into a snapshot. Raises OSError/ValueError/KeyError on bad input.
+
+        A compiled catalog next to a JSON file (learning_data.catalog for learning_data.json) is
+        used instead of parsing the JSON when it was compiled from the JSON's current size and
+        mtime. file_path may also name a compiled catalog directly.
+        """
+        if compiled_catalog.is_compiled_path(file_path):
+            return cls.from_compiled(file_path, mtime=os.stat(file_path).st_mtime_ns)
+        snapshot = cls._from_fresh_compiled(file_path, logger or logging.getLogger(__name__))
+        if snapshot is not None:
+            return snapshot
+        return cls.from_json_file(file_path)
+
+    @classmethod
+    def from_json_file(cls, file_path):
+        mtime = os.stat(file_path).st_mtime_ns
+        with open(file_path, 'r') as f:
+            raw_content = f.read()
+        data = json.loads(raw_content)
+        validate_catalog(data)  # The same checks as compiling, so a bad edit never becomes the live catalog
+        return cls(data, raw_content=raw_content, source=file_path, mtime=mtime)
+
+    @classmethod
+    def from_compiled(cls, compiled_path, source=None, mtime=None):
+        compiled = compiled_catalog.read_compiled(compiled_path)
+        header = compiled.header
+        snapshot = cls.__new__(cls)
+        snapshot.data = None  # Never materialized; everything below comes precomputed from the file
+        snapshot._build(compiled.learning_styles, compiled.questions, header.source_sha256.hex(),
+                        source or compiled_path, header.source_mtime_ns if mtime is None else mtime,
+                        version=header.version.decode('ascii'), api_body=compiled.api_body)
+        return snapshot
+
+    @classmethod
+    def _from_fresh_compiled(cls, json_path, logger):
+        compiled_path = compiled_catalog.compiled_path_for(json_path)
+        if not os.path.exists(compiled_path):
+            return None
+        try:
+            header = compiled_catalog.read_header(compiled_path)
+            try:
+                stat = os.stat(json_path)
+            except FileNotFoundError:
+                stat = None  # Deployed without the JSON: the compiled file is all there is
+            if stat is not None and (stat.st_size, stat.st_mtime_ns) != (header.source_size, header.source_mtime_ns):
+                logger.warning(f"'{compiled_path}' is older than '{json_path}'; loading the JSON. Recompile the catalog.")
+                return None
+            return cls.from_compiled(compiled_path, source=json_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not use compiled catalog '{compiled_path}', falling back to JSON: {e}")
+            return None
+
+    def __bool__(self):
+        return bool(self.questions)
+
+
+def compile_catalog(json_path, output_path=None):
+    """Validates json_path and writes its compiled snapshot. Returns (output_path, snapshot)."""
+    output_path = output_path or compiled_catalog.compiled_path_for(json_path)
+    stat = os.stat(json_path)
+    with open(json_path, 'r') as f:
+        raw_content = f.read()
+    data = json.loads(raw_content)
+    validate_catalog(data)
+    snapshot = CatalogSnapshot(data, raw_content=raw_content, source=json_path, mtime=stat.st_mtime_ns)
+    compiled_catalog.write_compiled(snapshot, output_path, snapshot.etag, stat.st_size, stat.st_mtime_ns)
+    return output_path, snapshot
+
+
+class CatalogManager:
+    """Holds the current snapshot and retains older ones still referenced by sessions.
+
+    `current` is replaced atomically on reload. Readers never take a lock;
+    the lock only serializes reloads and retention bookkeeping.
+    """
+
+    def __init__(self, file_path, retain_seconds=DEFAULT_RETAIN_SECONDS, logger=None, clock=time.monotonic):
+        self.file_path = file_path
+        self.retain_seconds = retain_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self._clock = clock
+        self.current = CatalogSnapshot.empty(source=file_path)
+        self._retained = {}  # version -> (snapshot, last_used)
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop_event = threading.Event()
+        self._reload_listeners = []
+
+    def add_reload_listener(self, callback):
+        """Registers callback(old_snapshot, new_snapshot), called after each swap."""
+        self._reload_listeners.append(callback)
+
+    def install(self, snapshot):
+        with self._lock:
+            previous = self.current
+            if previous and previous.version != snapshot.version:
+                self._retained[previous.version] = (previous, self._clock())
+            self._retained.pop(snapshot.version, None)
+            self.current = snapshot
+        for callback in self._reload_listeners:
+            callback(previous, snapshot)
+        return snapshot
+
+    def get(self, version):
+        """Returns the snapshot for a version, or None once it has expired."""
+        current = self.current
+        if version == current.version:
+            return current
+        entry = self._retained.get(version)
+        if entry is None:
+            return None
+        snapshot, last_used = entry
+        now = self._clock()
+        if now - last_used > self.retain_seconds:
+            self.expire_retained()
+            return None
+        # Touch without locking; a lost update only shortens retention by one request.
+        self._retained[version] = (snapshot, now)
+        return snapshot
+
+    def expire_retained(self):
+        now = self._clock()
+        with self._lock:
+            for version, (_, last_used) in list(self._retained.items()):
+                if now - last_used > self.retain_seconds:
+                    del self._retained[version]
+                    self.logger.info(f"Released catalog version {version}; no sessions used it for {self.retain_seconds}s.")
+
+    @property
+    def retained_versions(self):
+        return list(self._retained)
+
+    def _source_changed(self):
+        try:
+            mtime = os.stat(self.file_path).st_mtime_ns
+        except OSError:
+            return False
+        return mtime != self.current.mtime
+
+    def reload_if_changed(self):
+        """Rebuilds and swaps in a new snapshot if the file changed. Returns True on swap.
+
+        A file that fails to parse is logged and the current snapshot is kept.
+        """
+        if not self._source_changed():
+            return False
+        try:
+            snapshot = CatalogSnapshot.from_file(self.file_path, logger=self.logger)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.error(f"Catalog reload from '{self.file_path}' failed; keeping version {self.current.version}: {e}")
+            return False
+        if snapshot.mtime == self.current.mtime:
+            return False
+        previous_version = self.current.version
+        self.install(snapshot)
+        self.logger.info(f"Reloaded catalog from '{self.file_path}': version {previous_version} -> {snapshot.version}, {len(snapshot.questions)} questions.")
+        return True
+
+    def _watch(self, interval):
+        while not self._stop_event.wait(interval):
+            try:
+                self.reload_if_changed()
+                self.expire_retained()
+            except Exception as e:  # Keep watching; one bad poll must not stop reloads for good
+                self.logger.error(f"Catalog watcher error: {e}")
+
+    def start_watcher(self, interval=DEFAULT_POLL_INTERVAL):
+        """Polls the catalog file's mtime on a daemon thread and reloads it when it changes."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='catalog-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watcher(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,273 @@
+"""Per-tenant, per-locale catalogs, loaded on first use and kept in a bounded LRU.
+
+Catalogs live under a root directory, one folder per tenant and one file
+per locale:
+
+    catalogs/
+        lincoln-high/en.json
+        lincoln-high/es.json        (or es.catalog, compiled)
+        riverside/en.json
+
+Each (tenant, locale) gets its own CatalogManager, so hot reloads and
+version retention for in-flight sessions work exactly as for the default
+catalog. Only the most recently used max_entries managers stay loaded, so
+memory follows the active tenants rather than every tenant on disk.
+
+A request picks its tenant from a /t/<tenant>[/<locale>] path prefix, the
+X-Tenant header, or a subdomain of tenant_domain, in that order; the
+locale from the path, X-Locale, ?lang= or Accept-Language, falling back to
+the tenant's default locale. Requests with no tenant resolve to None and
+the app uses its default catalog (learning_data.json).
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from werkzeug.exceptions import NotFound
+
+from catalog import DEFAULT_POLL_INTERVAL, DEFAULT_RETAIN_SECONDS, CatalogManager
+from compiled_catalog import COMPILED_SUFFIX
+
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_LOCALE = 'en'
+TENANT_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+LOCALE_PATTERN = re.compile(r'^[a-z]{2,3}(-[A-Za-z0-9]{2,8})?$')
+ROUTE_SEGMENTS = frozenset({'api'})  # First segments of app routes that would also pass for a locale code
+TENANT_ENVIRON_KEY = 'catalog.tenant'
+LOCALE_ENVIRON_KEY = 'catalog.locale'
+
+
+def valid_tenant(name):
+    """Tenant names double as directory names, so they are restricted to [a-z0-9_-]."""
+    return isinstance(name, str) and bool(TENANT_PATTERN.match(name))
+
+
+def valid_locale(name):
+    return isinstance(name, str) and bool(LOCALE_PATTERN.match(name))
+
+
+class TenantPathMiddleware:
+    """Moves a /t/<tenant>[/<locale>] prefix from PATH_INFO into SCRIPT_NAME.
+
+    Routes then match as usual, and url_for() keeps the prefix in every link
+    it builds, so a whole assessment stays on its tenant's catalog.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        parts = environ.get('PATH_INFO', '').split('/', 4)
+        # ['', 't', tenant, maybe-locale, rest...]
+        if len(parts) >= 3 and parts[1] == 't' and valid_tenant(parts[2]):
+            consumed = 3
+            environ[TENANT_ENVIRON_KEY] = parts[2]
+            if len(parts) >= 4 and valid_locale(parts[3]) and parts[3] not in ROUTE_SEGMENTS:
+                environ[LOCALE_ENVIRON_KEY] = parts[3]
+                consumed = 4
+            prefix = '/'.join(parts[:consumed])
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + prefix
+            environ['PATH_INFO'] = environ['PATH_INFO'][len(prefix):] or '/'
+        return self.wsgi_app(environ, start_response)
+
+
+class CatalogRegistry:
+
+    def __init__(self, root, max_entries=DEFAULT_MAX_ENTRIES, default_locale=DEFAULT_LOCALE,
+                 tenant_domain=None, retain_seconds=DEFAULT_RETAIN_SECONDS, logger=None):
+        self.root = root
+        self.max_entries = max_entries
+        self.default_locale = default_locale
+        self.tenant_domain = tenant_domain.lower().lstrip('.') if tenant_domain else None
+        self.retain_seconds = retain_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self._managers = OrderedDict()  # (tenant, locale) -> CatalogManager, least recently used first
+        self._locales = {}  # tenant -> (directory mtime, tuple of locales)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._reload_listeners = []
+        self._watcher = None
+        self._stop_event = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return bool(self.root)
+
+    def add_reload_listener(self, callback):
+        """Registers callback(old_snapshot, new_snapshot) on every tenant manager, now and later."""
+        self._reload_listeners.append(callback)
+        with self._lock:
+            managers = list(self._managers.values())
+        for manager in managers:
+            manager.add_reload_listener(callback)
+
+    # --- Lookup ---
+
+    def locales(self, tenant):
+        """The locales a tenant has catalogs for (empty for an unknown tenant)."""
+        directory = os.path.join(self.root, tenant)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return ()
+        cached = self._locales.get(tenant)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        locales = tuple(sorted({
+            name[:-len(suffix)]
+            for name in os.listdir(directory)
+            for suffix in ('.json', COMPILED_SUFFIX)
+            if name.endswith(suffix) and valid_locale(name[:-len(suffix)])
+        }))
+        self._locales[tenant] = (mtime, locales)
+        return locales
+
+    def pick_locale(self, tenant, requested):
+        """First available match for the requested locales (exact, then language only), else the default."""
+        available = self.locales(tenant)
+        if not available:
+            return None
+        for locale in requested:
+            if locale in available:
+                return locale
+            language = locale.split('-', 1)[0]
+            if language in available:
+                return language
+        if self.default_locale in available:
+            return self.default_locale
+        return available[0]
+
+    def manager(self, tenant, locale):
+        """Returns the (lazily loaded) CatalogManager for a tenant's locale."""
+        key = (tenant, locale)
+        with self._lock:
+            manager = self._managers.get(key)
+            if manager is not None:
+                self._managers.move_to_end(key)
+                self.hits += 1
+                return manager
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        # Load outside the registry lock so one large catalog doesn't stall every other tenant
+        with load_lock:
+            with self._lock:
+                manager = self._managers.get(key)
+                if manager is not None:
+                    self.hits += 1
+                    return manager
+            manager = self._load(tenant, locale)
+            with self._lock:
+                self.misses += 1
+                self._managers[key] = manager
+                self._load_locks.pop(key, None)
+                while len(self._managers) > self.max_entries:
+                    (old_tenant, old_locale), _ = self._managers.popitem(last=False)
+                    self.evictions += 1
+                    self.logger.info(f"Unloaded catalog for tenant '{old_tenant}' ({old_locale}); cache is full.")
+        return manager
+
+    def _load(self, tenant, locale):
+        json_path = os.path.join(self.root, tenant, f'{locale}.json')
+        compiled_path = os.path.join(self.root, tenant, f'{locale}{COMPILED_SUFFIX}')
+        file_path = json_path if os.path.exists(json_path) or not os.path.exists(compiled_path) else compiled_path
+        manager = CatalogManager(file_path, retain_seconds=self.retain_seconds, logger=self.logger)
+        for callback in self._reload_listeners:
+            manager.add_reload_listener(callback)
+        if not manager.reload_if_changed():
+            self.logger.error(f"Catalog for tenant '{tenant}' ({locale}) could not be loaded from '{file_path}'.")
+        else:
+            self.logger.info(f"Loaded catalog for tenant '{tenant}' ({locale}): {len(manager.current.questions)} questions.")
+        return manager
+
+    def tenant(self, request):
+        """Returns the tenant a request names, or None.
+
+        Raises NotFound for an invalid tenant name, or for a /t/ URL when no catalog root is configured.
+        """
+        environ = request.environ
+        if not self.enabled:
+            if TENANT_ENVIRON_KEY in environ:
+                raise NotFound("Tenant catalogs are not enabled.")
+            return None
+        tenant = environ.get(TENANT_ENVIRON_KEY) or request.headers.get('X-Tenant') or self._subdomain_tenant(request.host)
+        if not tenant:
+            return None
+        if not valid_tenant(tenant):
+            raise NotFound(f"Unknown tenant '{tenant}'.")
+        return tenant
+
+    def resolve(self, request, tenant=None):
+        """Returns the tenant's CatalogManager for a request, or None if it names no tenant.
+
+        tenant is the request's tenant if the caller already has it (from tenant()). Raises NotFound
+        for an unknown tenant, or for a /t/ URL when no catalog root is configured.
+        """
+        tenant = tenant or self.tenant(request)
+        if tenant is None:
+            return None
+
+        environ = request.environ
+        requested = [environ.get(LOCALE_ENVIRON_KEY), request.headers.get('X-Locale'), request.args.get('lang')]
+        requested = [locale for locale in requested if valid_locale(locale)]
+        requested += [locale for locale, _ in request.accept_languages if valid_locale(locale)]
+        locale = self.pick_locale(tenant, requested)
+        if locale is None:
+            raise NotFound(f"Unknown tenant '{tenant}'.")
+        return self.manager(tenant, locale)
+
+    def _subdomain_tenant(self, host):
+        if not self.tenant_domain or not host:
+            return None
+        host = host.split(':', 1)[0].lower()
+        suffix = '.' + self.tenant_domain
+        if host.endswith(suffix):
+            return host[:-len(suffix)]
+        return None
+
+    # --- Housekeeping ---
+
+    def live_versions(self):
+        """Catalog versions any loaded tenant manager may still serve."""
+        with self._lock:
+            managers = list(self._managers.values())
+        versions = []
+        for manager in managers:
+            versions.append(manager.current.version)
+            versions.extend(manager.retained_versions)
+        return versions
+
+    def reload_changed(self):
+        with self._lock:
+            managers = list(self._managers.values())
+        for manager in managers:
+            manager.reload_if_changed()
+            manager.expire_retained()
+
+    def _watch(self, interval):
+        while not self._stop_event.wait(interval):
+            try:
+                self.reload_changed()
+            except Exception as e:  # Keep watching; one bad poll must not stop reloads for good
+                self.logger.error(f"Tenant catalog watcher error: {e}")
+
+    def start_watcher(self, interval=DEFAULT_POLL_INTERVAL):
+        """Polls every loaded tenant catalog on one daemon thread."""
+        if not self.enabled or (self._watcher is not None and self._watcher.is_alive()):
+            return self._watcher
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='tenant-catalog-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watcher(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def __len__(self):
+        return len(self._managers)
@@ -0,0 +1,226 @@
+"""Binary, precompiled catalog snapshots.
+
+`flask --app main compile-catalog` turns learning_data.json into
+learning_data.catalog: a validated, checksummed file holding every string
+once in a table plus fixed-width index arrays (style -> strings, question
+-> text and style) and the dense scoring arrays (question weights and
+reverse-keying flags, style normalization), the catalog version, the JSON's ETag and the
+pre-serialized /api/v1/catalog body. Loading it is an mmap, a CRC check,
+one decode+split of the string table and a few array reads. It skips
+json.loads, the transform passes, re-serializing the API body and hashing.
+
+Layout (little-endian):
+    header  (HEADER below)
+    strings NUL-separated UTF-8, padded to 4 bytes
+    styles  8 x u32 per style: name, category, description (string ids),
+            first question, question count, first recommendation, recommendation count,
+            normalization (index into scoring.NORMALIZATIONS)
+    recs    u32 string id per recommendation
+    qtext   u32 string id per question
+    qstyle  u32 style index per question
+    qflags  u32 per question, bit 0 set for reverse-keyed questions
+    qweight f64 weight per question
+    api     pre-serialized /api/v1/catalog body
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections import namedtuple
+
+from scoring import DEFAULT_NORMALIZATION, DEFAULT_WEIGHT, NORMALIZATIONS
+
+MAGIC = b'LSCAT\x00\x00\x01'
+FORMAT_VERSION = 3
+COMPILED_SUFFIX = '.catalog'
+# magic, format, crc32 of everything after the header, catalog version, sha256 of the JSON source,
+# source size, source mtime_ns, styles, questions, recommendations, string table bytes, API body bytes
+HEADER = struct.Struct('<8sII8s32sqqIIIII')
+STYLE_FIELDS = 8
+REVERSED_FLAG = 1
+
+Header = namedtuple('Header', ['magic', 'format_version', 'crc32', 'version', 'source_sha256', 'source_size',
+                               'source_mtime_ns', 'style_count', 'question_count', 'recommendation_count',
+                               'strings_length', 'api_body_length'])
+CompiledCatalog = namedtuple('CompiledCatalog', ['header', 'learning_styles', 'questions', 'api_body'])
+
+
+class CompiledCatalogError(ValueError):
+    """The file is not a compiled catalog this code can read, or it is corrupt."""
+
+
+def compiled_path_for(json_path):
+    return os.path.splitext(json_path)[0] + COMPILED_SUFFIX
+
+
+def is_compiled_path(path):
+    return path.endswith(COMPILED_SUFFIX)
+
+
+def _pad4(length):
+    return (-length) % 4
+
+
+def _u32_bytes(values):
+    packed = array('I', values)
+    if packed.itemsize != 4:
+        return struct.pack(f'<{len(values)}I', *values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _f64_bytes(values):
+    packed = array('d', values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _f64_array(buffer):
+    values = array('d')
+    values.frombytes(buffer)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _u32_array(buffer):
+    values = array('I')
+    if values.itemsize != 4:
+        return list(struct.unpack(f'<{len(buffer) // 4}I', buffer))
+    values.frombytes(buffer)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def write_compiled(snapshot, output_path, source_sha256, source_size, source_mtime_ns):
+    """Serializes a CatalogSnapshot. Writes to a temporary file and renames, so readers never see a partial file."""
+    string_ids = {}
+
+    def intern(text):
+        if '\x00' in text:
+            raise CompiledCatalogError(f"Catalog strings may not contain NUL characters: {text!r}")
+        if text not in string_ids:
+            string_ids[text] = len(string_ids)
+        return string_ids[text]
+
+    style_rows = []
+    recommendation_ids = []
+    question_start = 0
+    for name, style in snapshot.learning_styles.items():
+        question_count = len(style['questions'])
+        style_rows += [intern(name), intern(style['category']), intern(style['description']),
+                       question_start, question_count, len(recommendation_ids), len(style['recommendations']),
+                       NORMALIZATIONS.index(style.get('normalization', DEFAULT_NORMALIZATION))]
+        recommendation_ids += [intern(rec) for rec in style['recommendations']]
+        question_start += question_count
+    style_index = {name: i for i, name in enumerate(snapshot.learning_styles)}
+    question_text_ids = [intern(question['text']) for question in snapshot.questions]
+    question_style_ids = [style_index[question['style']] for question in snapshot.questions]
+    question_flags = [REVERSED_FLAG if question.get('reverse') else 0 for question in snapshot.questions]
+    question_weights = [question.get('weight', DEFAULT_WEIGHT) for question in snapshot.questions]
+
+    strings = '\x00'.join(string_ids).encode('utf-8')
+    body = b''.join([
+        strings, b'\x00' * _pad4(len(strings)),
+        _u32_bytes(style_rows),
+        _u32_bytes(recommendation_ids),
+        _u32_bytes(question_text_ids),
+        _u32_bytes(question_style_ids),
+        _u32_bytes(question_flags),
+        _f64_bytes(question_weights),
+        snapshot.api_body,
+    ])
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, zlib.crc32(body), snapshot.version.encode('ascii'),
+                         bytes.fromhex(source_sha256), source_size, source_mtime_ns,
+                         len(snapshot.learning_styles), len(snapshot.questions), len(recommendation_ids),
+                         len(strings), len(snapshot.api_body))
+
+    temp_path = f"{output_path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+    os.replace(temp_path, output_path)
+    return HEADER.size + len(body)
+
+
+def _parse_header(buffer):
+    if len(buffer) < HEADER.size:
+        raise CompiledCatalogError("File is too short to be a compiled catalog.")
+    header = Header(*HEADER.unpack_from(buffer))
+    if header.magic != MAGIC:
+        raise CompiledCatalogError("Not a compiled catalog (bad magic number).")
+    if header.format_version != FORMAT_VERSION:
+        raise CompiledCatalogError(f"Unsupported compiled catalog format {header.format_version}; recompile it.")
+    return header
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        return _parse_header(f.read(HEADER.size))
+
+
+def read_compiled(path):
+    """Maps and validates a compiled catalog. Returns a CompiledCatalog; raises CompiledCatalogError."""
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            raise CompiledCatalogError("Compiled catalog is empty.")
+    with mapped:
+        header = _parse_header(mapped)
+        n_styles, n_questions, n_recs = header.style_count, header.question_count, header.recommendation_count
+        offset = HEADER.size
+        strings_end = offset + header.strings_length
+        styles_start = strings_end + _pad4(header.strings_length)
+        recs_start = styles_start + 4 * STYLE_FIELDS * n_styles
+        qtext_start = recs_start + 4 * n_recs
+        qstyle_start = qtext_start + 4 * n_questions
+        qflags_start = qstyle_start + 4 * n_questions
+        qweight_start = qflags_start + 4 * n_questions
+        api_start = qweight_start + 8 * n_questions
+        end = api_start + header.api_body_length
+        if len(mapped) != end:
+            raise CompiledCatalogError(f"Compiled catalog is {len(mapped)} bytes, expected {end}.")
+        if zlib.crc32(memoryview(mapped)[offset:]) != header.crc32:
+            raise CompiledCatalogError("Compiled catalog checksum mismatch.")
+
+        strings = mapped[offset:strings_end].decode('utf-8').split('\x00') if header.strings_length else []
+        style_rows = _u32_array(mapped[styles_start:recs_start])
+        recommendation_ids = _u32_array(mapped[recs_start:qtext_start])
+        question_text_ids = _u32_array(mapped[qtext_start:qstyle_start])
+        question_style_ids = _u32_array(mapped[qstyle_start:qflags_start])
+        question_flags = _u32_array(mapped[qflags_start:qweight_start])
+        question_weights = _f64_array(mapped[qweight_start:api_start])
+        api_body = mapped[api_start:end]
+
+    try:
+        style_names = []
+        learning_styles = {}
+        for i in range(n_styles):
+            name, category, description, q_start, q_count, rec_start, rec_count, normalization = \
+                style_rows[i * STYLE_FIELDS:(i + 1) * STYLE_FIELDS]
+            style_names.append(strings[name])
+            learning_styles[strings[name]] = {
+                "questions": [strings[text_id] for text_id in question_text_ids[q_start:q_start + q_count]],
+                "recommendations": [strings[rec_id] for rec_id in recommendation_ids[rec_start:rec_start + rec_count]],
+                "category": strings[category],
+                "description": strings[description],
+                "normalization": NORMALIZATIONS[normalization]
+            }
+        questions = []
+        for i, (text_id, style_id, flags, weight) in enumerate(
+                zip(question_text_ids, question_style_ids, question_flags, question_weights)):
+            question = {"id": i + 1, "text": strings[text_id], "style": style_names[style_id]}
+            if weight != DEFAULT_WEIGHT:
+                question["weight"] = int(weight) if weight.is_integer() else weight
+            if flags & REVERSED_FLAG:
+                question["reverse"] = True
+            questions.append(question)
+    except IndexError:
+        raise CompiledCatalogError("Compiled catalog has an index out of range.")
+    return CompiledCatalog(header, learning_styles, questions, api_body)
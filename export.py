@@ -0,0 +1,251 @@
+"""Streaming report generators for completed results.
+
+Every exporter is a generator of text chunks, so a Flask Response can
+stream it and bulk exports never hold a whole report in memory. A result
+is a dict with 'scores' (style -> total), 'percentages' and 'max_scores'
+(style -> normalized score and highest possible total; absent from results
+stored by older versions) and 'primary_styles'; catalog
+text (descriptions, categories, recommendations) always comes from the
+learning_styles dict passed in, i.e. the live catalog. Cohort exports are
+the exception: each row arrives with the percentages and recommendations
+of the catalog version that scored it.
+"""
+import csv
+import io
+import json
+from collections import Counter
+from html import escape
+
+REMINDER = "Using techniques from multiple learning preferences often leads to better outcomes."
+
+
+def _style_info(learning_styles, style_name):
+    return learning_styles.get(style_name, {})
+
+
+def _score_text(result, style_name):
+    """'9/10 (90.0%)': the total out of the style's maximum, and its normalized percentage."""
+    score_value = result.get('scores', {}).get(style_name)
+    maximum = result.get('max_scores', {}).get(style_name)
+    percentage = result.get('percentages', {}).get(style_name)
+    text = f"{score_value}/{maximum}" if maximum is not None else f"{score_value}"
+    return f"{text} ({percentage}%)" if percentage is not None else text
+
+
+def primary_recommendations(result, learning_styles):
+    return {
+        style_name: _style_info(learning_styles, style_name).get('recommendations', [])
+        for style_name in result.get('primary_styles', []) if style_name in learning_styles
+    }
+
+
+def iter_text(result, learning_styles):
+    scores = result.get('scores', {})
+    primary_styles = result.get('primary_styles', [])
+    recommendations = primary_recommendations(result, learning_styles)
+
+    yield "Learning Style Assessment Results\n"
+    yield "=================================\n\n"
+
+    yield "Primary Learning Style(s):\n"
+    if primary_styles:
+        for style_name in primary_styles:
+            description = _style_info(learning_styles, style_name).get('description', 'N/A')
+            yield f"- {style_name}: {description}\n"
+    else:
+        yield "- No primary style identified.\n"
+    yield "\n"
+
+    yield "All Scores:\n"
+    if scores:
+        for style_name in scores:
+            info = _style_info(learning_styles, style_name)
+            yield f"- {style_name} ({info.get('category', 'N/A')}): {_score_text(result, style_name)}\n"
+            yield f"  Description: {info.get('description', 'N/A')}\n"
+    else:
+        yield "- No scores available.\n"
+    yield "\n"
+
+    yield "Recommendations:\n"
+    if recommendations:
+        for style_name, rec_list in recommendations.items():
+            yield f"\nFor {style_name} Learners:\n"
+            if rec_list:
+                for rec in rec_list:
+                    yield f"- {rec}\n"
+            else:
+                yield "- No specific recommendations for this style.\n"
+    else:
+        yield "- No recommendations available.\n"
+
+    yield f"\n\nReminder: {REMINDER}"
+
+
+class _CsvLine:
+    """Formats one CSV row at a time through a reusable buffer."""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def __call__(self, row):
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(row)
+        return self._buffer.getvalue()
+
+
+def iter_csv(result, learning_styles):
+    line = _CsvLine()
+    primary_styles = result.get('primary_styles', [])
+    percentages = result.get('percentages', {})
+    max_scores = result.get('max_scores', {})
+    yield line(['style', 'category', 'score', 'max_score', 'percentage', 'primary'])
+    for style_name, score_value in result.get('scores', {}).items():
+        category = _style_info(learning_styles, style_name).get('category', 'N/A')
+        yield line([style_name, category, score_value, max_scores.get(style_name, ''), percentages.get(style_name, ''),
+                    'yes' if style_name in primary_styles else 'no'])
+
+
+def _result_document(result, learning_styles):
+    return {
+        'primary_styles': result.get('primary_styles', []),
+        'scores': [
+            {
+                'style': style_name,
+                'category': _style_info(learning_styles, style_name).get('category', 'N/A'),
+                'description': _style_info(learning_styles, style_name).get('description', 'N/A'),
+                'score': score_value,
+                'max_score': result.get('max_scores', {}).get(style_name),
+                'percentage': result.get('percentages', {}).get(style_name)
+            }
+            for style_name, score_value in result.get('scores', {}).items()
+        ],
+        'recommendations': primary_recommendations(result, learning_styles)
+    }
+
+
+def iter_json(result, learning_styles):
+    yield json.dumps(_result_document(result, learning_styles), indent=2)
+
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>Learning Style Assessment Results</title>
+<style>
+    body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; color: #424242; margin: 2cm; }
+    h1 { color: #00695c; }
+    h2 { color: #00796b; border-bottom: 1px solid #b2dfdb; padding-bottom: 4px; }
+    table { border-collapse: collapse; width: 100%; }
+    th, td { text-align: left; padding: 6px 8px; border-bottom: 1px solid #e0e0e0; }
+    .primary { font-weight: bold; }
+    @page { size: A4; margin: 2cm; }
+    @media print { body { margin: 0; } h2 { page-break-after: avoid; } table, ul { page-break-inside: avoid; } }
+</style>
+</head>
+<body>
+"""
+
+
+def iter_html(result, learning_styles):
+    """Standalone, print-ready HTML (browsers' "Save as PDF" produces the PDF report)."""
+    scores = result.get('scores', {})
+    primary_styles = result.get('primary_styles', [])
+
+    yield _HTML_HEAD
+    yield "<h1>Learning Style Assessment Results</h1>\n<h2>Primary Learning Style(s)</h2>\n"
+    if primary_styles:
+        yield "<ul>\n"
+        for style_name in primary_styles:
+            description = _style_info(learning_styles, style_name).get('description', 'N/A')
+            yield f"<li><strong>{escape(style_name)}</strong>: {escape(description)}</li>\n"
+        yield "</ul>\n"
+    else:
+        yield "<p>No primary style identified.</p>\n"
+
+    yield "<h2>All Scores</h2>\n<table>\n<tr><th>Style</th><th>Category</th><th>Score</th></tr>\n"
+    for style_name in scores:
+        category = _style_info(learning_styles, style_name).get('category', 'N/A')
+        css_class = ' class="primary"' if style_name in primary_styles else ''
+        yield (f"<tr{css_class}><td>{escape(style_name)}</td><td>{escape(category)}</td>"
+               f"<td>{_score_text(result, style_name)}</td></tr>\n")
+    yield "</table>\n<h2>Recommendations</h2>\n"
+
+    recommendations = primary_recommendations(result, learning_styles)
+    if not recommendations:
+        yield "<p>No recommendations available.</p>\n"
+    for style_name, rec_list in recommendations.items():
+        yield f"<h3>For {escape(style_name)} Learners</h3>\n<ul>\n"
+        for rec in rec_list or ["No specific recommendations for this style."]:
+            yield f"<li>{escape(rec)}</li>\n"
+        yield "</ul>\n"
+    yield f"<p><em>Reminder: {escape(REMINDER)}</em></p>\n</body>\n</html>\n"
+
+
+# format -> (mimetype, file extension, generator)
+REPORT_FORMATS = {
+    'txt': ('text/plain', 'txt', iter_text),
+    'csv': ('text/csv', 'csv', iter_csv),
+    'json': ('application/json', 'json', iter_json),
+    'html': ('text/html', 'html', iter_html),
+}
+
+
+def _counted_primary_styles(results, counts):
+    """Passes results through, tallying their primary styles into counts."""
+    for result in results:
+        counts.update(result.get('primary_styles', []))
+        yield result
+
+
+def iter_cohort_csv(results, style_names):
+    """One row per respondent, then a summary of how many respondents have each primary style.
+
+    results yields dicts with 'respondent_id', 'catalog_version', 'scores', 'primary_styles' and, when
+    the catalog version that scored them is still loaded, 'percentages' and 'recommendations'
+    (primary style -> recommendation texts). The summary follows the rows after a blank line.
+    """
+    line = _CsvLine()
+    counts = Counter()
+    yield line(['respondent_id', 'catalog_version', 'primary_styles'] + list(style_names)
+               + [f"{style_name} %" for style_name in style_names] + ['recommendations'])
+    for result in _counted_primary_styles(results, counts):
+        scores = result.get('scores', {})
+        percentages = result.get('percentages', {})
+        recommendations = [rec for rec_list in result.get('recommendations', {}).values() for rec in rec_list]
+        yield line([result.get('respondent_id', ''), result.get('catalog_version', ''),
+                    '|'.join(result.get('primary_styles', []))]
+                   + [scores.get(style_name, '') for style_name in style_names]
+                   + [percentages.get(style_name, '') for style_name in style_names]
+                   + ['|'.join(recommendations)])
+    yield line([])
+    yield line(['primary_style', 'respondents'])
+    for style_name, count in counts.most_common():
+        yield line([style_name, count])
+
+
+def iter_cohort_jsonl(results, style_names):
+    """One JSON object per respondent, then a final {"summary": ...} line with the primary style counts."""
+    counts = Counter()
+    respondents = 0
+    for result in _counted_primary_styles(results, counts):
+        respondents += 1
+        yield json.dumps({
+            'respondent_id': result.get('respondent_id'),
+            'catalog_version': result.get('catalog_version'),
+            'scores': {style_name: result.get('scores', {}).get(style_name) for style_name in style_names},
+            'percentages': {style_name: result.get('percentages', {}).get(style_name) for style_name in style_names},
+            'primary_styles': result.get('primary_styles', []),
+            'recommendations': result.get('recommendations', {})
+        }, separators=(',', ':')) + '\n'
+    yield json.dumps({'summary': {'respondents': respondents, 'primary_styles': dict(counts.most_common())}},
+                     separators=(',', ':')) + '\n'
+
+
+# format -> (mimetype, file extension, generator)
+COHORT_FORMATS = {
+    'csv': ('text/csv', 'csv', iter_cohort_csv),
+    'jsonl': ('application/x-ndjson', 'jsonl', iter_cohort_jsonl),
+}
@@ -0,0 +1,207 @@
+"""Background export jobs for large reports.
+
+submit() returns a job right away; a small, fixed pool of worker threads
+renders queued jobs into artifact files. The pending queue is bounded, so
+once it is full submit() raises ExportQueueFull instead of piling up work,
+and at most `workers` exports run at once next to interactive requests.
+
+Each job's state lives in <directory>/<job_id>.state next to its artifact,
+so any worker process behind the same directory can report status and
+serve the download, not just the one running the job. Finished artifacts
+(and their state) are deleted `ttl` seconds after the job ends.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+
+from process_local import ProcessThreads
+
+DEFAULT_WORKERS = 1
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_TTL = 60 * 60
+PROGRESS_INTERVAL = 0.5  # Seconds between progress writes while a job runs
+STATE_SUFFIX = '.state'
+JOB_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class ExportQueueFull(Exception):
+    """Too many exports are already waiting; the caller should retry later."""
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ExportJobs:
+
+    def __init__(self, directory, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, ttl=DEFAULT_TTL,
+                 logger=None, clock=time.time):
+        self.directory = directory
+        self.workers = workers
+        self.queue_size = queue_size
+        self.ttl = ttl
+        self.logger = logger or logging.getLogger(__name__)
+        self._clock = clock
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._queue = None
+        # Jobs already queued stay with the surviving threads, so the pool is not restarted if one dies
+        self._pool = ProcessThreads(self._start_workers, restart_dead=False)
+        os.makedirs(directory, exist_ok=True)
+
+    def _ensure_workers(self):
+        self._pool.ensure()
+
+    def _start_workers(self, forked):
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        threads = [threading.Thread(target=self._run_worker, args=(self._queue,), name=f'export-worker-{i}', daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def flush(self):
+        """Blocks until every job submitted so far in this process has finished."""
+        if self._queue is not None and self._pool.started:
+            self._queue.join()
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None and self._pool.started else 0
+
+    # --- Job files ---
+
+    def _state_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}{STATE_SUFFIX}')
+
+    def _write_state(self, job):
+        temp_path = f"{self._state_path(job['id'])}.tmp{os.getpid()}-{threading.get_ident()}"
+        with open(temp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(temp_path, self._state_path(job['id']))
+
+    def _read_state(self, job_id):
+        try:
+            with open(self._state_path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # --- Public API ---
+
+    def submit(self, records, render, extension, total=None, **info):
+        """Queues an export and returns its state.
+
+        records is an iterable of rows (consumed on the worker thread, so it should be lazy),
+        render(records) yields text chunks and total is the expected row count, if known.
+        Extra keyword arguments are kept in the job state (e.g. cohort and format).
+        Raises ExportQueueFull when the pending queue is full.
+        """
+        self._ensure_workers()
+        self.purge_expired()
+        now = self._clock()
+        job = dict(info, id=secrets.token_urlsafe(16), status=QUEUED, extension=extension, rows=0, total=total,
+                   created_at=now, started_at=None, finished_at=None, expires_at=None, error=None, pid=os.getpid())
+        self._write_state(job)
+        try:
+            self._queue.put_nowait((job, records, render))
+        except queue.Full:
+            os.remove(self._state_path(job['id']))
+            self.rejected += 1
+            raise ExportQueueFull(f"{self.queue_size} exports are already waiting.")
+        return job
+
+    def status(self, job_id):
+        """Returns a job's state, or None for an unknown or expired job."""
+        if not isinstance(job_id, str) or not JOB_ID_PATTERN.match(job_id):
+            return None
+        job = self._read_state(job_id)
+        if job is None:
+            return None
+        if job['status'] in (QUEUED, RUNNING) and not _pid_alive(job['pid']):
+            # The process running it is gone (restart or crash); the job will never finish
+            job.update(status=FAILED, error="The export was interrupted.", finished_at=self._clock(),
+                       expires_at=self._clock() + self.ttl)
+            self._write_state(job)
+        if job['expires_at'] is not None and job['expires_at'] <= self._clock():
+            self._remove(job)
+            return None
+        return job
+
+    def artifact_path(self, job):
+        return os.path.join(self.directory, f"{job['id']}.{job['extension']}")
+
+    def purge_expired(self):
+        """Deletes artifacts and state of jobs whose TTL has passed. Returns how many were removed."""
+        removed = 0
+        now = self._clock()
+        for name in os.listdir(self.directory):
+            if not name.endswith(STATE_SUFFIX):
+                continue
+            job = self._read_state(name[:-len(STATE_SUFFIX)])
+            if job is not None and job['expires_at'] is not None and job['expires_at'] <= now:
+                self._remove(job)
+                removed += 1
+        return removed
+
+    def _remove(self, job):
+        for path in (self.artifact_path(job), self._state_path(job['id'])):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # --- Worker ---
+
+    def _run_worker(self, work_queue):
+        while True:
+            job, records, render = work_queue.get()
+            try:
+                self._run(job, records, render)
+            finally:
+                work_queue.task_done()
+
+    def _counted(self, job, records):
+        last_write = self._clock()
+        for record in records:
+            job['rows'] += 1
+            if self._clock() - last_write >= PROGRESS_INTERVAL:
+                self._write_state(job)
+                last_write = self._clock()
+            yield record
+
+    def _run(self, job, records, render):
+        job.update(status=RUNNING, started_at=self._clock())
+        self._write_state(job)
+        artifact_path = self.artifact_path(job)
+        temp_path = f"{artifact_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                for chunk in render(self._counted(job, records)):
+                    f.write(chunk)
+            os.replace(temp_path, artifact_path)
+            job.update(status=DONE)
+            self.completed += 1
+        except Exception as e:
+            self.logger.error(f"Export job {job['id']} failed: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            job.update(status=FAILED, error="The export failed.")
+            self.failed += 1
+        finished_at = self._clock()
+        job.update(finished_at=finished_at, expires_at=finished_at + self.ttl)
+        self._write_state(job)
@@ -1,70 +1,335 @@
 
-from flask import Flask, render_template, request, redirect, url_for, session, Response
+from flask import Flask, render_template, request, redirect, url_for, session, Response, jsonify, g, send_file
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import json
+import threading
+import click
+import batch_scoring
+import adaptive
+import analytics
+import assets
+import export
+import export_jobs
+import rate_limit
+from answer_codec import MAX_SCORE, MIN_SCORE, answered_count, decode_answers, empty_answers, encode_answers
+from catalog import DEFAULT_POLL_INTERVAL, DEFAULT_RETAIN_SECONDS, CatalogManager, CatalogSnapshot, compile_catalog
+from catalog_registry import DEFAULT_LOCALE, DEFAULT_MAX_ENTRIES as DEFAULT_CATALOG_CACHE_SIZE, CatalogRegistry, TenantPathMiddleware
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, AppMetrics
+from page_cache import DEFAULT_MAX_ENTRIES as DEFAULT_PAGE_CACHE_SIZE, PageCache
+from progress_store import DEFAULT_TTL as DEFAULT_PROGRESS_TTL, ProgressStore, format_token, new_resume_token, normalize_token
+from result_store import create_result_store
+from warehouse import BUCKET_SECONDS, DEFAULT_TENANT, ResultsWarehouse, valid_cohort
 
 app = Flask(__name__)
 # Ensure FLASK_SECRET_KEY is set in your environment for production, 
 # os.urandom(24) is a fallback for development.
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', os.urandom(24))
 
-# Global variables for learning data
-LEARNING_STYLES_DATA = []
-learning_styles = {}
-ALL_QUESTIONS = [] # Flat list of all questions
-
-def load_and_transform_data(file_path='learning_data.json'):
-    """Loads data from JSON file and transforms it, and populates ALL_QUESTIONS."""
-    global LEARNING_STYLES_DATA, learning_styles, ALL_QUESTIONS
+# Fingerprinted, precompressed static files from `flask --app main build-assets`, when built
+static_assets = assets.StaticAssets(app.static_folder, logger=app.logger)
+static_assets.install(app)
+
+# The loaded catalog lives in immutable snapshots. Handlers read catalog_manager.current
+# once per request (or the snapshot a session's answers were recorded against), so a
+# hot reload never changes the catalog underneath an in-flight request.
+catalog_manager = CatalogManager(
+    os.environ.get('LEARNING_DATA_PATH', 'learning_data.json'),
+    retain_seconds=int(os.environ.get('CATALOG_RETAIN_SECONDS', DEFAULT_RETAIN_SECONDS)),
+    logger=app.logger
+)
+
+# Optional per-tenant, per-locale catalogs under CATALOG_ROOT/<tenant>/<locale>.json, loaded on
+# first use and kept in an LRU. Requests that name no tenant use catalog_manager above.
+catalog_registry = CatalogRegistry(
+    os.environ.get('CATALOG_ROOT'),
+    max_entries=int(os.environ.get('CATALOG_CACHE_SIZE', DEFAULT_CATALOG_CACHE_SIZE)),
+    default_locale=os.environ.get('CATALOG_DEFAULT_LOCALE', DEFAULT_LOCALE),
+    tenant_domain=os.environ.get('TENANT_DOMAIN'),
+    retain_seconds=int(os.environ.get('CATALOG_RETAIN_SECONDS', DEFAULT_RETAIN_SECONDS)),
+    logger=app.logger
+)
+# Per-client token buckets on the assessment endpoints. Off until RATE_LIMITS is set: 'on' for
+# DEFAULT_LIMITS, plus endpoint=count/period entries to override them. Clients are told apart by
+# address, so behind a proxy set TRUSTED_PROXY_HOPS too (see ProxyFix below). Over-limit requests get
+# a prebuilt 429 without touching the session or templates. Buckets are per process unless
+# RATE_LIMIT_STORE names a SQLite file shared by all workers. Tests (TESTING) are not limited.
+rate_limiter = rate_limit.RateLimiter(
+    rate_limit.parse_limits(os.environ.get('RATE_LIMITS', 'off'), rate_limit.parse_limits(rate_limit.DEFAULT_LIMITS)),
+    store=rate_limit.SQLiteBuckets(os.environ['RATE_LIMIT_STORE'], logger=app.logger)
+    if os.environ.get('RATE_LIMIT_STORE') else None
+)
+app.wsgi_app = rate_limit_middleware = rate_limit.RateLimitMiddleware(
+    app.wsgi_app, app.url_map, rate_limiter,
+    enabled=lambda: not app.testing,
+    on_reject=lambda endpoint: app_metrics.rate_limited.inc(endpoint)
+)
+
+# /t/<tenant>[/<locale>]/... URLs: the prefix moves into SCRIPT_NAME, so url_for() keeps it.
+# Wrapped outside the rate limiter, so the limiter matches the un-prefixed path.
+app.wsgi_app = TenantPathMiddleware(app.wsgi_app)
+
+# Behind TRUSTED_PROXY_HOPS reverse proxies (e.g. 1 on Cloud Run), take the client address, scheme and
+# host from their X-Forwarded-* headers. Outermost, so the rate limiter sees the real client address.
+# With the default of 0 the headers are ignored, since anyone could send them.
+trusted_proxy_hops = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+app.wsgi_app = proxy_fix = ProxyFix(app.wsgi_app, x_for=trusted_proxy_hops, x_proto=trusted_proxy_hops,
+                                    x_host=trusted_proxy_hops)
+
+# Rendered question pages, keyed on (catalog version, question_num, existing_score, script root).
+# Pages for catalog versions that no manager still serves are dropped on reload.
+page_cache = PageCache(int(os.environ.get('PAGE_CACHE_SIZE', DEFAULT_PAGE_CACHE_SIZE)))
+
+def retain_live_pages(old, new):
+    page_cache.retain_versions([catalog_manager.current.version] + catalog_manager.retained_versions
+                               + catalog_registry.live_versions())
+
+catalog_manager.add_reload_listener(retain_live_pages)
+catalog_registry.add_reload_listener(retain_live_pages)
+
+# Completed results live server-side; the session cookie only carries the result ID.
+result_store = create_result_store()
+
+# In-progress attempts are mirrored server-side under a short resume code, so a student can
+# close the tab and continue later. Answers are coalesced in memory and written about once a second.
+progress_store = ProgressStore(
+    os.environ.get('PROGRESS_STORE_PATH', os.path.join(app.instance_path, 'progress.db')),
+    ttl=int(os.environ.get('PROGRESS_TTL', DEFAULT_PROGRESS_TTL)),
+    logger=app.logger
+)
+
+# Every completed result is also appended to the warehouse for cohort reporting.
+# Writes are queued and batched on a background thread, so requests never wait on disk.
+results_warehouse = ResultsWarehouse(
+    os.environ.get('RESULTS_WAREHOUSE_PATH', os.path.join(app.instance_path, 'results.db')),
+    logger=app.logger
+)
+
+# Item statistics (means, item-rest correlations, Cronbach's alpha, style correlations) per catalog
+# version, folded in incrementally from the warehouse as /api/v1/item-analysis is polled.
+response_analytics = analytics.ResponseAnalytics()
+
+# Cohort exports run on a small background pool; artifacts are kept for EXPORT_TTL seconds.
+# EXPORT_QUEUE_SIZE bounds the waiting jobs, so a burst of exports is refused rather than queued forever.
+cohort_exports = export_jobs.ExportJobs(
+    os.environ.get('EXPORT_DIR', os.path.join(app.instance_path, 'exports')),
+    workers=int(os.environ.get('EXPORT_WORKERS', export_jobs.DEFAULT_WORKERS)),
+    queue_size=int(os.environ.get('EXPORT_QUEUE_SIZE', export_jobs.DEFAULT_QUEUE_SIZE)),
+    ttl=int(os.environ.get('EXPORT_TTL', export_jobs.DEFAULT_TTL)),
+    logger=app.logger
+)
+
+# Per-endpoint latency, template render time, session cookie cost and error counters, served at /metrics
+app_metrics = AppMetrics()
+app_metrics.instrument(app)
+app_metrics.registry.add_collector(lambda: [
+    ('page_cache_hits_total', 'counter', 'Question pages served from the page cache.', page_cache.hits),
+    ('page_cache_misses_total', 'counter', 'Question pages rendered on a cache miss.', page_cache.misses),
+    ('page_cache_entries', 'gauge', 'Rendered pages currently cached.', len(page_cache)),
+    ('warehouse_dropped_results_total', 'counter', 'Results dropped because the warehouse queue was full.', results_warehouse.dropped),
+    ('item_analysis_catalogs', 'gauge', 'Catalog versions with item statistics in memory.', len(response_analytics)),
+    ('export_jobs_pending', 'gauge', 'Export jobs waiting for a worker.', cohort_exports.pending),
+    ('export_jobs_completed_total', 'counter', 'Export jobs finished successfully.', cohort_exports.completed),
+    ('export_jobs_failed_total', 'counter', 'Export jobs that failed.', cohort_exports.failed),
+    ('export_jobs_rejected_total', 'counter', 'Export submissions refused because the queue was full.', cohort_exports.rejected),
+    ('progress_saves_total', 'counter', 'In-progress answers handed to the progress store.', progress_store.saves),
+    ('progress_writes_total', 'counter', 'Attempt rows written after coalescing.', progress_store.writes),
+    ('progress_pending', 'gauge', 'Attempts waiting to be written.', progress_store.pending),
+    ('progress_expired_total', 'counter', 'Abandoned attempts removed by the compactor.', progress_store.expired),
+    ('rate_limit_buckets', 'gauge', 'Client token buckets currently tracked by the rate limiter.', len(rate_limiter.store)),
+    ('rate_limit_evicted_total', 'counter', 'Buckets dropped by the rate limiter (idle, or to stay within its memory bound).', rate_limiter.store.evicted),
+    ('tenant_catalogs_loaded', 'gauge', 'Tenant catalogs currently loaded.', len(catalog_registry)),
+    ('tenant_catalog_hits_total', 'counter', 'Tenant catalog lookups served from memory.', catalog_registry.hits),
+    ('tenant_catalog_misses_total', 'counter', 'Tenant catalogs loaded from disk.', catalog_registry.misses),
+    ('tenant_catalog_evictions_total', 'counter', 'Tenant catalogs unloaded to stay within CATALOG_CACHE_SIZE.', catalog_registry.evictions),
+])
+
+# Adaptive mode stops once the primary style is certain, or ahead with this confidence (1 = only when certain)
+ADAPTIVE_CONFIDENCE = float(os.environ.get('ADAPTIVE_CONFIDENCE', adaptive.DEFAULT_CONFIDENCE))
+
+# Set by serve.py when a worker starts shutting down, so /readyz takes it out of rotation
+draining = threading.Event()
+
+def load_and_transform_data(file_path=None):
+    """Loads the catalog from a JSON file, builds a snapshot and makes it current. Returns the snapshot."""
+    file_path = file_path or catalog_manager.file_path
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
-        transformed_styles = {
-            item['style_name']: {
-                "questions": item.get("questions", []),
-                "recommendations": item.get("recommendations", []),
-                "category": item.get("category", "N/A"),
-                "description": item.get("description", "N/A")
-            }
-            for item in data
-        }
-        LEARNING_STYLES_DATA = data
-        learning_styles = transformed_styles
-        
-        # Populate ALL_QUESTIONS
-        temp_questions = []
-        question_id_counter = 1
-        for style_name, data_val in learning_styles.items():
-            for q_text in data_val.get("questions", []):
-                temp_questions.append({
-                    "id": question_id_counter,
-                    "text": q_text,
-                    "style": style_name
-                })
-                question_id_counter += 1
-        ALL_QUESTIONS = temp_questions
-        app.logger.info(f"Successfully loaded and processed data from {file_path}. {len(ALL_QUESTIONS)} questions loaded.")
+        snapshot = CatalogSnapshot.from_file(file_path, logger=app.logger)
+        app.logger.info(f"Successfully loaded and processed data from {file_path}{' (compiled snapshot)' if snapshot.data is None else ''}. {len(snapshot.questions)} questions loaded.")
 
     except FileNotFoundError:
         app.logger.error(f"ERROR: '{file_path}' not found. Application will run with no assessment data.")
-        LEARNING_STYLES_DATA = []
-        learning_styles = {}
-        ALL_QUESTIONS = []
+        snapshot = CatalogSnapshot.empty(source=file_path)
     except json.JSONDecodeError:
         app.logger.error(f"ERROR: Failed to decode '{file_path}'. Check syntax. Application will run with no assessment data.")
-        LEARNING_STYLES_DATA = []
-        learning_styles = {}
-        ALL_QUESTIONS = []
+        snapshot = CatalogSnapshot.empty(source=file_path)
+    except ValueError as e:
+        app.logger.error(f"ERROR: '{file_path}' is not a valid catalog: {e} Application will run with no assessment data.")
+        snapshot = CatalogSnapshot.empty(source=file_path)
     except Exception as e:
         app.logger.error(f"An unexpected error occurred during JSON loading or processing from {file_path}: {e}")
-        LEARNING_STYLES_DATA = []
-        learning_styles = {}
-        ALL_QUESTIONS = []
+        snapshot = CatalogSnapshot.empty(source=file_path)
+    return catalog_manager.install(snapshot)
 
 # Load data on application startup
 load_and_transform_data()
 
+def start_catalog_watcher(interval=None):
+    """Starts polling the catalog file so edits are picked up without a restart (interval 0 disables it)."""
+    if interval is None:
+        interval = float(os.environ.get('CATALOG_WATCH_INTERVAL', DEFAULT_POLL_INTERVAL))
+    if interval > 0:
+        catalog_manager.start_watcher(interval)
+        catalog_registry.start_watcher(interval)
+
+def score_batch_file(input_path, output_path, chunk_size=batch_scoring.DEFAULT_CHUNK_SIZE, workers=1):
+    """Scores a CSV/JSONL file of completed answer vectors against the loaded catalog.
+
+    Results are streamed to output_path (CSV or JSONL, by extension). Returns the number of rows written.
+    """
+    catalog = catalog_manager.current
+    if not catalog.questions:
+        raise RuntimeError("No questions loaded; cannot score answers.")
+    return batch_scoring.score_file(input_path, output_path, catalog.engine, chunk_size=chunk_size, workers=workers)
+
+@app.cli.command('score-batch')
+@click.argument('input_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--chunk-size', default=batch_scoring.DEFAULT_CHUNK_SIZE, show_default=True, help='Rows scored per chunk.')
+@click.option('--workers', default=1, show_default=True, help='Processes to spread chunks across.')
+def score_batch_command(input_path, output_path, chunk_size, workers):
+    """Score completed assessments from INPUT_PATH and write results to OUTPUT_PATH."""
+    count = score_batch_file(input_path, output_path, chunk_size=chunk_size, workers=workers)
+    click.echo(f"Scored {count} respondents into {output_path}.")
+
+@app.cli.command('compile-catalog')
+@click.argument('json_path', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Defaults to the JSON path with a .catalog extension.')
+def compile_catalog_command(json_path, output):
+    """Validate the catalog JSON and compile it into a binary snapshot for fast startup."""
+    try:
+        output_path, snapshot = compile_catalog(json_path or catalog_manager.file_path, output)
+    except ValueError as e:
+        raise click.ClickException(f"Catalog is invalid: {e}")
+    click.echo(f"Compiled {len(snapshot.questions)} questions (version {snapshot.version}) into {output_path}.")
+
+def request_catalogs():
+    """The CatalogManager for this request: the tenant's (path, header or subdomain) or the default one."""
+    if 'catalogs' not in g:
+        tenant = catalog_registry.tenant(request)
+        g.catalogs = catalog_registry.resolve(request, tenant) or catalog_manager
+        g.tenant = tenant or DEFAULT_TENANT
+    return g.catalogs
+
+def request_tenant():
+    """The tenant this request's results are recorded and reported under (DEFAULT_TENANT without one)."""
+    request_catalogs()  # Unknown tenants are a 404, as for their catalogs
+    return g.tenant
+
+@app.after_request
+def vary_on_tenant(response):
+    # Which catalog a URL serves depends on these headers once tenant catalogs are enabled
+    if catalog_registry.enabled and 'catalogs' in g:
+        for header in ('X-Tenant', 'X-Locale', 'Accept-Language'):
+            response.vary.add(header)
+    return response
+
+@app.cli.command('item-analysis')
+@click.option('--version', help='Catalog version to analyse. Defaults to the current catalog.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the full report as JSON.')
+def item_analysis_command(version, as_json):
+    """Recompute item statistics and reliability from every stored result."""
+    results_warehouse.flush()
+    catalog = catalog_manager.current if version is None else catalog_manager.get(version)
+    if not catalog or not catalog.questions:
+        raise click.ClickException(f"Catalog version '{version}' is not loaded." if version else "No questions loaded.")
+    report = response_analytics.recompute(results_warehouse, catalog).report(catalog.engine.style_names, catalog.questions)
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+    click.echo(f"Catalog {catalog.version}: {report['responses']} complete responses ({report['skipped']} incomplete skipped).")
+    for name, style in report['styles'].items():
+        alpha = 'n/a' if style['alpha'] is None else f"{style['alpha']:.3f}"
+        click.echo(f"  {name}: alpha {alpha} over {style['items']} items")
+    for item in report['items']:
+        correlation = item['item_rest_correlation']
+        if correlation is not None and correlation < analytics.WEAK_ITEM_CORRELATION:
+            click.echo(f"  Question {item['id']} ({item['style']}) correlates weakly with its style: {correlation:.3f}")
+
+@app.cli.command('vendor-assets')
+def vendor_assets_command():
+    """Download Materialize and the Material Icons font into static/vendor (needs network access once)."""
+    for name in assets.vendor_assets(app.static_folder):
+        click.echo(f"Saved static/{name}")
+
+@app.cli.command('build-assets')
+@click.option('--clean', is_flag=True, help='Remove previously built files first.')
+def build_assets_command(clean):
+    """Minify, fingerprint and precompress everything under static/ into static/dist."""
+    manifest = assets.build_assets(app.static_folder, clean=clean)
+    click.echo(f"Built {len(manifest['files'])} assets ({len(manifest['encodings'])} precompressed) into static/{assets.DIST_DIR}."
+               f"{'' if assets.brotli else ' Install brotli for .br variants.'}")
+
+def load_session_answers():
+    """Returns (catalog, answers) for the in-progress assessment.
+
+    The catalog is the snapshot the answers were recorded against (the current one for a
+    fresh session), and answers holds one score per question (0 = unanswered). answers is
+    None when the stored value is malformed or its catalog version is no longer retained,
+    e.g. after switching to another tenant's catalog mid-assessment.
+    """
+    catalogs = request_catalogs()
+    packed = session.get('assessment_answers')
+    if packed is None:
+        catalog = catalogs.current
+        return catalog, empty_answers(len(catalog.questions))
+    version = packed.partition(':')[0] if isinstance(packed, str) else None
+    catalog = catalogs.get(version)
+    if catalog is None:
+        return catalogs.current, None
+    return catalog, decode_answers(packed, catalog.version, len(catalog.questions))
+
+def save_session_answers(catalog, answers):
+    """Stores the answers in the session and mirrors them to the progress store under the attempt's resume code.
+
+    The code and the progress row only appear with the first answer, so merely starting an assessment
+    (as any bot can, without a cookie) never writes to the progress store.
+    """
+    packed = encode_answers(answers, catalog.version)
+    session['assessment_answers'] = packed
+    if not any(answers):
+        return
+    token = session.get('resume_token')
+    if token is None:
+        token = session['resume_token'] = new_resume_token()
+    progress_store.save(token, packed, mode=session.get('assessment_mode'), cohort=session.get('cohort'))
+
+def discard_progress():
+    """Forgets the session's attempt, here and in the progress store."""
+    token = session.pop('resume_token', None)
+    if token is not None:
+        progress_store.delete(token)
+    session.pop('assessment_answers', None)
+    session.pop('assessment_mode', None)
+
+def resume_url(catalog, answers, mode):
+    """Where an unfinished attempt continues: its first unanswered question, or the results once all are answered."""
+    if mode == 'adaptive':
+        order = catalog.adaptive.order
+        step = next((i + 1 for i, position in enumerate(order) if not answers[position]), None)
+        return url_for('assessment_adaptive', step=step) if step else url_for('results')
+    question_num = next((i + 1 for i, score in enumerate(answers) if not score), None)
+    return url_for('assessment', question_num=question_num) if question_num else url_for('results')
+
+def unfinished_attempt(mode):
+    """(catalog, answers) of the session's attempt in the given mode if it has answers and can still be resumed."""
+    if session.get('assessment_mode') != mode or request.args.get('restart') is not None:
+        return None
+    catalog, answers = load_session_answers()
+    if not answers or not any(answers):
+        return None
+    return catalog, answers
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -72,71 +337,94 @@ def index():
 @app.route('/assessment', defaults={'question_num': None}, methods=['GET', 'POST'])
 @app.route('/assessment/<int:question_num>', methods=['GET', 'POST'])
 def assessment(question_num):
-    if not ALL_QUESTIONS:
+    if not request_catalogs().current.questions:
         app.logger.error("No questions loaded. Assessment cannot proceed.")
         # Pass a specific flag or message to the template to indicate no questions
         return render_template('assessment.html', error_no_questions="Assessment data is unavailable. Please try again later or contact an administrator.")
 
     if request.method == 'GET':
         if question_num is None:
-            # Start of the assessment
-            session.pop('assessment_answers', None) # Clear previous answers
-            session['assessment_answers'] = {}      # Initialize session storage
+            # An unfinished run picks up where it left off (?restart=1 starts over)
+            attempt = unfinished_attempt(None)
+            if attempt is not None:
+                return redirect(resume_url(*attempt, None))
+            # Start of the assessment, always against the current catalog
+            catalog = request_catalogs().current
+            discard_progress() # Clear previous answers
+            remember_cohort()
+            save_session_answers(catalog, empty_answers(len(catalog.questions))) # Initialize session storage
             return redirect(url_for('assessment', question_num=1))
         
+        catalog, answers = load_session_answers()
+        if answers is None:
+            app.logger.info("Session answers are malformed or belong to an expired catalog version. Restarting the assessment.")
+            return redirect(url_for('assessment'))
+        questions = catalog.questions
+
         # Validate question_num for GET request
-        if not (1 <= question_num <= len(ALL_QUESTIONS)):
+        if not (1 <= question_num <= len(questions)):
             app.logger.warning(f"GET request for invalid question number: {question_num}. Redirecting to results.")
             # If answers are present, go to results, else to start.
-            if session.get('assessment_answers'):
+            if any(answers):
                  return redirect(url_for('results'))
             return redirect(url_for('assessment', question_num=1))
 
-        current_question_data = ALL_QUESTIONS[question_num - 1]
-        existing_answer_data = session.get('assessment_answers', {}).get(str(question_num))
-        existing_score = existing_answer_data.get('score') if existing_answer_data else None
+        current_question_data = questions[question_num - 1]
+        existing_score = answers[question_num - 1] or None
         
-        return render_template('assessment.html', 
-                               current_question=current_question_data,
-                               question_num=question_num,
-                               total_questions=len(ALL_QUESTIONS),
-                               existing_score=existing_score)
+        # The page only varies by catalog version, question, the score already given and the tenant URL prefix
+        page = page_cache.get_or_render(
+            (catalog.version, question_num, existing_score, request.script_root),
+            lambda: render_template('assessment.html', 
+                                    current_question=current_question_data,
+                                    question_num=question_num,
+                                    total_questions=len(questions),
+                                    existing_score=existing_score),
+            last_modified=catalog.loaded_at
+        )
+        response = Response(page.body, mimetype='text/html')
+        response.set_etag(page.etag)
+        response.last_modified = page.last_modified
+        # Private (it reflects this session's answer) and always revalidated, so back/forward gets a cheap 304
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
 
     if request.method == 'POST':
+        catalog, answers = load_session_answers()
+        questions = catalog.questions
+
         # Validate question_num for POST request (e.g. user manually changed URL)
-        if not (1 <= question_num <= len(ALL_QUESTIONS)):
+        if not (1 <= question_num <= len(questions)):
             app.logger.warning(f"POST request for invalid question number: {question_num}. Redirecting to start.")
             return redirect(url_for('assessment', question_num=1))
 
+        if answers is None:
+            app.logger.info("Answer submitted against stale or malformed session answers. Restarting the assessment.")
+            return redirect(url_for('assessment'))
+
         score_str = request.form.get('score')
         
         # Validate score
         if not score_str or not score_str.isdigit() or not (1 <= int(score_str) <= 5):
             app.logger.warning(f"Invalid score submitted: '{score_str}' for question {question_num}.")
-            current_question_data = ALL_QUESTIONS[question_num - 1]
-            existing_answer_data = session.get('assessment_answers', {}).get(str(question_num))
-            existing_score = existing_answer_data.get('score') if existing_answer_data else None
+            app_metrics.invalid_scores.inc('paginated')
+            current_question_data = questions[question_num - 1]
+            existing_score = answers[question_num - 1] or None
             # Re-render the current question page with an error message
             return render_template('assessment.html',
                                    current_question=current_question_data,
                                    question_num=question_num,
-                                   total_questions=len(ALL_QUESTIONS),
+                                   total_questions=len(questions),
                                    existing_score=existing_score, # Or the invalid score_str to show it back
                                    error="Please select a valid score between 1 and 5.")
 
-        # Store the answer
-        question_id_str = str(question_num)
-        assessment_answers = session.get('assessment_answers', {}) # Should have been initialized at GET /assessment
-        assessment_answers[question_id_str] = {
-            'score': int(score_str),
-            'style': ALL_QUESTIONS[question_num - 1]['style']
-        }
-        session['assessment_answers'] = assessment_answers
-        session.modified = True # Ensure session is saved
+        # Store the answer (the style is implied by the position in the catalog's question list)
+        answers[question_num - 1] = int(score_str)
+        save_session_answers(catalog, answers)
 
         # Determine next step
         next_question_num = question_num + 1
-        if next_question_num > len(ALL_QUESTIONS):
+        if next_question_num > len(questions):
             return redirect(url_for('results')) # All questions answered
         else:
             return redirect(url_for('assessment', question_num=next_question_num))
@@ -145,6 +433,207 @@ def assessment(question_num):
     return redirect(url_for('index'))
 
 
+@app.route('/assessment/adaptive')
+def assessment_adaptive_start():
+    """Starts an adaptive run: questions interleaved across styles, stopping once the outcome is decided."""
+    catalog = request_catalogs().current
+    if not catalog.questions:
+        app.logger.error("No questions loaded. Assessment cannot proceed.")
+        return render_template('assessment.html', error_no_questions="Assessment data is unavailable. Please try again later or contact an administrator.")
+    attempt = unfinished_attempt('adaptive')
+    if attempt is not None:
+        return redirect(resume_url(*attempt, 'adaptive'))
+    discard_progress()
+    remember_cohort()
+    session['assessment_mode'] = 'adaptive'
+    save_session_answers(catalog, empty_answers(len(catalog.questions)))
+    return redirect(url_for('assessment_adaptive', step=1))
+
+@app.route('/assessment/adaptive/<int:step>', methods=['GET', 'POST'])
+def assessment_adaptive(step):
+    """Step n asks the n-th question of the catalog's interleaved order."""
+    catalog, answers = load_session_answers()
+    if answers is None or session.get('assessment_mode') != 'adaptive':
+        app.logger.info("Adaptive step without an adaptive run in progress. Restarting the adaptive assessment.")
+        return redirect(url_for('assessment_adaptive_start'))
+    order = catalog.adaptive.order
+    if not (1 <= step <= len(order)):
+        app.logger.warning(f"Request for invalid adaptive step: {step}. Redirecting to the first step.")
+        return redirect(url_for('assessment_adaptive', step=1))
+
+    position = order[step - 1]
+    question = catalog.questions[position]
+
+    if request.method == 'POST':
+        score_str = request.form.get('score')
+        if not score_str or not score_str.isdigit() or not (MIN_SCORE <= int(score_str) <= MAX_SCORE):
+            app.logger.warning(f"Invalid score submitted: '{score_str}' for adaptive step {step}.")
+            app_metrics.invalid_scores.inc('adaptive')
+            return render_template('assessment.html', adaptive=True,
+                                   current_question=question,
+                                   question_num=step,
+                                   total_questions=len(order),
+                                   existing_score=answers[position] or None,
+                                   error="Please select a valid score between 1 and 5.")
+        answers[position] = int(score_str)
+        save_session_answers(catalog, answers)
+
+        decision = catalog.adaptive.decision(answers, confidence=ADAPTIVE_CONFIDENCE)
+        if decision.decided:
+            app.logger.info(f"Adaptive assessment decided ({decision.reason}) for '{decision.leader}' after {answered_count(answers)} of {len(order)} questions.")
+            return redirect(url_for('results'))
+        if step == len(order):
+            return redirect(url_for('results'))
+        return redirect(url_for('assessment_adaptive', step=step + 1))
+
+    existing_score = answers[position] or None
+    page = page_cache.get_or_render(
+        (catalog.version, 'adaptive', step, existing_score, request.script_root),
+        lambda: render_template('assessment.html', adaptive=True,
+                                current_question=question,
+                                question_num=step,
+                                total_questions=len(order),
+                                existing_score=existing_score),
+        last_modified=catalog.loaded_at
+    )
+    response = Response(page.body, mimetype='text/html')
+    response.set_etag(page.etag)
+    response.last_modified = page.last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@app.route('/assessment/resume', methods=['GET', 'POST'])
+@app.route('/assessment/resume/<code>')
+def assessment_resume(code=None):
+    """GET shows this attempt's resume code; a code (in the URL or posted from the home page) restores its progress."""
+    if code is None and request.method == 'GET':
+        token = session.get('resume_token')
+        catalog, answers = load_session_answers()
+        if token is None or answers is None:
+            return redirect(url_for('index'))
+        return render_template('resume.html', resume_code=format_token(token),
+                               resume_link=url_for('assessment_resume', code=format_token(token), _external=True),
+                               continue_url=resume_url(catalog, answers, session.get('assessment_mode')))
+
+    token = normalize_token(code if code is not None else request.form.get('code'))
+    attempt = progress_store.load(token) if token else None
+    if attempt is None:
+        app.logger.info("Resume attempted with an unknown or expired code.")
+        return render_template('index.html', resume_error="That code doesn't match an unfinished assessment. Check it, or start a new one."), 404
+
+    session['assessment_answers'] = attempt['answers']
+    session['resume_token'] = token
+    for key, value in (('assessment_mode', attempt['mode']), ('cohort', attempt['cohort'])):
+        if value is None:
+            session.pop(key, None)
+        else:
+            session[key] = value
+    catalog, answers = load_session_answers()
+    if answers is None:
+        app.logger.info("Resumed attempt belongs to a catalog version that is no longer available.")
+        discard_progress()
+        return render_template('index.html', resume_error="The assessment has changed since that attempt was started, so it can't be resumed. Please start a new one."), 409
+    return redirect(resume_url(catalog, answers, attempt['mode']))
+
+def primary_style_recommendations(primary_styles, learning_styles):
+    """Looks up recommendations for the primary styles in the given catalog's styles."""
+    recommendations = {}
+    for style in primary_styles:
+        # Ensure style exists in learning_styles (it should, as scores keys come from learning_styles)
+        if style in learning_styles and "recommendations" in learning_styles[style]:
+            recommendations[style] = learning_styles[style]["recommendations"]
+        else:
+            app.logger.warning(f"Could not find recommendations for primary style '{style}' in learning_styles.")
+    return recommendations
+
+def remember_cohort():
+    """Keeps an optional ?cohort= (class, school, ...) from the start of an assessment for reporting."""
+    cohort = request.args.get('cohort')
+    if cohort is None:
+        return
+    if valid_cohort(cohort):
+        session['cohort'] = cohort
+    else:
+        app.logger.warning(f"Ignoring invalid cohort name: '{cohort}'.")
+
+def result_record(scored, catalog):
+    """The stored form of a scored result: weighted totals, normalized percentages, each style's maximum and the primary styles."""
+    return {
+        'scores': scored.scores,
+        'percentages': scored.percentages,
+        'max_scores': dict(zip(catalog.engine.style_names, catalog.engine.max_scores)),
+        'primary_styles': scored.primary_styles
+    }
+
+def store_completed_result(result, catalog, answers):
+    """Stores a result server-side for download, points the session at it and queues it for the warehouse."""
+    # A new ID per run, so older downloads stay valid until they expire
+    session['result_id'] = result_store.put(result)
+    session.pop('assessment_results', None) # Drop the legacy cookie payload if an older session still carries it
+    token = session.pop('resume_token', None) # The attempt is finished; its resume code no longer applies
+    if token is not None:
+        progress_store.delete(token)
+    results_warehouse.record(session.get('cohort'), catalog.version, result['scores'], result['primary_styles'], answers,
+                             tenant=request_tenant())
+
+def render_results(result, catalog, answered_questions=None):
+    primary_styles = result['primary_styles']
+    # Results stored before percentages were recorded show their totals only
+    return render_template('results.html', scores=result['scores'], primary_styles=primary_styles,
+                           percentages=result.get('percentages', {}), max_scores=result.get('max_scores', {}),
+                           recommendations=primary_style_recommendations(primary_styles, catalog.learning_styles),
+                           learning_styles=catalog.learning_styles,
+                           answered_questions=answered_questions, total_questions=len(catalog.questions))
+
+@app.route('/assessment/all')
+def assessment_single_page():
+    """Single-page mode: every question in one page, answers posted together to /assessment/submit."""
+    catalog = request_catalogs().current
+    remember_cohort()
+    if not catalog.questions:
+        app.logger.error("No questions loaded. Assessment cannot proceed.")
+        return render_template('assessment_single.html', error_no_questions="Assessment data is unavailable. Please try again later or contact an administrator.")
+    return render_template('assessment_single.html',
+                           questions=catalog.questions,
+                           catalog_version=catalog.version)
+
+@app.route('/assessment/submit', methods=['POST'])
+def assessment_submit():
+    """Validates and scores a complete answer vector posted as JSON: {"version": ..., "answers": [1-5, ...]}."""
+    catalogs = request_catalogs()
+    if not catalogs.current:
+        app.logger.error("Answers submitted with no assessment data loaded.")
+        return jsonify(error="Assessment data is unavailable. Please try again later."), 503
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object with 'version' and 'answers'."), 400
+    # Score against the catalog the page was rendered from, as long as it is still retained
+    catalog = catalogs.get(payload.get('version'))
+    if catalog is None:
+        app.logger.info(f"Single-page submission for expired catalog version '{payload.get('version')}', current is '{catalogs.current.version}'.")
+        return jsonify(error="The assessment has changed since this page was loaded. Please reload and try again.",
+                       redirect=url_for('assessment_single_page')), 409
+
+    questions = catalog.questions
+    answers = payload.get('answers')
+    if not isinstance(answers, list) or len(answers) != len(questions):
+        return jsonify(error=f"Expected {len(questions)} answers."), 400
+    unanswered = [
+        question['id'] for question, score in zip(questions, answers)
+        if type(score) is not int or not (MIN_SCORE <= score <= MAX_SCORE)
+    ]
+    if unanswered:
+        app.logger.warning(f"Single-page submission with missing or invalid scores for questions {unanswered}.")
+        app_metrics.invalid_scores.inc('single_page')
+        return jsonify(error=f"Please select a score between {MIN_SCORE} and {MAX_SCORE} for every question.",
+                       invalid_questions=unanswered), 400
+
+    store_completed_result(result_record(catalog.engine.score(answers), catalog), catalog, answers)
+    session.pop('assessment_answers', None) # A finished single-page run supersedes any paginated progress
+    session.pop('assessment_mode', None)
+    return jsonify(redirect=url_for('results'))
+
 @app.route('/results', methods=['GET', 'POST']) # Allow GET for redirection from invalid question numbers
 def results():
     # Original /results logic was POST only. Now it needs to handle answers from session.
@@ -152,73 +641,47 @@ def results():
     # If no answers in session, redirect to start.
     if request.method == 'GET':
         if not session.get('assessment_answers'):
+            # Already scored (e.g. single-page submission or a page refresh): show the stored result
+            stored_result = result_store.get(session.get('result_id'))
+            current = request_catalogs().current
+            if stored_result and current:
+                return render_results(stored_result, current)
             app.logger.info("GET request to /results with no assessment answers in session. Redirecting to start.")
             return redirect(url_for('assessment'))
         # If there are answers, proceed to calculate and show results.
         # This assumes that if someone GETs /results, they want to see results from session.
 
     try:
-        if not learning_styles: # Check if learning_styles data failed to load
+        if not request_catalogs().current.learning_styles: # Check if learning_styles data failed to load
             app.logger.error("Attempted to calculate results with no learning styles data loaded.")
             return "Error: Assessment data is unavailable. Please contact the administrator.", 500
 
-        submitted_answers = session.get('assessment_answers', {})
-        if not submitted_answers:
+        catalog, submitted_answers = load_session_answers()
+        if submitted_answers is None:
+            app.logger.warning("/results accessed with stale or malformed session answers. Redirecting to start assessment.")
+            return redirect(url_for('assessment'))
+        if not any(submitted_answers):
             app.logger.warning("/results accessed with no answers in session. Redirecting to start assessment.")
             # Optionally, render a message on results page instead of redirecting
             return redirect(url_for('assessment'))
 
-        scores = {}
-        for style_name in learning_styles: # Initialize all known styles to 0
-            scores[style_name] = 0
-        
-        for q_id_str, answer_data in submitted_answers.items():
-            score = answer_data.get('score')
-            style_for_question = answer_data.get('style')
-            
-            if style_for_question and style_for_question in scores and isinstance(score, int):
-                scores[style_for_question] += score
-            else:
-                app.logger.warning(f"Invalid answer data in session for question_id '{q_id_str}': score={score}, style='{style_for_question}'")
-
-        # Find highest scoring styles
-        if not scores: # Should not happen if learning_styles is populated
-             app.logger.error("Scores dictionary is empty after processing session answers.")
-             # This could happen if learning_styles was empty or answers were malformed.
-             # Fallback to avoid error on max() if scores is empty.
-             primary_styles = []
-             recommendations = {}
-        elif not any(s > 0 for s in scores.values()): # All scores are zero or negative (though scores should be positive)
-            max_score = 0 
-            primary_styles = [] # No primary style if all scores are 0
-            recommendations = {}
-        else:
-            max_score = max(scores.values())
-            primary_styles = [style for style, score_val in scores.items() if score_val == max_score and max_score > 0]
-            
-            recommendations = {}
-            for style in primary_styles:
-                # Ensure style exists in learning_styles (it should, as scores keys come from learning_styles)
-                if style in learning_styles and "recommendations" in learning_styles[style]:
-                    recommendations[style] = learning_styles[style]["recommendations"]
-                else:
-                    app.logger.warning(f"Could not find recommendations for primary style '{style}' in learning_styles.")
-
-
-        # Store results in session for download (overwrites if already there from a previous run)
-        session['assessment_results'] = {
-            'scores': scores,
-            'primary_styles': primary_styles,
-            'recommendations': recommendations,
-            'learning_styles_data': learning_styles 
-        }
+        answered_questions = None
+        scoring_answers = submitted_answers
+        if session.get('assessment_mode') == 'adaptive':
+            # Stopped early: estimate the skipped questions so scores are on the full-assessment scale
+            answered_questions = answered_count(submitted_answers)
+            scoring_answers = catalog.adaptive.complete(submitted_answers)
+
+        # One pass over the precomputed question -> style index of the catalog the answers were recorded against
+        result = result_record(catalog.engine.score(scoring_answers), catalog)
+        store_completed_result(result, catalog, submitted_answers)
         
         # Clear the raw per-question answers from the session as they are processed
         session.pop('assessment_answers', None)
+        session.pop('assessment_mode', None)
         session.modified = True # Explicitly mark session as modified after pop
 
-        return render_template('results.html', scores=scores, primary_styles=primary_styles, 
-                               recommendations=recommendations, learning_styles=learning_styles)
+        return render_results(result, catalog, answered_questions=answered_questions)
     
     except ValueError as e: # Should be less likely now with session data, but good to keep
         app.logger.error(f"ValueError during results processing (session data): {e}. Answers: {session.get('assessment_answers')}")
@@ -229,72 +692,222 @@ def results():
 
 @app.route('/download_results')
 def download_results():
-    results_data = session.get('assessment_results')
+    results_data = result_store.get(session.get('result_id'))
     
     if not results_data:
-        app.logger.info("Attempted to download results but no data found in session. Redirecting to index.")
+        app.logger.info("Attempted to download results but no stored result found for this session. Redirecting to index.")
         return redirect(url_for('index')) 
 
-    scores = results_data.get('scores', {})
-    primary_styles = results_data.get('primary_styles', [])
-    # learning_styles_data is used for descriptions and categories
-    learning_styles_data = results_data.get('learning_styles_data', {})
+    report_format = request.args.get('format', 'txt')
+    if report_format not in export.REPORT_FORMATS:
+        return f"Error: Unsupported download format '{report_format}'. Choose one of: {', '.join(export.REPORT_FORMATS)}.", 400
+
+    # Descriptions, categories and recommendations come from the live catalog rather than the stored result
+    learning_styles_data = request_catalogs().current.learning_styles
 
-    # Defensive check in case learning_styles_data itself is missing from session, though unlikely if session was set correctly.
     if not learning_styles_data:
-        app.logger.error("Learning styles data is missing from session for download. This indicates a problem with session data.")
+        app.logger.error("Learning styles data is not loaded; cannot build the results download.")
         return "Error: Could not retrieve complete results data for download. Please try taking the assessment again.", 500
 
-    text_content = "Learning Style Assessment Results\n"
-    text_content += "=================================\n\n"
+    mimetype, extension, generate = export.REPORT_FORMATS[report_format]
+    return Response(
+        generate(results_data, learning_styles_data),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment;filename=learning_style_results.{extension}"}
+    )
+
+# --- JSON API (stateless: never reads or writes the session cookie) ---
 
-    text_content += "Primary Learning Style(s):\n"
-    if primary_styles:
-        for style_name in primary_styles:
-            description = learning_styles_data.get(style_name, {}).get('description', 'N/A')
-            text_content += f"- {style_name}: {description}\n"
-    else:
-        text_content += "- No primary style identified.\n"
-    text_content += "\n"
-
-    text_content += "All Scores:\n"
-    if scores:
-        for style_name, score_value in scores.items():
-            category = learning_styles_data.get(style_name, {}).get('category', 'N/A')
-            description = learning_styles_data.get(style_name, {}).get('description', 'N/A')
-            text_content += f"- {style_name} ({category}): {score_value}/25\n"
-            text_content += f"  Description: {description}\n"
+@app.route('/api/v1/catalog')
+def api_catalog():
+    catalog = request_catalogs().current
+    if not catalog.api_body:
+        return jsonify(error="Assessment data is unavailable."), 503
+    # Strong validator: the body is a pure function of learning_data.json's content
+    if request.if_none_match.contains(catalog.etag):
+        response = Response(status=304)
     else:
-        text_content += "- No scores available.\n"
-    text_content += "\n"
-
-    text_content += "Recommendations:\n"
-    if recommendations:
-        for style_name, rec_list in recommendations.items():
-            if style_name in primary_styles: # Only show recommendations for primary styles
-                text_content += f"\nFor {style_name} Learners:\n"
-                if rec_list:
-                    for rec in rec_list:
-                        text_content += f"- {rec}\n"
-                else:
-                    text_content += "- No specific recommendations for this style.\n"
-    else:
-        text_content += "- No recommendations available.\n"
-    
-    text_content += "\n\nReminder: Using techniques from multiple learning preferences often leads to better outcomes."
-
-    return Response(
-        text_content,
-        mimetype="text/plain",
-        headers={"Content-Disposition": "attachment;filename=learning_style_results.txt"}
+        response = Response(catalog.api_body, mimetype='application/json')
+    response.set_etag(catalog.etag)
+    response.headers['Cache-Control'] = 'no-cache' # Always revalidate; a matching ETag costs only a 304
+    return response
+
+@app.route('/api/v1/score', methods=['POST'])
+def api_score():
+    """Scores {"answers": [0-5, ...], "version": optional} and returns scores, primary styles and recommendations."""
+    catalogs = request_catalogs()
+    if not catalogs.current:
+        return jsonify(error="Assessment data is unavailable."), 503
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object with an 'answers' list."), 400
+    version = payload.get('version')
+    catalog = catalogs.current if version is None else catalogs.get(version)
+    if catalog is None:
+        return jsonify(error=f"Catalog version '{version}' is not available.", version=catalogs.current.version), 409
+
+    answers = payload.get('answers')
+    if not isinstance(answers, list) or len(answers) != len(catalog.questions):
+        return jsonify(error=f"Expected 'answers' to be a list of {len(catalog.questions)} scores."), 400
+    if any(type(score) is not int or not (0 <= score <= MAX_SCORE) for score in answers):
+        app_metrics.invalid_scores.inc('api')
+        return jsonify(error=f"Each answer must be an integer from {MIN_SCORE} to {MAX_SCORE}, or 0 if unanswered."), 400
+
+    scored = catalog.engine.score(answers)
+    return jsonify(
+        version=catalog.version,
+        scores=scored.scores,
+        percentages=scored.percentages,
+        primary_styles=scored.primary_styles,
+        recommendations=primary_style_recommendations(scored.primary_styles, catalog.learning_styles)
     )
 
+# --- Cohort reporting (served from the warehouse's rollup tables, for the request's tenant only) ---
+
+@app.route('/api/v1/cohorts')
+def api_cohorts():
+    return jsonify(cohorts=results_warehouse.cohorts(tenant=request_tenant()))
+
+@app.route('/api/v1/cohorts/<cohort>/score-distributions')
+def api_cohort_score_distributions(cohort):
+    # Keys are each style's raw weighted totals (as strings, e.g. "17" or "12.5"). Styles have different
+    # maxima, so these are not comparable across styles; use the percentages for that.
+    return jsonify(cohort=cohort, distributions=results_warehouse.score_distributions(cohort, tenant=request_tenant()))
+
+@app.route('/api/v1/cohorts/<cohort>/primary-styles')
+def api_cohort_primary_styles(cohort):
+    return jsonify(cohort=cohort, primary_styles=results_warehouse.primary_style_counts(cohort, tenant=request_tenant()))
+
+@app.route('/api/v1/cohorts/<cohort>/timeline')
+def api_cohort_timeline(cohort):
+    bucket = request.args.get('bucket', 'hour')
+    if bucket not in BUCKET_SECONDS:
+        return jsonify(error=f"'bucket' must be one of: {', '.join(BUCKET_SECONDS)}."), 400
+    since = request.args.get('since', type=int)
+    buckets = results_warehouse.timeline(cohort, bucket=bucket, since=since, tenant=request_tenant())
+    return jsonify(cohort=cohort, bucket=bucket,
+                   timeline=[{'start': bucket_start, 'count': count} for bucket_start, count in buckets])
+
+@app.route('/api/v1/item-analysis')
+def api_item_analysis():
+    """Item means/variances, item-rest correlations, alpha per style and style correlations (?version=)."""
+    catalogs = request_catalogs()
+    version = request.args.get('version')
+    catalog = catalogs.current if version is None else catalogs.get(version)
+    if catalog is None:
+        return jsonify(error=f"Catalog version '{version}' is not available.", version=catalogs.current.version), 409
+    if not catalog.questions:
+        return jsonify(error="Assessment data is unavailable."), 503
+    stats = response_analytics.update(results_warehouse, catalog)
+    return jsonify(version=catalog.version, **stats.report(catalog.engine.style_names, catalog.questions))
+
+# --- Cohort exports (rendered in the background, polled, then downloaded) ---
+
+def export_job_document(job):
+    document = {key: job[key] for key in ('id', 'cohort', 'format', 'status', 'rows', 'total',
+                                          'created_at', 'finished_at', 'expires_at', 'error')}
+    document['progress'] = min(job['rows'] / job['total'], 1.0) if job['total'] else None
+    document['status_url'] = url_for('api_export_status', job_id=job['id'])
+    if job['status'] == export_jobs.DONE:
+        document['download_url'] = url_for('api_export_download', job_id=job['id'])
+    return document
+
+def cohort_export_record(result, catalogs):
+    """Adds a warehouse result's percentages and recommendations, from the catalog version that scored it.
+
+    Results whose version is no longer loaded keep their totals only; their percentages can't be
+    recomputed without that version's maxima, and the current catalog's texts may not match.
+    """
+    catalog = catalogs.get(result['catalog_version'])
+    if catalog is not None:
+        engine = catalog.engine
+        totals = [result['scores'].get(style_name, 0) for style_name in engine.style_names]
+        result['percentages'] = {style_name: round(value, 1)
+                                 for style_name, value in zip(engine.style_names, engine.normalized(totals))}
+        result['recommendations'] = primary_style_recommendations(result['primary_styles'], catalog.learning_styles)
+    return result
+
+@app.route('/api/v1/cohorts/<cohort>/exports', methods=['POST'])
+def api_cohort_export(cohort):
+    """Queues a full export of a cohort's results (?format=csv|jsonl) and returns 202 with the job."""
+    if not valid_cohort(cohort):
+        return jsonify(error="Invalid cohort name."), 400
+    report_format = request.args.get('format', 'csv')
+    if report_format not in export.COHORT_FORMATS:
+        return jsonify(error=f"'format' must be one of: {', '.join(export.COHORT_FORMATS)}."), 400
+    catalogs = request_catalogs()
+    style_names = list(catalogs.current.learning_styles)
+    if not style_names:
+        return jsonify(error="Assessment data is unavailable."), 503
+
+    tenant = request_tenant()
+    _, extension, generate = export.COHORT_FORMATS[report_format]
+    records = (cohort_export_record(result, catalogs) for result in results_warehouse.iter_results(cohort, tenant=tenant))
+    try:
+        job = cohort_exports.submit(records,
+                                 lambda results: generate(results, style_names),
+                                 extension, total=results_warehouse.cohorts(tenant=tenant).get(cohort, 0),
+                                 cohort=cohort, format=report_format, tenant=tenant)
+    except export_jobs.ExportQueueFull:
+        app.logger.warning(f"Export queue is full; refused an export of cohort '{cohort}'.")
+        response = jsonify(error="Too many exports are in progress. Please try again shortly.")
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    response = jsonify(export_job_document(job))
+    response.headers['Location'] = url_for('api_export_status', job_id=job['id'])
+    return response, 202
+
+def tenant_export(job_id):
+    """The export job, or None if it is unknown, expired or was submitted for another tenant."""
+    job = cohort_exports.status(job_id)
+    if job is None or job.get('tenant', DEFAULT_TENANT) != request_tenant():
+        return None
+    return job
+
+@app.route('/api/v1/exports/<job_id>')
+def api_export_status(job_id):
+    job = tenant_export(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired export."), 404
+    return jsonify(export_job_document(job))
+
+@app.route('/api/v1/exports/<job_id>/download')
+def api_export_download(job_id):
+    job = tenant_export(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired export."), 404
+    if job['status'] != export_jobs.DONE:
+        return jsonify(error=f"The export is {job['status']}.", status=job['status']), 409
+    mimetype, extension, _ = export.COHORT_FORMATS[job['format']]
+    return send_file(cohort_exports.artifact_path(job), mimetype=mimetype, as_attachment=True,
+                     download_name=f"cohort_{job['cohort']}.{extension}")
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and answering requests."""
+    return jsonify(status='ok', pid=os.getpid())
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: a catalog is loaded and this worker is not shutting down."""
+    catalog = catalog_manager.current
+    if draining.is_set():
+        return jsonify(status='draining', pid=os.getpid()), 503
+    if not catalog:
+        return jsonify(status='no catalog loaded', pid=os.getpid()), 503
+    return jsonify(status='ready', catalog_version=catalog.version, pid=os.getpid())
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this process's metrics."""
+    return Response(app_metrics.render(), mimetype=METRICS_CONTENT_TYPE)
+
 if __name__ == '__main__':
-    # Make sure templates directory exists
-    os.makedirs('templates', exist_ok=True)
+    # Development server only; production runs serve.py (pre-forked workers, graceful shutdown)
     
-    # Create static directory for CSS
-    os.makedirs('static', exist_ok=True)
+    # Pick up edits to the catalog file without restarting
+    start_catalog_watcher()
     
     # Start the app
     app.run(host='0.0.0.0', port=8080)
@@ -0,0 +1,310 @@
+"""Request instrumentation and a Prometheus text-format exposition.
+
+Metrics are recorded into per-thread shards: each request thread only ever
+writes to its own dicts, so the hot path takes no lock. A scrape copies
+and sums the shards (folding those of finished threads into a retired
+total). Values are per process; with several worker processes every
+worker reports its own series.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, request
+from flask.sessions import SecureCookieSessionInterface
+from flask.signals import before_render_template, template_rendered
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+BYTE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096)
+REDIRECT_LOOP_HOPS = 5  # Consecutive redirects before a client counts as stuck in a loop
+REDIRECT_CLIENTS = 10000  # Clients in the middle of a redirect chain that are tracked at once
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Shard:
+    __slots__ = ('thread', 'values')
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.values = {}  # (metric name, label values) -> number or histogram list
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()  # Taken once per new thread and per scrape, never per observation
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                # Servers may start a thread per connection, so retire finished threads here too, not
+                # only when scraped: without a scraper the list would otherwise grow without bound
+                self._retire_finished()
+                self._shards.append(shard)
+        return shard.values
+
+    def _retire_finished(self):
+        # Call with self._lock held
+        live = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                live.append(shard)
+            else:
+                # The thread is gone, so nothing writes to this shard any more
+                self._merge(self._retired, shard.values)
+        self._shards = live
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(self, name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, help_text, label_names, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """Registers collect() -> [(name, type, help, value)] for values owned elsewhere, read at scrape time."""
+        self._collectors.append(collect)
+
+    @staticmethod
+    def _merge(target, values):
+        for key, value in values.items():
+            if isinstance(value, list):
+                existing = target.get(key)
+                target[key] = list(value) if existing is None else [a + b for a, b in zip(existing, value)]
+            else:
+                target[key] = target.get(key, 0) + value
+
+    def snapshot(self):
+        """Returns the summed values of every shard, keyed on (metric name, label values)."""
+        with self._lock:
+            self._retire_finished()
+            totals = {}
+            self._merge(totals, self._retired)
+            for shard in self._shards:
+                # dict.copy() is atomic under the GIL; histogram lists are copied by _merge
+                self._merge(totals, shard.values.copy())
+        return totals
+
+    def render(self):
+        totals = self.snapshot()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(totals))
+        for collect in self._collectors:
+            for name, metric_type, help_text, value in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.append(f"{name} {_format_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+class Counter:
+
+    def __init__(self, registry, name, help_text, label_names):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+
+    def inc(self, *label_values, amount=1):
+        values = self.registry._shard()
+        key = (self.name, label_values)
+        values[key] = values.get(key, 0) + amount
+
+    def render(self, totals):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        for (name, label_values), value in sorted(totals.items()):
+            if name == self.name:
+                yield f"{self.name}{_labels(self.label_names, label_values)} {_format_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram. Each series is stored as [bucket counts..., +Inf count, sum]."""
+
+    def __init__(self, registry, name, help_text, label_names, buckets):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        values = self.registry._shard()
+        key = (self.name, label_values)
+        series = values.get(key)
+        if series is None:
+            series = values[key] = [0] * (len(self.buckets) + 1) + [0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, totals):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for (name, label_values), series in sorted(totals.items()):
+            if name != self.name:
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = _format_number(bound)
+                yield f"{self.name}_bucket{_labels(self.label_names, label_values, [('le', le)])} {cumulative}"
+            labels = _labels(self.label_names, label_values)
+            yield f"{self.name}_sum{labels} {_format_number(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class _RedirectChains:
+    """Lengths of the GET redirect chains clients are in the middle of, in a bounded dict."""
+
+    def __init__(self, max_clients=REDIRECT_CLIENTS):
+        self.max_clients = max_clients
+        self._hops = {}
+        self._lock = threading.Lock()
+
+    def redirected(self, client):
+        """Counts a redirect and returns the length of the client's chain so far."""
+        with self._lock:
+            hops = self._hops.pop(client, 0) + 1
+            self._hops[client] = hops  # Re-inserted, so the dict stays ordered from least to most recent
+            if len(self._hops) > self.max_clients:
+                del self._hops[next(iter(self._hops))]
+        return hops
+
+    def landed(self, client):
+        """Ends the client's chain (it got a page)."""
+        with self._lock:
+            self._hops.pop(client, None)
+
+    def __len__(self):
+        return len(self._hops)
+
+
+class AppMetrics:
+    """The metric families the app records, bound to one registry."""
+
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.requests = r.counter('http_requests_total', 'Requests handled.', ('endpoint', 'method', 'status'))
+        self.request_latency = r.histogram('http_request_duration_seconds', 'Time from request start to response.',
+                                           ('endpoint', 'method'))
+        self.template_render = r.histogram('template_render_seconds', 'Jinja template render time.', ('template',),
+                                           buckets=FAST_BUCKETS)
+        self.session_time = r.histogram('session_serialization_seconds',
+                                        'Time to open (verify and decode) or save (encode and sign) the session cookie.',
+                                        ('operation',), buckets=FAST_BUCKETS)
+        self.cookie_bytes = r.histogram('session_cookie_bytes', 'Size of the session cookie received or set.',
+                                        ('direction',), buckets=BYTE_BUCKETS)
+        self.invalid_scores = r.counter('assessment_invalid_scores_total', 'Rejected answer submissions.', ('mode',))
+        self.rate_limited = r.counter('rate_limited_requests_total', 'Requests refused with a 429 by the rate limiter.',
+                                      ('endpoint',))
+        self.redirect_loops = r.counter('redirect_loops_total',
+                                        f'Clients redirected {REDIRECT_LOOP_HOPS} or more times in a row.', ('endpoint',))
+        self._render_starts = threading.local()
+        self._redirect_chains = _RedirectChains()
+
+    def render(self):
+        return self.registry.render()
+
+    # --- Flask wiring ---
+
+    def instrument(self, app):
+        """Installs the request hooks, template signals and a timed session interface on app."""
+        app.session_interface = InstrumentedSessionInterface(self)
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        before_render_template.connect(self._start_render, app)
+        template_rendered.connect(self._end_render, app)
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+
+    def _end_request(self, response):
+        endpoint = request.endpoint or 'unmatched'
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            self.request_latency.observe(time.perf_counter() - start, endpoint, request.method)
+        self.requests.inc(endpoint, request.method, str(response.status_code))
+        self._track_redirects(response, endpoint)
+        return response
+
+    def _track_redirects(self, response, endpoint):
+        # Loops are chains of GET redirects (Post/Redirect/Get is normal). A 304 is a revalidated
+        # page, not a redirect. Chains are kept here, per client, rather than in the session, so
+        # counting them never creates or re-signs a cookie.
+        chains = self._redirect_chains
+        if request.method == 'GET' and response.location and response.status_code != 304:
+            if chains.redirected(self._client_key()) == REDIRECT_LOOP_HOPS:
+                self.redirect_loops.inc(endpoint)
+        elif chains:
+            chains.landed(self._client_key())
+
+    @staticmethod
+    def _client_key():
+        # The session cookie tells apart clients that share an address (e.g. a classroom behind one NAT)
+        cookie = request.cookies.get(current_app.config['SESSION_COOKIE_NAME'])
+        return hash((request.remote_addr, request.user_agent.string, cookie))
+
+    def _start_render(self, sender, template, context, **extra):
+        stack = getattr(self._render_starts, 'stack', None)
+        if stack is None:
+            stack = self._render_starts.stack = []
+        stack.append(time.perf_counter())
+
+    def _end_render(self, sender, template, context, **extra):
+        stack = getattr(self._render_starts, 'stack', None)
+        if stack:
+            self.template_render.observe(time.perf_counter() - stack.pop(), template.name or 'unknown')
+
+
+class InstrumentedSessionInterface(SecureCookieSessionInterface):
+    """The default signed-cookie session, timed and sized."""
+
+    def __init__(self, app_metrics):
+        self.app_metrics = app_metrics
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        start = time.perf_counter()
+        session = super().open_session(app, request)
+        if cookie:
+            self.app_metrics.session_time.observe(time.perf_counter() - start, 'open')
+            self.app_metrics.cookie_bytes.observe(len(cookie), 'received')
+        return session
+
+    def save_session(self, app, session, response):
+        start = time.perf_counter()
+        super().save_session(app, session, response)
+        prefix = self.get_cookie_name(app) + '='
+        for header in response.headers.getlist('Set-Cookie'):
+            if header.startswith(prefix):
+                self.app_metrics.session_time.observe(time.perf_counter() - start, 'save')
+                self.app_metrics.cookie_bytes.observe(len(header.split(';', 1)[0]) - len(prefix), 'set')
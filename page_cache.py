@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+DEFAULT_MAX_ENTRIES = 2048
+
+CachedPage = namedtuple('CachedPage', ['body', 'etag', 'last_modified'])
+
+
+class PageCache:
+    """Bounded LRU of rendered pages.
+
+    Keys start with the catalog version, so a reload never serves a page
+    rendered from an older catalog. Each entry carries a strong ETag (a hash
+    of the body) so repeat requests can be answered with 304 Not Modified.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get_or_render(self, key, render, last_modified):
+        """Returns the CachedPage for key, calling render() to build the body on a miss."""
+        if not self.enabled:
+            return self._build(render(), last_modified)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+        # Render outside the lock; two concurrent misses for one key just render twice
+        page = self._build(render(), last_modified)
+        with self._lock:
+            self.misses += 1
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return page
+
+    @staticmethod
+    def _build(body, last_modified):
+        body = body.encode('utf-8') if isinstance(body, str) else body
+        return CachedPage(body, hashlib.sha1(body).hexdigest(), last_modified)
+
+    def retain_versions(self, versions):
+        """Drops every page whose catalog version (first key element) is not in versions."""
+        versions = set(versions)
+        with self._lock:
+            for key in [key for key in self._pages if key[0] not in versions]:
+                del self._pages[key]
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def __len__(self):
+        return len(self._pages)
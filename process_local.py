@@ -0,0 +1,65 @@
+"""Per-thread SQLite connections and background threads that survive a pre-fork server.
+
+sqlite3 connections must not be shared between threads, and a forked
+worker must not reuse a connection opened by its parent. Threads do not
+survive fork at all. The stores (results warehouse, result store, progress
+store, rate limit buckets, export jobs) open both lazily through these
+helpers, so each thread and each worker process gets its own.
+"""
+import os
+import sqlite3
+import threading
+
+
+class ThreadConnections:
+    """One sqlite3 connection per thread (and per process), opened on first use."""
+
+    def __init__(self, path, pragmas=(), **connect_args):
+        self.path = path
+        self.pragmas = tuple(pragmas)
+        self.connect_args = connect_args
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, **self.connect_args)
+            for pragma in self.pragmas:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class ProcessThreads:
+    """Background threads started on first use in each process.
+
+    start(forked) creates and starts the threads and returns them; forked is True when
+    the previous ones belong to a parent process. It runs under a lock, at most once per
+    process, and again if any of the threads has died (with restart_dead=True).
+    """
+
+    def __init__(self, start, restart_dead=True):
+        self._start = start
+        self.restart_dead = restart_dead
+        self._threads = ()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self):
+        """Whether the threads were started in this process."""
+        return self._pid == os.getpid()
+
+    def _running(self):
+        return self.started and (not self.restart_dead or all(thread.is_alive() for thread in self._threads))
+
+    def ensure(self):
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            forked = self._pid is not None and not self.started
+            self._threads = tuple(self._start(forked))
+            self._pid = os.getpid()
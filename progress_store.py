@@ -0,0 +1,186 @@
+"""Server-side copies of in-progress assessments, so an attempt can be resumed with a short code.
+
+The session cookie stays the live copy of an attempt; every answer is
+also handed to save(), which only records it in a small pending map keyed
+by resume token. A background thread writes that map to SQLite every
+flush_interval seconds, so a burst of answers from one student costs one
+row write, and the latest state wins. The map holds at most max_pending
+attempts; beyond that the caller writes the batch itself, so memory stays
+bounded however many attempts are open. The same thread deletes attempts
+that have not been touched for ttl seconds.
+
+Rows live in SQLite, so progress survives worker restarts and is shared
+by every worker using the same file.
+"""
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from process_local import ProcessThreads, ThreadConnections
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 5000
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_COMPACT_INTERVAL = 5 * 60
+# No 0/O, 1/I/L or U, so a code read off a screen or paper is easy to type back
+TOKEN_ALPHABET = 'ABCDEFGHJKMNPQRSTVWXYZ23456789'
+TOKEN_LENGTH = 10
+_DELETED = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    token TEXT PRIMARY KEY,
+    answers TEXT NOT NULL,
+    mode TEXT,
+    cohort TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_updated_at ON attempts (updated_at);
+"""
+
+
+def new_resume_token():
+    return ''.join(secrets.choice(TOKEN_ALPHABET) for _ in range(TOKEN_LENGTH))
+
+
+def normalize_token(text):
+    """Accepts codes as typed ('abcde-fghjk', with spaces, ...). Returns None if it cannot be a token."""
+    if not isinstance(text, str):
+        return None
+    token = ''.join(c for c in text.upper() if c not in ' -')
+    if len(token) != TOKEN_LENGTH or any(c not in TOKEN_ALPHABET for c in token):
+        return None
+    return token
+
+
+def format_token(token):
+    half = TOKEN_LENGTH // 2
+    return f"{token[:half]}-{token[half:]}"
+
+
+class ProgressStore:
+
+    def __init__(self, path, flush_interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING, ttl=DEFAULT_TTL,
+                 compact_interval=DEFAULT_COMPACT_INTERVAL, logger=None, clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.compact_interval = compact_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self._clock = clock
+        self.writes = 0  # Row writes actually issued (after coalescing)
+        self.saves = 0  # save() calls
+        self.expired = 0
+        self._connections = ThreadConnections(path, timeout=10.0, pragmas=("PRAGMA synchronous=NORMAL",))
+        self._pending = {}  # token -> (answers, mode, cohort, updated_at), or _DELETED
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer = ProcessThreads(self._start_writer)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def _connect(self):
+        return self._connections.get()
+
+    def _ensure_writer(self):
+        self._writer.ensure()
+
+    def _start_writer(self, forked):
+        if forked:
+            self._pending = {}  # Unwritten entries belong to the parent process
+        writer = threading.Thread(target=self._run_writer, name='progress-store-writer', daemon=True)
+        writer.start()
+        return [writer]
+
+    # --- Public API ---
+
+    def save(self, token, answers, mode=None, cohort=None):
+        """Records the latest packed answers of an attempt. Usually returns without touching the database."""
+        self._ensure_writer()
+        with self._pending_lock:
+            self._pending[token] = (answers, mode, cohort, self._clock())
+            self.saves += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self.flush()
+
+    def delete(self, token):
+        self._ensure_writer()
+        with self._pending_lock:
+            self._pending[token] = _DELETED
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self.flush()
+
+    def load(self, token):
+        """Returns {'answers', 'mode', 'cohort', 'updated_at'} for a live attempt, or None."""
+        with self._pending_lock:
+            entry = self._pending.get(token)
+        if entry is _DELETED:
+            return None
+        if entry is None:
+            entry = self._connect().execute(
+                "SELECT answers, mode, cohort, updated_at FROM attempts WHERE token = ? AND updated_at > ?",
+                (token, self._clock() - self.ttl)).fetchone()
+            if entry is None:
+                return None
+        answers, mode, cohort, updated_at = entry
+        return {'answers': answers, 'mode': mode, 'cohort': cohort, 'updated_at': updated_at}
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Writes every pending attempt now."""
+        # Batches are taken and written under one lock, so an older batch never lands after a newer one
+        with self._write_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        saved = [(token,) + entry for token, entry in batch.items() if entry is not _DELETED]
+        deleted = [(token,) for token, entry in batch.items() if entry is _DELETED]
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO attempts (token, answers, mode, cohort, updated_at) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (token) DO UPDATE SET answers = excluded.answers, mode = excluded.mode,"
+                    " cohort = excluded.cohort, updated_at = excluded.updated_at", saved)
+                conn.executemany("DELETE FROM attempts WHERE token = ?", deleted)
+            self.writes += len(batch)
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to save {len(batch)} in-progress attempts: {e}")
+
+    def compact(self):
+        """Deletes attempts idle for longer than the TTL. Returns how many were removed."""
+        with self._write_lock, self._connect() as conn:
+            removed = conn.execute("DELETE FROM attempts WHERE updated_at <= ?", (self._clock() - self.ttl,)).rowcount
+        self.expired += removed
+        if removed:
+            self.logger.info(f"Expired {removed} abandoned assessment attempts.")
+        return removed
+
+    def _run_writer(self):
+        next_compaction = time.monotonic()
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                if time.monotonic() >= next_compaction:
+                    self.compact()
+                    next_compaction = time.monotonic() + self.compact_interval
+            except Exception as e:  # Keep the writer alive; the next round retries
+                self.logger.error(f"Progress store writer error: {e}")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
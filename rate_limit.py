@@ -0,0 +1,224 @@
+"""Per-client rate limits for the assessment endpoints, enforced before Flask sees the request.
+
+Every (endpoint, client address) pair has a token bucket holding up to
+`count` requests, refilled at count/period per second. A bucket is
+stored as one float: the time at which it would be full again (the GCRA
+form of a token bucket). A request moves that time forward by
+period/count and is refused when this would put it more than `period`
+ahead of now. A missing entry is a full bucket, so entries whose time has
+passed carry no information and are dropped first when a shard is full.
+
+MemoryBuckets keeps the floats in a fixed number of dict shards, each with
+its own lock, so concurrent requests rarely wait on each other. Its
+limits are per worker process. SQLiteBuckets keeps them in one table
+instead, shared by every worker using the same file (one short
+transaction per limited request).
+
+RateLimitMiddleware wraps the WSGI app. It matches the URL against the
+app's URL map to find the endpoint. It answers refused requests with a 429
+whose body and headers are built once, so no session, request hook or
+template runs for them. Clients are told apart by REMOTE_ADDR, so behind a
+proxy it must run inside a ProxyFix that trusts the proxy's X-Forwarded-For.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from werkzeug.exceptions import HTTPException
+
+from process_local import ThreadConnections
+
+# endpoint=count/period, comma separated. Periods are seconds, or end in s, m or h.
+# Sized for a school behind one NAT address: a paginated run is about 60 requests, and a few
+# hundred students may start together. A single client cannot come near these.
+DEFAULT_LIMITS = ('assessment=3000/60s, assessment_adaptive=3000/60s, assessment_resume=300/60s, '
+                  'assessment_submit=300/60s, results=600/60s, download_results=600/60s, '
+                  'api_score=1200/60s, api_cohort_export=10/60s')
+DEFAULT_SHARDS = 16
+DEFAULT_MAX_ENTRIES = 100000  # Buckets kept in memory across all shards
+DEFAULT_CLEANUP_INTERVAL = 60.0
+PERIOD_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+TOO_MANY_REQUESTS_BODY = b"Too many requests. Please slow down and try again shortly.\n"
+
+RateLimit = namedtuple('RateLimit', ['count', 'period'])
+
+
+def parse_limits(spec, base=None):
+    """Parses 'endpoint=count/period, ...' into {endpoint: RateLimit or None}, on top of base.
+
+    'endpoint=off' removes a limit; a spec of just 'off' removes them all. An 'on' entry keeps
+    base as it is, so 'on' alone means just the base limits. Raises ValueError.
+    """
+    limits = dict(base or {})
+    spec = (spec or '').strip()
+    if spec == 'off':
+        return {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        if entry == 'on':
+            continue
+        endpoint, _, value = (text.strip() for text in entry.partition('='))
+        if not endpoint or not value:
+            raise ValueError(f"Expected 'endpoint=count/period', got '{entry}'.")
+        if value == 'off':
+            limits.pop(endpoint, None)
+            continue
+        count, _, period = value.partition('/')
+        unit = PERIOD_UNITS.get(period[-1:], None)
+        try:
+            limit = RateLimit(int(count), float(period[:-1] if unit else period) * (unit or 1))
+        except ValueError:
+            raise ValueError(f"Expected 'endpoint=count/period', got '{entry}'.")
+        if limit.count < 1 or not 0 < limit.period < math.inf:
+            raise ValueError(f"Rate limit for '{endpoint}' must allow at least one request per positive period.")
+        limits[endpoint] = limit
+    return limits
+
+
+class MemoryBuckets:
+    """Bucket times in sharded dicts, per process."""
+
+    def __init__(self, shards=DEFAULT_SHARDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self._shards = [(threading.Lock(), {}) for _ in range(shards)]
+        self._max_per_shard = max(1, max_entries // shards)
+        self.evicted = 0
+
+    def acquire(self, key, interval, window, now):
+        """Takes a token from key's bucket. Returns 0 if allowed, else the seconds until one is available."""
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            # Popped and re-inserted, so each shard stays ordered from least to most recently used
+            full_at = max(buckets.pop(key, now), now)
+            wait = full_at + interval - now - window
+            if wait > 0:
+                buckets[key] = full_at
+                return wait
+            buckets[key] = full_at + interval
+            if len(buckets) > self._max_per_shard:
+                self._evict(buckets, now)
+            return 0.0
+
+    def _evict(self, buckets, now):
+        before = len(buckets)
+        for key in [key for key, full_at in buckets.items() if full_at <= now]:
+            del buckets[key]
+        # Still full of active clients: forget the least recently seen, down to 90% to amortize the scan
+        while len(buckets) > self._max_per_shard * 0.9:
+            del buckets[next(iter(buckets))]
+        self.evicted += before - len(buckets)
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+class SQLiteBuckets:
+    """Bucket times in a SQLite table, shared by every worker process using the same file."""
+
+    def __init__(self, path, cleanup_interval=DEFAULT_CLEANUP_INTERVAL, logger=None):
+        self.path = path
+        self.cleanup_interval = cleanup_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.evicted = 0
+        self._connections = ThreadConnections(path, timeout=1.0, isolation_level=None,
+                                              pragmas=("PRAGMA synchronous=NORMAL",))
+        self._next_cleanup = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, full_at REAL NOT NULL) WITHOUT ROWID")
+        conn.close()
+
+    def _connect(self):
+        return self._connections.get()
+
+    def acquire(self, key, interval, window, now):
+        """Takes a token from key's bucket. Returns 0 if allowed, else the seconds until one is available.
+
+        Fails open: if the database is unavailable the request is allowed.
+        """
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT full_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                full_at = max(row[0], now) if row else now
+                wait = full_at + interval - now - window
+                if wait <= 0:
+                    conn.execute("INSERT INTO buckets (key, full_at) VALUES (?, ?)"
+                                 " ON CONFLICT (key) DO UPDATE SET full_at = excluded.full_at", (key, full_at + interval))
+                if now >= self._next_cleanup:
+                    self._next_cleanup = now + self.cleanup_interval
+                    self.evicted += conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,)).rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self.logger.warning(f"Rate limit store unavailable, allowing the request: {e}")
+            return 0.0
+        return max(wait, 0.0)
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+class RateLimiter:
+
+    def __init__(self, limits, store=None, clock=time.time):
+        """limits maps endpoint -> RateLimit (see parse_limits); store defaults to MemoryBuckets()."""
+        self.limits = {endpoint: limit for endpoint, limit in limits.items() if limit}
+        self.store = store if store is not None else MemoryBuckets()
+        self._clock = clock
+        # endpoint -> (seconds per token, burst window)
+        self._params = {endpoint: (limit.period / limit.count, limit.period) for endpoint, limit in self.limits.items()}
+
+    def retry_after(self, endpoint, client):
+        """Counts a request. Returns 0 if it is allowed, else the seconds the client should wait."""
+        params = self._params.get(endpoint)
+        if params is None:
+            return 0.0
+        interval, window = params
+        return self.store.acquire(f"{endpoint}|{client}", interval, window, self._clock())
+
+
+class RateLimitMiddleware:
+    """Refuses over-limit requests with a prebuilt 429 before they reach the app."""
+
+    def __init__(self, wsgi_app, url_map, limiter, enabled=None, on_reject=None):
+        self.wsgi_app = wsgi_app
+        self.url_map = url_map
+        self.limiter = limiter
+        self.enabled = enabled or (lambda: True)
+        self.on_reject = on_reject  # on_reject(endpoint), e.g. to count refusals
+        self._headers = {}  # Retry-After seconds -> header list, built on first use
+
+    def _reject_headers(self, wait):
+        seconds = max(1, math.ceil(wait))
+        headers = self._headers.get(seconds)
+        if headers is None:
+            headers = self._headers[seconds] = [
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('Content-Length', str(len(TOO_MANY_REQUESTS_BODY))),
+                ('Retry-After', str(seconds)),
+                ('Cache-Control', 'no-store'),
+            ]
+        return headers
+
+    def __call__(self, environ, start_response):
+        if self.limiter.limits and self.enabled():
+            try:
+                endpoint, _ = self.url_map.bind_to_environ(environ).match()
+            except HTTPException:  # 404, 405 and redirects are answered by the app as usual
+                endpoint = None
+            if endpoint in self.limiter.limits:
+                wait = self.limiter.retry_after(endpoint, environ.get('REMOTE_ADDR', ''))
+                if wait > 0:
+                    if self.on_reject is not None:
+                        self.on_reject(endpoint)
+                    start_response('429 Too Many Requests', list(self._reject_headers(wait)))
+                    return [TOO_MANY_REQUESTS_BODY]
+        return self.wsgi_app(environ, start_response)
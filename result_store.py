@@ -0,0 +1,124 @@
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from process_local import ThreadConnections
+
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60  # Results stay downloadable for a day
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def new_result_id():
+    """Returns an opaque, URL-safe identifier for a stored result."""
+    return secrets.token_urlsafe(16)
+
+
+class InMemoryResultStore:
+    """Process-local LRU store with a per-entry time-to-live.
+
+    Entries are kept in insertion/access order so the least recently used
+    result is evicted first once max_entries is reached.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # result_id -> (expires_at, payload)
+        self._lock = threading.Lock()
+
+    def put(self, payload, result_id=None):
+        result_id = result_id or new_result_id()
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[result_id] = (expires_at, payload)
+            self._entries.move_to_end(result_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result_id
+
+    def get(self, result_id):
+        if not result_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= self._clock():
+                del self._entries[result_id]
+                return None
+            self._entries.move_to_end(result_id)
+            return payload
+
+    def delete(self, result_id):
+        with self._lock:
+            self._entries.pop(result_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteResultStore:
+    """SQLite-backed store, shared by every worker pointing at the same file."""
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.time):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._connections = ThreadConnections(path, timeout=5.0)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " result_id TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+
+    def _connect(self):
+        return self._connections.get()
+
+    def put(self, payload, result_id=None):
+        result_id = result_id or new_result_id()
+        now = self._clock()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (result_id, expires_at, payload) VALUES (?, ?, ?)",
+                (result_id, now + self.ttl_seconds, json.dumps(payload, separators=(',', ':')))
+            )
+            # Opportunistic cleanup keeps the table bounded without a separate job.
+            conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        return result_id
+
+    def get(self, result_id):
+        if not result_id:
+            return None
+        row = self._connect().execute(
+            "SELECT payload FROM results WHERE result_id = ? AND expires_at > ?",
+            (result_id, self._clock())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, result_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE result_id = ?", (result_id,))
+
+
+def create_result_store(url=None):
+    """Builds a result store from a URL such as 'memory://' or 'sqlite:///results.db'.
+
+    Falls back to the RESULT_STORE_URL environment variable, then to an in-memory store.
+    """
+    url = url or os.environ.get('RESULT_STORE_URL', 'memory://')
+    ttl_seconds = int(os.environ.get('RESULT_STORE_TTL', DEFAULT_TTL_SECONDS))
+    if url.startswith('sqlite:///'):
+        return SQLiteResultStore(url[len('sqlite:///'):], ttl_seconds=ttl_seconds)
+    if url.startswith('memory://'):
+        max_entries = int(os.environ.get('RESULT_STORE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        return InMemoryResultStore(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unsupported result store URL: '{url}'")
@@ -0,0 +1,185 @@
+from collections import namedtuple
+from itertools import compress
+from operator import itemgetter, mul
+
+from answer_codec import MAX_SCORE, MIN_SCORE
+
+ScoreResult = namedtuple('ScoreResult', ['scores', 'percentages', 'primary_styles'])
+
+# Per-style normalization of the weighted total into a percentage:
+#   'max'   total / highest possible total (the default; 0% only when nothing was answered)
+#   'range' (total - lowest possible) / (highest - lowest), so all-MIN_SCORE answers give 0%. Unanswered
+#           questions count 0, below MIN_SCORE, so partial runs can fall under the floor: those clamp to 0%
+NORMALIZATIONS = ('max', 'range')
+DEFAULT_NORMALIZATION = 'max'
+DEFAULT_WEIGHT = 1
+_TIE_TOLERANCE = 1e-9  # Normalized scores this close count as a tie for the primary style
+_MAX_TABLE_SIZE = 10000  # Largest style total that gets a precomputed percentage table
+
+
+def question_weight(question):
+    """A question's weight as stored in the catalog: an int when it is whole, so unweighted totals stay ints."""
+    weight = question.get('weight', DEFAULT_WEIGHT)
+    return int(weight) if float(weight).is_integer() else float(weight)
+
+
+def scoring_settings(learning_styles, questions):
+    """The catalog's non-default weights, reverse keying and normalizations, as JSON-ready lists.
+
+    Empty for a plain catalog. Part of the catalog version, so a reload that scores differently
+    never shares a version (sessions, warehouse rows, analytics) with the old scoring model.
+    """
+    settings = [[position, question_weight(question), bool(question.get('reverse', False))]
+                for position, question in enumerate(questions)
+                if question_weight(question) != DEFAULT_WEIGHT or question.get('reverse', False)]
+    normalizations = {name: (style or {}).get('normalization', DEFAULT_NORMALIZATION)
+                      for name, style in learning_styles.items()}
+    normalizations = {name: value for name, value in normalizations.items() if value != DEFAULT_NORMALIZATION}
+    return [settings, normalizations] if settings or normalizations else []
+
+
+class ScoringEngine:
+    """Scores answer vectors against a fixed catalog.
+
+    Built once per loaded catalog: the question -> style index, dense
+    per-question slope and offset arrays and the per-style bounds are
+    computed up front. A question contributes slope * answer + offset,
+    where slope is its weight (negated for reverse-keyed questions) and
+    offset is weight * (MIN_SCORE + MAX_SCORE) for reverse-keyed questions
+    that were answered, 0 otherwise. Scoring an answer vector (one score per
+    entry in ALL_QUESTIONS, 0 = unanswered) is a single pass of C-level
+    gathers, products and sums with no dict lookups per answer.
+    """
+
+    def __init__(self, learning_styles, questions):
+        self.style_names = tuple(learning_styles)
+        self.question_count = len(questions)
+        positions_by_style = {style_name: [] for style_name in self.style_names}
+        for position, question in enumerate(questions):
+            if question['style'] in positions_by_style:
+                positions_by_style[question['style']].append(position)
+        # Question index -> style index array (-1 for questions whose style is not in the catalog)
+        style_index = {style_name: i for i, style_name in enumerate(self.style_names)}
+        self.question_styles = tuple(style_index.get(question['style'], -1) for question in questions)
+        self.question_weights = tuple(question_weight(question) for question in questions)
+        self.question_reversed = tuple(bool(question.get('reverse', False)) for question in questions)
+        self.slopes = tuple(-weight if reverse else weight
+                            for weight, reverse in zip(self.question_weights, self.question_reversed))
+        self.offsets = tuple(weight * (MIN_SCORE + MAX_SCORE) if reverse else 0
+                             for weight, reverse in zip(self.question_weights, self.question_reversed))
+
+        self.normalizations = tuple((learning_styles[name] or {}).get('normalization', DEFAULT_NORMALIZATION)
+                                    for name in self.style_names)
+        style_weights = [sum(self.question_weights[p] for p in positions_by_style[name]) for name in self.style_names]
+        self.max_scores = tuple(MAX_SCORE * weight for weight in style_weights)
+        self.min_scores = tuple(MIN_SCORE * weight for weight in style_weights)
+        # percentage = (total - floor) * factor
+        self.score_floors = tuple(minimum if normalization == 'range' else 0
+                                  for minimum, normalization in zip(self.min_scores, self.normalizations))
+        self.percent_factors = tuple(100.0 / (maximum - floor) if maximum > floor else 0.0
+                                     for maximum, floor in zip(self.max_scores, self.score_floors))
+        self._gatherers = tuple(self._make_gatherer(positions_by_style[name]) for name in self.style_names)
+        self._scorers = tuple(self._make_scorer(positions_by_style[name]) for name in self.style_names)
+        # Without weights or reverse keying a style's total is just sum(gather(answers)), without the extra call
+        self._unweighted = all(slope == 1 for slope in self.slopes)
+        # Fast paths for the common catalog: whole weights (int totals) and no 'range' styles
+        self._whole_totals = all(type(slope) is int and type(offset) is int
+                                 for slope, offset in zip(self.slopes, self.offsets))
+        self._floorless = not any(self.score_floors)
+        # With whole weights every possible total is an int in 0..max, so its percentage (unrounded for the
+        # primary style comparison, and rounded for display) is precomputed: round() dominated _build_result
+        self._percent_tables = None
+        if self._whole_totals and all(weight > 0 for weight in self.question_weights) \
+                and max(self.max_scores, default=0) <= _MAX_TABLE_SIZE:
+            self._percent_tables = tuple({total: self.normalized_one(style, total) for total in range(maximum + 1)}
+                                         for style, maximum in enumerate(self.max_scores))
+            self._rounded_tables = tuple({total: round(value, 1) for total, value in table.items()}
+                                         for table in self._percent_tables)
+
+    @staticmethod
+    def _make_gatherer(positions):
+        if not positions:
+            return lambda answers: ()
+        if len(positions) == 1:
+            # itemgetter with a single index returns a scalar; keep the result iterable for sum()
+            position = positions[0]
+            return lambda answers: (answers[position],)
+        return itemgetter(*positions)
+
+    def _make_scorer(self, positions):
+        gather = self._make_gatherer(positions)
+        slopes = [self.slopes[p] for p in positions]
+        offsets = [self.offsets[p] for p in positions]
+        if all(slope == 1 for slope in slopes):
+            return lambda answers: sum(gather(answers))
+        if not any(offsets):
+            return lambda answers: sum(map(mul, gather(answers), slopes))
+
+        def score(answers):
+            values = gather(answers)
+            # Reverse-keyed offsets only apply to answered questions (compress skips the 0s)
+            return sum(map(mul, values, slopes)) + sum(compress(offsets, values))
+        return score
+
+    def raw_scores(self, answers):
+        """Returns per-style weighted totals, in style_names order."""
+        if len(answers) != self.question_count:
+            raise ValueError(f"Expected {self.question_count} answers, got {len(answers)}.")
+        if self._unweighted:
+            return [sum(gather(answers)) for gather in self._gatherers]
+        return [score(answers) for score in self._scorers]
+
+    def normalized(self, totals):
+        """Per-style percentages (unrounded) for a list of totals in style_names order."""
+        if self._floorless:
+            return list(map(mul, totals, self.percent_factors))
+        return [max((total - floor) * factor, 0.0)
+                for total, floor, factor in zip(totals, self.score_floors, self.percent_factors)]
+
+    def normalized_one(self, style, total):
+        """The unrounded percentage of one style's total (style is an index into style_names)."""
+        return max((total - self.score_floors[style]) * self.percent_factors[style], 0.0)
+
+    def score(self, answers):
+        return self._build_result(self.raw_scores(answers))
+
+    def score_batch(self, answer_vectors):
+        """Scores many answer vectors, returning an iterator of ScoreResults in input order.
+
+        Totals are computed a style at a time over the whole batch (a C-level map per style), so
+        the per-vector Python work is building the results. Vectors are read into memory first:
+        pass chunks, not a whole file.
+        """
+        vectors = answer_vectors if isinstance(answer_vectors, (list, tuple)) else list(answer_vectors)
+        bad_length = next((length for length in map(len, vectors) if length != self.question_count), None)
+        if bad_length is not None:
+            raise ValueError(f"Expected {self.question_count} answers, got {bad_length}.")
+        if not self.style_names:
+            return (self._build_result([]) for _ in vectors)
+        if self._unweighted:
+            columns = [list(map(sum, map(gather, vectors))) for gather in self._gatherers]
+        else:
+            columns = [list(map(score, vectors)) for score in self._scorers]
+        return map(self._build_result, zip(*columns))
+
+    def _build_result(self, totals):
+        style_names = self.style_names
+        normalized = None
+        if self._percent_tables is not None:
+            try:
+                normalized = list(map(dict.__getitem__, self._percent_tables, totals))
+                rounded = map(dict.__getitem__, self._rounded_tables, totals)
+            except KeyError:  # A total outside 0..max, from answers outside MIN_SCORE..MAX_SCORE
+                normalized = None
+        if normalized is None:
+            normalized = self.normalized(totals)
+            rounded = [round(value, 1) for value in normalized]
+        percentages = dict(zip(style_names, rounded))
+        # Styles are compared on the normalized scale, so styles with more (or heavier) questions don't win by size
+        top = max(normalized, default=0)
+        threshold = top - _TIE_TOLERANCE
+        primary_styles = [name for name, value in zip(style_names, normalized)
+                          if value >= threshold] if top > 0 or any(totals) else []
+        if not self._whole_totals:
+            totals = [round(total, 2) for total in totals]
+        return ScoreResult(dict(zip(style_names, totals)), percentages, primary_styles)
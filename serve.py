@@ -0,0 +1,215 @@
+"""Production entry point: pre-forked workers sharing one listening socket.
+
+    python serve.py --workers 4 --port 8080
+
+The master process imports the app once, which loads and precomputes the
+catalog, then forks the workers. Every worker inherits the loaded catalog
+(shared copy-on-write, with the GC told to leave those objects alone) and
+the listening socket, and serves it with a threaded werkzeug server. No
+worker re-parses learning_data.json at startup.
+
+SIGTERM or SIGINT shuts down gracefully: /readyz starts returning 503, each
+worker stops accepting connections after --drain-delay seconds, finishes its
+in-flight requests (up to --graceful-timeout), flushes queued warehouse
+and assessment-progress writes and exits. The master restarts workers that die unexpectedly.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 8080
+DEFAULT_GRACEFUL_TIMEOUT = 30.0
+RESPAWN_BACKOFF_SECONDS = 1.0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=os.environ.get('HOST', DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', DEFAULT_PORT)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)),
+                        help='Worker processes (default: WEB_CONCURRENCY or the number of CPUs).')
+    parser.add_argument('--graceful-timeout', type=float, default=DEFAULT_GRACEFUL_TIMEOUT,
+                        help='Seconds a stopping worker waits for in-flight requests.')
+    parser.add_argument('--drain-delay', type=float, default=0.0,
+                        help='Seconds a stopping worker keeps accepting (with /readyz failing) so load balancers can react.')
+    return parser.parse_args(argv)
+
+
+def configure_environment(workers):
+    """Defaults that only matter with several processes; must run before the app is imported."""
+    if workers > 1 and 'RESULT_STORE_URL' not in os.environ:
+        # The in-memory store is per process, so a result stored by one worker could not be downloaded from another
+        instance_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+        os.makedirs(instance_dir, exist_ok=True)
+        os.environ['RESULT_STORE_URL'] = f"sqlite:///{os.path.join(instance_dir, 'result_store.db')}"
+
+
+class InFlightRequests:
+    """WSGI middleware that counts requests whose responses have not finished, for draining."""
+
+    def __init__(self, app, draining):
+        self.app = app
+        self.draining = draining
+        self._count = 0
+        self._idle = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        with self._idle:
+            self._count += 1
+
+        def start_draining_response(status, headers, exc_info=None):
+            if self.draining.is_set():
+                headers = [h for h in headers if h[0].lower() != 'connection'] + [('Connection', 'close')]
+            return start_response(status, headers, exc_info)
+
+        try:
+            response = self.app(environ, start_draining_response)
+        except BaseException:
+            self._finished()
+            raise
+        return ClosingIterator(response, self._finished)
+
+    def _finished(self):
+        with self._idle:
+            self._count -= 1
+            if self._count == 0:
+                self._idle.notify_all()
+
+    def __len__(self):
+        return self._count
+
+    def wait_idle(self, timeout):
+        """Blocks until no request is in flight. Returns False if the timeout expired first."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._count == 0, timeout)
+
+
+def run_worker(app_module, listener, args):
+    """Serves the inherited socket until SIGTERM/SIGINT, then drains. Never returns."""
+    from werkzeug.serving import make_server
+
+    app = app_module.app
+    tracked = InFlightRequests(app, app_module.draining)
+    server = make_server(args.host, args.port, tracked, threaded=True, fd=listener.fileno())
+
+    def stop_accepting():
+        time.sleep(args.drain_delay)
+        server.shutdown()
+
+    def begin_drain(signum, frame):
+        if app_module.draining.is_set():
+            return
+        app_module.draining.set()
+        app.logger.info(f"Worker {os.getpid()} draining ({len(tracked)} requests in flight).")
+        # shutdown() waits for serve_forever() to return, so it cannot run in the signal handler's thread
+        threading.Thread(target=stop_accepting, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, begin_drain)
+    signal.signal(signal.SIGINT, begin_drain)
+    app_module.start_catalog_watcher()
+
+    exit_code = 0
+    try:
+        server.serve_forever()
+        if not tracked.wait_idle(args.graceful_timeout):
+            app.logger.warning(f"Worker {os.getpid()} stopped with {len(tracked)} requests still in flight.")
+            exit_code = 1
+        app_module.results_warehouse.flush()
+        app_module.progress_store.flush()
+    except Exception as e:
+        app.logger.error(f"Worker {os.getpid()} failed: {e}")
+        exit_code = 1
+    finally:
+        server.server_close()
+    os._exit(exit_code)
+
+
+def spawn_worker(app_module, listener, args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app_module, listener, args)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args.workers)
+
+    import main as app_module  # Loads learning_data.json once, in the master
+
+    logger = app_module.app.logger
+    logger.setLevel('INFO')
+    if not app_module.catalog_manager.current:
+        logger.warning("No catalog loaded; workers will report not ready on /readyz.")
+
+    listener = socket.create_server((args.host, args.port), backlog=2048)
+    listener.set_inheritable(True)
+
+    # Objects created so far (the catalog, the app) are never freed; moving them out of the GC's
+    # generations stops collections in the workers from touching, and so copying, their pages.
+    gc.collect()
+    gc.freeze()
+
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    workers = {spawn_worker(app_module, listener, args) for _ in range(max(1, args.workers))}
+    logger.info(f"Serving on http://{args.host}:{args.port} with {len(workers)} workers "
+                f"(catalog version {app_module.catalog_manager.current.version}).")
+
+    while not stopping.is_set():
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid and pid in workers:
+            workers.discard(pid)
+            logger.error(f"Worker {pid} exited unexpectedly (status {status}); starting a replacement.")
+            time.sleep(RESPAWN_BACKOFF_SECONDS)  # Don't spin if workers crash on startup
+            if not stopping.is_set():
+                workers.add(spawn_worker(app_module, listener, args))
+            continue
+        stopping.wait(0.2)
+
+    logger.info(f"Shutting down {len(workers)} workers.")
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + args.drain_delay + args.graceful_timeout + 5
+    exit_code = 0
+    while workers and time.monotonic() < deadline:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid:
+            workers.discard(pid)
+            if status != 0:
+                exit_code = 1
+        else:
+            time.sleep(0.05)
+    for pid in workers:
+        logger.warning(f"Worker {pid} did not stop in time; killing it.")
+        os.kill(pid, signal.SIGKILL)
+        exit_code = 1
+    listener.close()
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
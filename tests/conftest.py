@@ -0,0 +1,16 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# main.py opens its stores when it is imported. Point them at a scratch directory first, so test runs
+# never write to the app's real instance/ directory (subprocesses started by the tests inherit this too).
+_instance_dir = tempfile.mkdtemp(prefix='learning-styles-tests-')
+atexit.register(shutil.rmtree, _instance_dir, ignore_errors=True)
+
+os.environ['RESULTS_WAREHOUSE_PATH'] = os.path.join(_instance_dir, 'results.db')
+os.environ['PROGRESS_STORE_PATH'] = os.path.join(_instance_dir, 'progress.db')
+os.environ['EXPORT_DIR'] = os.path.join(_instance_dir, 'exports')
+os.environ['RESULT_STORE_URL'] = f"sqlite:///{os.path.join(_instance_dir, 'result_store.db')}"
+os.environ.pop('RATE_LIMIT_STORE', None)
+os.environ.pop('TRUSTED_PROXY_HOPS', None)
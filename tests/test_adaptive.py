@@ -0,0 +1,90 @@
+import os
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from adaptive import AdaptivePlan
+from scoring import ScoringEngine
+
+STYLES = ['Visual', 'Auditory', 'Kinesthetic']
+
+
+def build_plan(questions_per_style=3):
+    learning_styles = {style: {} for style in STYLES}
+    questions = [
+        {'id': i + 1, 'text': f"{style} {k}", 'style': style}
+        for i, (style, k) in enumerate((style, k) for style in STYLES for k in range(questions_per_style))
+    ]
+    return AdaptivePlan(ScoringEngine(learning_styles, questions))
+
+
+def answers_in_order(plan, scores):
+    """Answer vector with scores given in the plan's asking order (the rest unanswered)."""
+    answers = [0] * len(plan.question_styles)
+    for position, score in zip(plan.order, scores):
+        answers[position] = score
+    return answers
+
+
+class TestAdaptivePlan(unittest.TestCase):
+
+    def test_order_interleaves_styles(self):
+        plan = build_plan(3)
+        self.assertEqual(plan.order, (0, 3, 6, 1, 4, 7, 2, 5, 8))
+        self.assertEqual(len(plan), 9)
+
+    def test_uneven_styles_are_interleaved_until_exhausted(self):
+        learning_styles = {'A': {}, 'B': {}}
+        questions = [{'style': 'A'}, {'style': 'A'}, {'style': 'A'}, {'style': 'B'}]
+        self.assertEqual(AdaptivePlan(ScoringEngine(learning_styles, questions)).order, (0, 3, 1, 2))
+
+    def test_stops_when_no_style_can_catch_the_leader(self):
+        plan = build_plan(3)
+        # After two rounds Visual has 10 and at least 11; the others have 2 and at most 7
+        answers = answers_in_order(plan, [5, 1, 1, 5, 1, 1])
+        decision = plan.decision(answers, confidence=1.0)
+        self.assertTrue(decision.decided)
+        self.assertEqual((decision.leader, decision.reason), ('Visual', 'certain'))
+
+    def test_does_not_stop_while_the_outcome_is_open(self):
+        plan = build_plan(3)
+        self.assertFalse(plan.decision(answers_in_order(plan, [5, 1, 1]), confidence=1.0).decided)
+        self.assertFalse(plan.decision(answers_in_order(plan, [4, 4, 3, 4, 4, 3]), confidence=0.95).decided)
+
+    def test_confidence_rule_stops_before_certainty(self):
+        plan = build_plan(10)
+        answers = answers_in_order(plan, [5, 1, 1] * 3)
+        self.assertFalse(plan.decision(answers, confidence=1.0).decided)
+        decision = plan.decision(answers, confidence=0.95)
+        self.assertTrue(decision.decided)
+        self.assertEqual((decision.leader, decision.reason), ('Visual', 'confident'))
+
+    def test_confidence_rule_waits_for_every_style(self):
+        plan = build_plan(10)
+        self.assertFalse(plan.decision(answers_in_order(plan, [5, 1, 1]), confidence=0.5).decided)
+
+    def test_complete_fills_skipped_questions_with_the_style_mean(self):
+        plan = build_plan(3)
+        answers = answers_in_order(plan, [5, 2, 1, 4])
+        completed = plan.complete(answers)
+        self.assertEqual(completed[0:3], [5, 4, 4])  # Visual: mean of 5 and 4, rounded half to even
+        self.assertEqual(completed[3:6], [2, 2, 2])
+        self.assertEqual(completed[6:9], [1, 1, 1])
+        self.assertEqual(plan.complete([0] * 9), [3] * 9)
+
+
+    def test_weighted_and_reverse_keyed_questions(self):
+        learning_styles = {'A': {}, 'B': {}}
+        questions = [{'style': 'A'}, {'style': 'B', 'weight': 2}, {'style': 'B', 'reverse': True}]
+        plan = AdaptivePlan(ScoringEngine(learning_styles, questions))
+        # A is final at 1/5 = 20%; B already has at least (2*2 + 1)/15 = 33%
+        decision = plan.decision([1, 2, 0], confidence=1.0)
+        self.assertEqual((decision.leader, decision.reason), ('B', 'certain'))
+        self.assertFalse(plan.decision([4, 4, 0], confidence=1.0).decided)  # A 80%, B between 60% and 87%
+        # Skipped reverse-keyed questions get the mirror of the style's keyed mean
+        self.assertEqual(plan.complete([3, 4, 0]), [3, 4, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import math
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics import ItemStatistics, ResponseAnalytics
+from catalog import CatalogSnapshot
+from warehouse import ResultsWarehouse
+
+STYLE_NAMES = ('Visual', 'Auditory')
+QUESTION_STYLES = (0, 0, 0, 1, 1)
+RESPONSES = [
+    [5, 4, 5, 1, 2],
+    [2, 1, 2, 4, 5],
+    [4, 4, 3, 2, 2],
+    [1, 2, 1, 5, 4],
+    [3, 3, 4, 3, 3],
+]
+
+CATALOG = CatalogSnapshot([
+    {"style_name": "Visual", "questions": ["V1", "V2", "V3"], "recommendations": []},
+    {"style_name": "Auditory", "questions": ["A1", "A2"], "recommendations": []},
+])
+
+
+def textbook_alpha(rows, positions):
+    k = len(positions)
+    item_variances = sum(statistics.variance([row[p] for row in rows]) for p in positions)
+    total_variance = statistics.variance([sum(row[p] for p in positions) for row in rows])
+    return k / (k - 1) * (1 - item_variances / total_variance)
+
+
+class TestItemStatistics(unittest.TestCase):
+
+    def online(self, responses):
+        stats = ItemStatistics(QUESTION_STYLES, len(STYLE_NAMES))
+        for answers in responses:
+            stats.add(answers)
+        return stats
+
+    def test_matches_textbook_formulas(self):
+        report = self.online(RESPONSES).report(STYLE_NAMES)
+        self.assertEqual(report['responses'], 5)
+
+        first = report['items'][0]
+        self.assertAlmostEqual(first['mean'], statistics.mean(row[0] for row in RESPONSES))
+        self.assertAlmostEqual(first['variance'], statistics.variance([row[0] for row in RESPONSES]))
+        rest = [row[1] + row[2] for row in RESPONSES]
+        self.assertAlmostEqual(first['item_rest_correlation'], statistics.correlation([row[0] for row in RESPONSES], rest))
+
+        self.assertAlmostEqual(report['styles']['Visual']['alpha'], textbook_alpha(RESPONSES, (0, 1, 2)))
+        self.assertAlmostEqual(report['styles']['Auditory']['alpha'], textbook_alpha(RESPONSES, (3, 4)))
+        visual = [sum(row[:3]) for row in RESPONSES]
+        auditory = [sum(row[3:]) for row in RESPONSES]
+        self.assertAlmostEqual(report['correlations']['Visual']['Auditory'], statistics.correlation(visual, auditory))
+        self.assertAlmostEqual(report['correlations']['Visual']['Visual'], 1.0)
+
+    def test_online_updates_match_a_batch_recompute(self):
+        rng = random.Random(7)
+        responses = [[rng.randint(1, 5) for _ in QUESTION_STYLES] for _ in range(500)]
+        online = self.online(responses).report(STYLE_NAMES)
+        batch = ItemStatistics.from_matrix(QUESTION_STYLES, len(STYLE_NAMES), responses).report(STYLE_NAMES)
+        for name in STYLE_NAMES:
+            self.assertTrue(math.isclose(online['styles'][name]['alpha'], batch['styles'][name]['alpha'], abs_tol=1e-9))
+        for online_item, batch_item in zip(online['items'], batch['items']):
+            self.assertAlmostEqual(online_item['variance'], batch_item['variance'])
+            self.assertAlmostEqual(online_item['item_rest_correlation'], batch_item['item_rest_correlation'])
+
+    def test_incomplete_responses_are_skipped(self):
+        stats = self.online(RESPONSES[:1] + [[5, 0, 5, 1, 2], [5, 4]])
+        report = stats.report(STYLE_NAMES)
+        self.assertEqual((report['responses'], report['skipped']), (1, 2))
+        # One response has no variance yet
+        self.assertIsNone(report['items'][0]['variance'])
+        self.assertIsNone(report['styles']['Visual']['alpha'])
+
+    def test_reverse_keyed_items_are_flipped(self):
+        flipped = [row[:2] + [6 - row[2]] + row[3:] for row in RESPONSES]
+        stats = ItemStatistics.from_matrix(QUESTION_STYLES, len(STYLE_NAMES), flipped, (False, False, True, False, False))
+        report = stats.report(STYLE_NAMES)
+        self.assertAlmostEqual(report['styles']['Visual']['alpha'], textbook_alpha(RESPONSES, (0, 1, 2)))
+        self.assertAlmostEqual(report['items'][2]['mean'], statistics.mean(row[2] for row in RESPONSES))
+
+
+class TestResponseAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.warehouse = ResultsWarehouse(os.path.join(self.tmp_dir, 'results.db'), flush_interval=0.01)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def record(self, responses, version=None):
+        for answers in responses:
+            self.warehouse.record(None, version or CATALOG.version, {}, [], answers)
+        self.warehouse.flush()
+
+    def test_updates_read_only_new_results_of_the_version(self):
+        analytics = ResponseAnalytics()
+        self.record(RESPONSES[:2])
+        self.record(RESPONSES, version='another')
+        self.assertEqual(analytics.update(self.warehouse, CATALOG).n, 2)
+        self.record(RESPONSES[2:])
+        stats = analytics.update(self.warehouse, CATALOG)
+        self.assertEqual(stats.n, 5)
+
+        recomputed = analytics.recompute(self.warehouse, CATALOG)
+        self.assertEqual(recomputed.n, 5)
+        self.assertAlmostEqual(recomputed.report(STYLE_NAMES)['styles']['Visual']['alpha'],
+                               stats.report(STYLE_NAMES)['styles']['Visual']['alpha'])
+        self.assertEqual(analytics.update(self.warehouse, CATALOG).n, 5)  # Nothing new since the recompute
+
+
+if __name__ == '__main__':
+    unittest.main()
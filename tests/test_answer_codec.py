@@ -0,0 +1,43 @@
+import os
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from answer_codec import answered_count, catalog_version, decode_answers, empty_answers, encode_answers
+
+QUESTIONS = [
+    {'id': 1, 'text': 'Q1', 'style': 'Visual'},
+    {'id': 2, 'text': 'Q2', 'style': 'Auditory'},
+    {'id': 3, 'text': 'Q3', 'style': 'Auditory'},
+]
+
+
+class TestAnswerCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        version = catalog_version(QUESTIONS)
+        packed = encode_answers([5, 0, 3], version)
+        self.assertEqual(packed, f"{version}:503")
+        self.assertEqual(decode_answers(packed, version, 3), [5, 0, 3])
+        self.assertEqual(answered_count([5, 0, 3]), 2)
+
+    def test_encoded_size_does_not_depend_on_answered_count(self):
+        version = catalog_version(QUESTIONS)
+        self.assertEqual(len(encode_answers(empty_answers(200), version)), len(encode_answers([5] * 200, version)))
+
+    def test_version_changes_with_catalog_content(self):
+        edited = QUESTIONS[:2] + [{'id': 3, 'text': 'Q3 (reworded)', 'style': 'Auditory'}]
+        self.assertNotEqual(catalog_version(QUESTIONS), catalog_version(edited))
+
+    def test_rejects_stale_or_malformed_values(self):
+        version = catalog_version(QUESTIONS)
+        self.assertIsNone(decode_answers(encode_answers([1, 2, 3], 'deadbeef'), version, 3))
+        self.assertIsNone(decode_answers(f"{version}:12", version, 3))
+        self.assertIsNone(decode_answers(f"{version}:129", version, 3))
+        self.assertIsNone(decode_answers(f"{version}:1a3", version, 3))
+        self.assertIsNone(decode_answers({'1': {'score': 5, 'style': 'Visual'}}, version, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
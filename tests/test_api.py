@@ -0,0 +1,60 @@
+import os
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from main import app as flask_app
+
+
+class TestJsonApi(unittest.TestCase):
+    """Runs against the catalog loaded from learning_data.json at import."""
+
+    @classmethod
+    def setUpClass(cls):
+        flask_app.config['TESTING'] = True
+        cls.client = flask_app.test_client()
+
+    def assertSessionUntouched(self, response):
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertNotIn('Cookie', response.headers.get('Vary', ''))
+
+    def test_catalog_is_served_with_strong_etag(self):
+        response = self.client.get('/api/v1/catalog')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], f'"{main.catalog_manager.current.etag}"')
+        body = response.get_json()
+        self.assertEqual(body['version'], main.catalog_manager.current.version)
+        self.assertEqual(len(body['questions']), len(main.catalog_manager.current.questions))
+        self.assertSessionUntouched(response)
+
+    def test_catalog_revalidation_returns_304(self):
+        etag = self.client.get('/api/v1/catalog').headers['ETag']
+        response = self.client.get('/api/v1/catalog', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_score_returns_scores_primary_styles_and_recommendations(self):
+        first_style = main.catalog_manager.current.questions[0]['style']
+        answers = [5 if q['style'] == first_style else 1 for q in main.catalog_manager.current.questions]
+        response = self.client.post('/api/v1/score', json={'answers': answers, 'version': main.catalog_manager.current.version})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['primary_styles'], [first_style])
+        self.assertEqual(body['percentages'][first_style], 100.0)
+        self.assertEqual(body['recommendations'][first_style], main.catalog_manager.current.learning_styles[first_style]['recommendations'])
+        self.assertSessionUntouched(response)
+
+    def test_score_rejects_invalid_payloads(self):
+        self.assertEqual(self.client.post('/api/v1/score', data='not json').status_code, 400)
+        self.assertEqual(self.client.post('/api/v1/score', json={'answers': [5]}).status_code, 400)
+        bad_scores = [7] * len(main.catalog_manager.current.questions)
+        self.assertEqual(self.client.post('/api/v1/score', json={'answers': bad_scores}).status_code, 400)
+        stale = {'answers': [3] * len(main.catalog_manager.current.questions), 'version': 'stale000'}
+        self.assertEqual(self.client.post('/api/v1/score', json=stale).status_code, 409)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, render_template_string, url_for
+
+from assets import CDN_FALLBACKS, IMMUTABLE_MAX_AGE, StaticAssets, build_assets, minify_css, vendor_assets
+from main import app as flask_app
+
+STYLE = """/* Site styles */
+body {
+    color : #424242;
+    font-family: 'Roboto', sans-serif;
+}
+nav > a { content: "a  ,  b"; }
+"""
+
+
+class TestAssetPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.static = tempfile.mkdtemp()
+        with open(os.path.join(self.static, 'style.css'), 'w') as f:
+            f.write(STYLE * 20)
+        vendor_assets(self.static, fetch=lambda url: f"/* downloaded from {url} */".encode('utf-8'))
+        self.app = Flask(__name__, static_folder=self.static, static_url_path='/static')
+        self.app.add_url_rule('/page', 'page', lambda: render_template_string(
+            "{{ url_for('static', filename='style.css') }} {{ asset_url('vendor/material-icons.css') }}"))
+
+    def tearDown(self):
+        shutil.rmtree(self.static)
+
+    def install(self):
+        assets = StaticAssets(self.static)
+        assets.install(self.app)
+        return assets, self.app.test_client()
+
+    def test_minify_css_keeps_strings(self):
+        self.assertEqual(minify_css(STYLE), 'body{color :#424242;font-family:\'Roboto\',sans-serif}nav>a{content:"a  ,  b"}')
+
+    def test_build_fingerprints_compresses_and_rewrites_urls(self):
+        manifest = build_assets(self.static)
+        hashed_style = manifest['files']['style.css']
+        self.assertRegex(hashed_style, r'^dist/style\.[0-9a-f]{12}\.css$')
+        self.assertIn('gzip', manifest['encodings'][hashed_style])
+        with open(os.path.join(self.static, hashed_style), 'rb') as f:
+            minified = f.read()
+        with open(os.path.join(self.static, hashed_style + '.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), minified)
+
+        with open(os.path.join(self.static, manifest['files']['vendor/material-icons.css'])) as f:
+            icons_css = f.read()
+        font = os.path.basename(manifest['files']['vendor/MaterialIcons-Regular.woff2'])
+        self.assertIn(f"url({font})", icons_css)
+
+        self.assertEqual(build_assets(self.static)['files'], manifest['files'])  # Reproducible
+
+    def test_hashed_urls_are_served_immutable_and_precompressed(self):
+        manifest = build_assets(self.static)
+        _, client = self.install()
+        with self.app.test_request_context():
+            url = url_for('static', filename='style.css')
+        self.assertEqual(url, f"/static/{manifest['files']['style.css']}")
+
+        response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'text/css')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertTrue(response.cache_control.immutable)
+        self.assertEqual(response.cache_control.max_age, IMMUTABLE_MAX_AGE)
+        response.close()
+
+        plain = client.get(url)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertTrue(plain.data.startswith(b'body{'))
+        plain.close()
+
+        source = client.get('/static/style.css')  # Unhashed names still work, without the long cache
+        self.assertEqual(source.status_code, 200)
+        self.assertFalse(source.cache_control.immutable)
+        source.close()
+
+    def test_vendor_assets_fall_back_to_the_cdn_until_downloaded(self):
+        os.remove(os.path.join(self.static, 'vendor', 'material-icons.css'))
+        _, client = self.install()
+        self.assertEqual(client.get('/page').get_data(as_text=True),
+                         f"/static/style.css {CDN_FALLBACKS['vendor/material-icons.css']}")
+
+    def test_app_pages_use_local_or_fallback_assets(self):
+        page = flask_app.test_client().get('/').get_data(as_text=True)
+        self.assertNotIn('fonts.googleapis.com/css', page)
+        self.assertIn('materialize.min.js', page)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch_scoring import score_file
+from scoring import ScoringEngine
+
+LEARNING_STYLES = {'Visual': {}, 'Auditory': {}}
+QUESTIONS = [
+    {'id': 1, 'text': 'Q1V', 'style': 'Visual'},
+    {'id': 2, 'text': 'Q2V', 'style': 'Visual'},
+    {'id': 3, 'text': 'Q1A', 'style': 'Auditory'},
+]
+
+
+class TestBatchScoring(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.engine = ScoringEngine(LEARNING_STYLES, QUESTIONS)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def test_csv_in_csv_out(self):
+        with open(self.path('in.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['respondent_id', 'q1', 'q2', 'q3'])
+            writer.writerow(['alice', '5', '4', '3'])
+            writer.writerow(['bob', '1', '', '5'])
+            writer.writerow(['carol', '9', '1', '1'])
+
+        count = score_file(self.path('in.csv'), self.path('out.csv'), self.engine, chunk_size=2)
+
+        self.assertEqual(count, 3)
+        with open(self.path('out.csv'), newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row['respondent_id'] for row in rows], ['alice', 'bob', 'carol'])
+        self.assertEqual(rows[0]['primary_styles'], 'Visual')
+        self.assertEqual(rows[0]['Visual score'], '9')
+        self.assertEqual(rows[1]['primary_styles'], 'Auditory')
+        self.assertIn('outside', rows[2]['error'])
+
+    def test_jsonl_with_process_pool_preserves_order(self):
+        with open(self.path('in.jsonl'), 'w') as f:
+            for i in range(25):
+                f.write(json.dumps({'respondent_id': i, 'answers': [i % 5 + 1, 1, 3]}) + '\n')
+
+        count = score_file(self.path('in.jsonl'), self.path('out.jsonl'), self.engine, chunk_size=4, workers=2)
+
+        self.assertEqual(count, 25)
+        with open(self.path('out.jsonl')) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r['respondent_id'] for r in records], list(range(25)))
+        self.assertEqual(records[4]['scores'], {'Visual': 6, 'Auditory': 3})
+
+    def test_unreadable_jsonl_lines_become_error_records(self):
+        with open(self.path('in.jsonl'), 'w') as f:
+            f.write(json.dumps({'respondent_id': 'alice', 'answers': [5, 4, 3]}) + '\n')
+            f.write('not json\n')
+            f.write('[5, 4, 3]\n')
+            f.write(json.dumps({'respondent_id': 'bob', 'answers': [1, 1, 5]}) + '\n')
+
+        for workers in (1, 2):
+            count = score_file(self.path('in.jsonl'), self.path('out.jsonl'), self.engine, chunk_size=2, workers=workers)
+
+            self.assertEqual(count, 4)
+            with open(self.path('out.jsonl')) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual([r['respondent_id'] for r in records], ['alice', 2, 3, 'bob'])
+            self.assertIn('invalid JSON', records[1]['error'])
+            self.assertIn('JSON object', records[2]['error'])
+            self.assertEqual(records[3]['primary_styles'], ['Auditory'])
+
+    def test_process_pool_workers_score_with_weights_and_reverse_keying(self):
+        engine = ScoringEngine({'Visual': {}, 'Auditory': {'normalization': 'range'}},
+                               [{'style': 'Visual', 'weight': 2}, {'style': 'Visual', 'reverse': True},
+                                {'style': 'Auditory', 'weight': 1.5}])
+        with open(self.path('in.jsonl'), 'w') as f:
+            for i in range(10):
+                f.write(json.dumps({'respondent_id': i, 'answers': [i % 5 + 1, 2, 4]}) + '\n')
+
+        score_file(self.path('in.jsonl'), self.path('out.jsonl'), engine, chunk_size=3, workers=2)
+
+        with open(self.path('out.jsonl')) as f:
+            records = [json.loads(line) for line in f]
+        expected = engine.score([5, 2, 4])
+        self.assertEqual(records[4]['scores'], expected.scores)
+        self.assertEqual(records[4]['percentages'], {'Visual': 93.3, 'Auditory': 75.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
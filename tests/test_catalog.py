@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from catalog import CatalogManager, CatalogSnapshot
+
+CATALOG_V1 = [
+    {"style_name": "Visual", "questions": ["Q1V", "Q2V"], "recommendations": ["R1V"]},
+    {"style_name": "Auditory", "questions": ["Q1A"], "recommendations": ["R1A"]},
+]
+CATALOG_V2 = CATALOG_V1 + [{"style_name": "Kinesthetic", "questions": ["Q1K"], "recommendations": ["R1K"]}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCatalogManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'learning_data.json')
+        self.clock = FakeClock()
+        self.write_catalog(CATALOG_V1, mtime=1)
+        self.manager = CatalogManager(self.path, retain_seconds=60, clock=self.clock)
+        self.manager.reload_if_changed()
+
+    def tearDown(self):
+        self.manager.stop_watcher()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_catalog(self, data, mtime):
+        with open(self.path, 'w') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        os.utime(self.path, (mtime, mtime))
+
+    def test_snapshot_precomputes_derived_structures(self):
+        snapshot = self.manager.current
+        self.assertEqual([q['id'] for q in snapshot.questions], [1, 2, 3])
+        self.assertEqual(snapshot.engine.max_scores, (10, 5))
+        self.assertEqual(json.loads(snapshot.api_body)['version'], snapshot.version)
+        self.assertTrue(snapshot.etag)
+        self.assertFalse(CatalogSnapshot.empty())
+
+    def test_scoring_changes_change_the_version(self):
+        plain = CatalogSnapshot(CATALOG_V1)
+        self.assertEqual(CatalogSnapshot(json.loads(json.dumps(CATALOG_V1))).version, plain.version)
+        reweighted = [dict(CATALOG_V1[0], questions=[{"text": "Q1V", "weight": 2}, "Q2V"]), CATALOG_V1[1]]
+        reversed_ = [dict(CATALOG_V1[0], questions=["Q1V", {"text": "Q2V", "reverse": True}]), CATALOG_V1[1]]
+        renormalized = [CATALOG_V1[0], dict(CATALOG_V1[1], normalization="range")]
+        versions = {plain.version} | {CatalogSnapshot(data).version for data in (reweighted, reversed_, renormalized)}
+        self.assertEqual(len(versions), 4)
+        # Spelling out the defaults is still the plain catalog
+        explicit = [dict(CATALOG_V1[0], normalization="max", questions=[{"text": "Q1V", "weight": 1}, "Q2V"]),
+                    CATALOG_V1[1]]
+        self.assertEqual(CatalogSnapshot(explicit).version, plain.version)
+
+    def test_reload_swaps_snapshot_and_retains_previous_version(self):
+        old = self.manager.current
+        self.assertFalse(self.manager.reload_if_changed()) # Unchanged file is not re-parsed
+
+        self.write_catalog(CATALOG_V2, mtime=2)
+        self.assertTrue(self.manager.reload_if_changed())
+
+        self.assertEqual(len(self.manager.current.questions), 4)
+        self.assertIs(self.manager.get(old.version), old)
+        self.assertIs(self.manager.get(self.manager.current.version), self.manager.current)
+
+    def test_retained_snapshot_expires_when_unused(self):
+        old_version = self.manager.current.version
+        self.write_catalog(CATALOG_V2, mtime=2)
+        self.manager.reload_if_changed()
+
+        self.clock.now += 30
+        self.assertIsNotNone(self.manager.get(old_version)) # Used by a session: retention is extended
+        self.clock.now += 61
+        self.assertIsNone(self.manager.get(old_version))
+        self.assertEqual(self.manager.retained_versions, [])
+
+    def test_broken_file_keeps_current_snapshot(self):
+        current = self.manager.current
+        self.write_catalog('[{"style_name": ', mtime=3)
+        self.assertFalse(self.manager.reload_if_changed())
+        self.assertIs(self.manager.current, current)
+
+    def test_invalid_scoring_settings_keep_current_snapshot(self):
+        current = self.manager.current
+        bad_weight = [dict(CATALOG_V1[0], questions=[{"text": "Q1V", "weight": -2}, "Q2V"]), CATALOG_V1[1]]
+        zero_weight = [dict(CATALOG_V1[0], questions=[{"text": "Q1V", "weight": 0}, "Q2V"]), CATALOG_V1[1]]
+        bad_normalization = [CATALOG_V1[0], dict(CATALOG_V1[1], normalization="rnage")]
+        for mtime, data in enumerate((bad_weight, zero_weight, bad_normalization), start=3):
+            self.write_catalog(data, mtime=mtime)
+            with self.assertLogs(level='ERROR'):
+                self.assertFalse(self.manager.reload_if_changed())
+            self.assertIs(self.manager.current, current)
+
+    def test_reload_listeners_are_notified(self):
+        swaps = []
+        self.manager.add_reload_listener(lambda old, new: swaps.append((old.version, new.version)))
+        old_version = self.manager.current.version
+        self.write_catalog(CATALOG_V2, mtime=2)
+        self.manager.reload_if_changed()
+        self.assertEqual(swaps, [(old_version, self.manager.current.version)])
+
+
+if __name__ == '__main__':
+    unittest.main()
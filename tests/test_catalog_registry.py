@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from catalog import compile_catalog
+from catalog_registry import CatalogRegistry
+from export_jobs import ExportJobs
+from main import app as flask_app
+from warehouse import ResultsWarehouse
+
+
+def catalog(style, *questions):
+    return [{
+        "style_name": style,
+        "category": "Test",
+        "description": f"{style} learners.",
+        "questions": list(questions),
+        "recommendations": [f"{style} tip"]
+    }]
+
+
+class TestCatalogRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.write('lincoln', 'en', catalog('Visual', 'I like charts.', 'I draw diagrams.'))
+        self.write('lincoln', 'es', catalog('Visual', 'Me gustan los gráficos.', 'Dibujo diagramas.'))
+        self.write('riverside', 'en', catalog('Auditory', 'I like podcasts.'))
+        self.registry = CatalogRegistry(self.root, max_entries=2, tenant_domain='assess.example.com')
+        self.registry_patcher = patch('main.catalog_registry', self.registry)
+        self.registry_patcher.start()
+        flask_app.config['TESTING'] = True
+        self.client = flask_app.test_client()
+
+    def tearDown(self):
+        self.registry_patcher.stop()
+        shutil.rmtree(self.root)
+
+    def write(self, tenant, locale, data):
+        os.makedirs(os.path.join(self.root, tenant), exist_ok=True)
+        path = os.path.join(self.root, tenant, f'{locale}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        return path
+
+    def test_path_prefix_selects_the_tenant_and_links_keep_it(self):
+        response = self.client.get('/t/lincoln/es/assessment')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.headers['Location'].endswith('/t/lincoln/es/assessment/1'))
+
+        page = self.client.get('/t/lincoln/es/assessment/1')
+        self.assertIn('Me gustan los gráficos.', page.get_data(as_text=True))
+        self.assertIn('action="/t/lincoln/es/assessment/1"', page.get_data(as_text=True))
+
+        self.client.post('/t/lincoln/es/assessment/1', data={'score': '5'})
+        response = self.client.post('/t/lincoln/es/assessment/2', data={'score': '4'})
+        self.assertTrue(response.headers['Location'].endswith('/t/lincoln/es/results'))
+        self.assertIn(b'Visual', self.client.get('/t/lincoln/es/results').data)
+
+    def test_tenant_from_header_or_subdomain_and_locale_from_accept_language(self):
+        body = self.client.get('/api/v1/catalog', headers={'X-Tenant': 'riverside'}).get_json()
+        self.assertEqual(body['questions'][0]['text'], 'I like podcasts.')
+
+        response = self.client.get('/api/v1/catalog', base_url='http://lincoln.assess.example.com',
+                                   headers={'Accept-Language': 'es-MX,es;q=0.9,en;q=0.5'})
+        self.assertEqual(response.get_json()['questions'][0]['text'], 'Me gustan los gráficos.')
+        for header in ('X-Tenant', 'X-Locale', 'Accept-Language'):
+            self.assertIn(header, response.headers['Vary'])
+
+        # Unknown locale falls back to the default one
+        body = self.client.get('/api/v1/catalog?lang=fr', headers={'X-Tenant': 'lincoln'}).get_json()
+        self.assertEqual(body['questions'][0]['text'], 'I like charts.')
+
+    def test_no_tenant_uses_the_default_catalog(self):
+        body = self.client.get('/api/v1/catalog').get_json()
+        self.assertEqual(body['version'], main.catalog_manager.current.version)
+        self.assertEqual(len(self.registry), 0)
+
+    def test_unknown_or_malformed_tenants_are_not_found(self):
+        self.assertEqual(self.client.get('/t/nobody/assessment').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/catalog', headers={'X-Tenant': '../lincoln'}).status_code, 404)
+        with patch('main.catalog_registry', CatalogRegistry(None)):
+            self.assertEqual(self.client.get('/t/lincoln/assessment').status_code, 404)
+            self.assertEqual(self.client.get('/api/v1/catalog', headers={'X-Tenant': 'lincoln'}).status_code, 200)
+
+    def test_cohorts_are_scoped_by_tenant(self):
+        warehouse = ResultsWarehouse(os.path.join(self.root, 'results.db'), flush_interval=0.01)
+        jobs = ExportJobs(os.path.join(self.root, 'exports'))
+        with patch('main.results_warehouse', warehouse), patch('main.cohort_exports', jobs):
+            # Both schools call their class 'class-a'
+            for tenant, answers in (('lincoln', [5, 4]), ('lincoln', [3, 3]), ('riverside', [2])):
+                client = flask_app.test_client()
+                client.get(f'/t/{tenant}/assessment?cohort=class-a')
+                version = self.registry.manager(tenant, 'en').current.version
+                client.post(f'/t/{tenant}/assessment/submit', json={'version': version, 'answers': answers})
+            warehouse.flush()
+
+            self.assertEqual(self.client.get('/t/lincoln/api/v1/cohorts').get_json()['cohorts'], {'class-a': 2})
+            riverside = {'X-Tenant': 'riverside'}
+            self.assertEqual(self.client.get('/api/v1/cohorts', headers=riverside).get_json()['cohorts'], {'class-a': 1})
+            self.assertEqual(self.client.get('/api/v1/cohorts').get_json()['cohorts'], {})
+            primary = self.client.get('/api/v1/cohorts/class-a/primary-styles', headers=riverside).get_json()
+            self.assertEqual(primary['primary_styles'], {'Auditory': 1})
+            distributions = self.client.get('/t/lincoln/api/v1/cohorts/class-a/score-distributions').get_json()
+            self.assertEqual(distributions['distributions'], {'Visual': {'6': 1, '9': 1}})
+
+            job = self.client.post('/t/riverside/api/v1/cohorts/class-a/exports?format=jsonl').get_json()
+            jobs.flush()
+            self.assertEqual(self.client.get(f"/t/lincoln/api/v1/exports/{job['id']}").status_code, 404)
+            download = self.client.get(self.client.get(job['status_url']).get_json()['download_url'])
+            lines = [json.loads(line) for line in download.get_data(as_text=True).splitlines()]
+            download.close()
+            self.assertEqual(lines[0]['scores'], {'Auditory': 2})
+            self.assertEqual(lines[0]['recommendations'], {'Auditory': ['Auditory tip']})
+            self.assertEqual(lines[-1]['summary'], {'respondents': 1, 'primary_styles': {'Auditory': 1}})
+
+    def test_least_recently_used_catalogs_are_evicted(self):
+        first = self.registry.manager('lincoln', 'en')
+        self.registry.manager('lincoln', 'es')
+        self.assertIs(self.registry.manager('lincoln', 'en'), first)
+        self.registry.manager('riverside', 'en')  # Evicts lincoln/es, the least recently used
+        self.assertEqual(len(self.registry), 2)
+        self.assertEqual((self.registry.hits, self.registry.misses, self.registry.evictions), (1, 3, 1))
+        self.assertIs(self.registry.manager('lincoln', 'en'), first)
+
+    def test_compiled_catalogs_are_found_and_new_locales_picked_up(self):
+        path = self.write('riverside', 'de', catalog('Auditory', 'Ich höre gern Podcasts.'))
+        compile_catalog(path)
+        os.remove(path)
+        self.assertEqual(self.registry.pick_locale('riverside', ['de-AT']), 'de')
+        self.assertEqual(self.registry.manager('riverside', 'de').current.questions[0]['text'], 'Ich höre gern Podcasts.')
+
+    def test_loaded_tenant_catalogs_reload_on_change(self):
+        manager = self.registry.manager('riverside', 'en')
+        old_version = manager.current.version
+        path = self.write('riverside', 'en', catalog('Auditory', 'I like podcasts.', 'I read aloud.'))
+        os.utime(path, ns=(manager.current.mtime + 10**9, manager.current.mtime + 10**9))
+        self.registry.reload_changed()
+        self.assertEqual(len(manager.current.questions), 2)
+        self.assertIn(old_version, self.registry.live_versions())
+
+
+if __name__ == '__main__':
+    unittest.main()
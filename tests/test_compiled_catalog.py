@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from catalog import CatalogSnapshot, compile_catalog, validate_catalog
+from compiled_catalog import CompiledCatalogError, read_compiled
+from main import app as flask_app
+
+CATALOG = [
+    {
+        "style_name": "Visual",
+        "category": "Sensory",
+        "description": "Learns by seeing. Liest gern Diagramme.",
+        "questions": ["I like charts.", {"text": "Farben helfen mir.", "weight": 2.5, "reverse": True}],
+        "recommendations": ["Mind maps", "Shared tip"]
+    },
+    {
+        "style_name": "Auditory",
+        "category": "Sensory",
+        "description": "Learns by hearing.",
+        "questions": ["I like podcasts."],
+        "recommendations": ["Shared tip"],
+        "normalization": "range"
+    },
+    {
+        "style_name": "Empty",
+        "category": "Other",
+        "description": "No questions yet.",
+        "questions": [],
+        "recommendations": []
+    }
+]
+
+
+class TestCompiledCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.tmp_dir, 'learning_data.json')
+        self.compiled_path = os.path.join(self.tmp_dir, 'learning_data.catalog')
+        self.write_json(CATALOG)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_json(self, data):
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def test_compiled_snapshot_matches_the_json_snapshot(self):
+        output_path, compiled_from = compile_catalog(self.json_path)
+        self.assertEqual(output_path, self.compiled_path)
+        from_json = CatalogSnapshot.from_json_file(self.json_path)
+        loaded = CatalogSnapshot.from_file(self.json_path)
+
+        self.assertIsNone(loaded.data)  # Came from the compiled file
+        self.assertEqual(compiled_from.version, from_json.version)
+        for attribute in ('learning_styles', 'questions', 'version', 'etag', 'api_body', 'mtime'):
+            self.assertEqual(getattr(loaded, attribute), getattr(from_json, attribute), attribute)
+        self.assertEqual(loaded.source, self.json_path)
+        self.assertEqual(loaded.engine.score([5, 5, 1]).primary_styles, ['Visual'])
+        self.assertEqual(loaded.engine.slopes, (1, -2.5, 1))
+        self.assertEqual(loaded.engine.normalizations, ('max', 'range', 'max'))
+
+    def test_stale_compiled_file_falls_back_to_json(self):
+        compile_catalog(self.json_path)
+        edited = json.loads(json.dumps(CATALOG))
+        edited[1]['questions'].append("I talk things through.")
+        self.write_json(edited)
+        with self.assertLogs('catalog', level='WARNING'):
+            loaded = CatalogSnapshot.from_file(self.json_path)
+        self.assertIsNotNone(loaded.data)
+        self.assertEqual(len(loaded.questions), 4)
+
+    def test_corrupt_compiled_file_falls_back_to_json(self):
+        compile_catalog(self.json_path)
+        with open(self.compiled_path, 'r+b') as f:
+            f.seek(-3, os.SEEK_END)
+            f.write(b'xyz')
+        with self.assertRaises(CompiledCatalogError):
+            read_compiled(self.compiled_path)
+        with self.assertLogs('catalog', level='ERROR'):
+            loaded = CatalogSnapshot.from_file(self.json_path)
+        self.assertIsNotNone(loaded.data)
+        self.assertEqual(len(loaded.questions), 3)
+
+    def test_compiled_file_can_be_loaded_directly_or_without_the_json(self):
+        compile_catalog(self.json_path)
+        direct = CatalogSnapshot.from_file(self.compiled_path)
+        self.assertEqual(direct.mtime, os.stat(self.compiled_path).st_mtime_ns)  # What the watcher polls
+        os.remove(self.json_path)
+        self.assertEqual(len(CatalogSnapshot.from_file(self.json_path).questions), 3)
+
+    def test_truncated_or_foreign_files_are_rejected(self):
+        compile_catalog(self.json_path)
+        with open(self.compiled_path, 'rb') as f:
+            content = f.read()
+        for broken in (content[:-1], b'{"not": "compiled"}' + content[19:], b''):
+            with open(self.compiled_path, 'wb') as f:
+                f.write(broken)
+            with self.assertRaises(CompiledCatalogError):
+                read_compiled(self.compiled_path)
+
+    def test_validation_rejects_malformed_catalogs(self):
+        for data in ([], {'style_name': 'x'}, [{'questions': ['q']}],
+                     [{'style_name': 'A', 'questions': ['q']}, {'style_name': 'A', 'questions': ['r']}],
+                     [{'style_name': 'A', 'questions': 'q'}],
+                     [{'style_name': 'A', 'questions': ['']}],
+                     [{'style_name': 'A', 'questions': []}],
+                     [{'style_name': 'A', 'questions': [{'text': 'q', 'weight': 0}]}],
+                     [{'style_name': 'A', 'questions': [{'text': 'q', 'weight': True}]}],
+                     [{'style_name': 'A', 'questions': [{'text': 'q', 'reverse': 'yes'}]}],
+                     [{'style_name': 'A', 'questions': [{'text': 'q', 'weigth': 2}]}],
+                     [{'style_name': 'A', 'questions': ['q'], 'normalization': 'z-score'}]):
+            with self.assertRaises(ValueError, msg=data):
+                validate_catalog(data)
+        validate_catalog(CATALOG)
+
+    def test_cli_compiles_and_reports_invalid_catalogs(self):
+        runner = flask_app.test_cli_runner()
+        result = runner.invoke(args=['compile-catalog', self.json_path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Compiled 3 questions', result.output)
+        self.assertTrue(os.path.exists(self.compiled_path))
+
+        self.write_json([{'style_name': 'A', 'questions': ['bad\x00text']}])
+        result = runner.invoke(args=['compile-catalog', self.json_path])
+        self.assertNotEqual(result.exit_code, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
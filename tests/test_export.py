@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import os
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import export
+
+LEARNING_STYLES = {
+    'Visual': {'category': 'Sensory', 'description': 'Learns by <seeing>.', 'recommendations': ['Use diagrams']},
+    'Auditory': {'category': 'Sensory', 'description': 'Learns by hearing.', 'recommendations': []},
+}
+RESULT = {'scores': {'Visual': 20, 'Auditory': 10}, 'percentages': {'Visual': 80.0, 'Auditory': 80.0},
+          'max_scores': {'Visual': 25, 'Auditory': 12.5}, 'primary_styles': ['Visual', 'Auditory']}
+
+
+class TestReportExports(unittest.TestCase):
+
+    def test_text_report(self):
+        text = ''.join(export.iter_text(RESULT, LEARNING_STYLES))
+        self.assertIn("- Visual (Sensory): 20/25 (80.0%)\n", text)
+        self.assertIn("- Auditory (Sensory): 10/12.5 (80.0%)\n", text)
+        legacy = ''.join(export.iter_text({'scores': {'Visual': 20}, 'primary_styles': []}, LEARNING_STYLES))
+        self.assertIn("- Visual (Sensory): 20\n", legacy)
+        self.assertIn("For Auditory Learners:\n- No specific recommendations for this style.\n", text)
+
+    def test_html_report_escapes_catalog_text(self):
+        html = ''.join(export.iter_html(RESULT, LEARNING_STYLES))
+        self.assertIn("Learns by &lt;seeing&gt;.", html)
+        self.assertIn("@media print", html)
+
+    def test_every_format_is_a_generator(self):
+        for _, _, generate in export.REPORT_FORMATS.values():
+            chunks = generate(RESULT, LEARNING_STYLES)
+            self.assertIs(iter(chunks), chunks)
+        self.assertEqual(json.loads(''.join(export.iter_json(RESULT, LEARNING_STYLES)))['primary_styles'], ['Visual', 'Auditory'])
+
+
+class TestCohortExports(unittest.TestCase):
+
+    def results(self, count):
+        for i in range(count):
+            yield {'respondent_id': f"r{i}", 'catalog_version': 'v1', 'scores': {'Visual': i, 'Auditory': 5},
+                   'percentages': {'Visual': i * 10.0, 'Auditory': 50.0}, 'primary_styles': ['Auditory'],
+                   'recommendations': {'Auditory': ['Record lectures', 'Discuss ideas']}}
+
+    def test_cohort_csv_streams_one_row_per_respondent_then_a_summary(self):
+        rows = list(csv.reader(io.StringIO(''.join(export.iter_cohort_csv(self.results(3), ['Visual', 'Auditory'])))))
+        self.assertEqual(rows[0], ['respondent_id', 'catalog_version', 'primary_styles', 'Visual', 'Auditory',
+                                   'Visual %', 'Auditory %', 'recommendations'])
+        self.assertEqual(rows[3], ['r2', 'v1', 'Auditory', '2', '5', '20.0', '50.0', 'Record lectures|Discuss ideas'])
+        self.assertEqual(rows[4:], [[], ['primary_style', 'respondents'], ['Auditory', '3']])
+
+    def test_cohort_jsonl_is_lazy(self):
+        chunks = export.iter_cohort_jsonl(self.results(10 ** 9), ['Visual'])
+        self.assertEqual(json.loads(next(chunks))['respondent_id'], 'r0')
+
+    def test_cohort_jsonl_ends_with_a_summary(self):
+        lines = [json.loads(line) for line in export.iter_cohort_jsonl(self.results(2), ['Visual'])]
+        self.assertEqual(lines[1]['percentages'], {'Visual': 10.0})
+        self.assertEqual(lines[-1], {'summary': {'respondents': 2, 'primary_styles': {'Auditory': 2}}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from export_jobs import DONE, FAILED, QUEUED, ExportJobs, ExportQueueFull
+from main import app as flask_app, catalog_manager
+from warehouse import ResultsWarehouse
+
+
+def render_lines(records):
+    for record in records:
+        yield f"{record}\n"
+
+
+class TestExportJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.now = 1000.0
+        self.jobs = ExportJobs(self.tmp_dir, ttl=60, clock=lambda: self.now)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_job_runs_in_the_background_and_keeps_its_artifact(self):
+        job = self.jobs.submit(iter(range(3)), render_lines, 'txt', total=3, cohort='class-a')
+        self.assertEqual(job['status'], QUEUED)
+        self.jobs.flush()
+
+        done = self.jobs.status(job['id'])
+        self.assertEqual((done['status'], done['rows'], done['cohort']), (DONE, 3, 'class-a'))
+        self.assertEqual(done['expires_at'], self.now + 60)
+        with open(self.jobs.artifact_path(done)) as f:
+            self.assertEqual(f.read(), "0\n1\n2\n")
+
+    def test_artifacts_expire_after_the_ttl(self):
+        job = self.jobs.submit(iter(range(3)), render_lines, 'txt')
+        self.jobs.flush()
+        self.now += 61
+        self.assertIsNone(self.jobs.status(job['id']))
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_full_queue_refuses_new_jobs(self):
+        jobs = ExportJobs(self.tmp_dir, workers=1, queue_size=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocked(records):
+            started.set()
+            release.wait()
+            yield 'done'
+
+        jobs.submit([], blocked, 'txt')  # Occupies the only worker
+        started.wait()
+        jobs.submit([], blocked, 'txt')  # Waits in the queue
+        with self.assertRaises(ExportQueueFull):
+            jobs.submit([], blocked, 'txt')
+        self.assertEqual(jobs.rejected, 1)
+        release.set()
+        jobs.flush()
+        self.assertEqual(jobs.completed, 2)
+
+    def test_failed_and_interrupted_jobs_report_failure(self):
+        def broken(records):
+            yield 'partial'
+            raise RuntimeError("disk full")
+
+        with self.assertLogs('export_jobs', level='ERROR'):
+            job = self.jobs.submit([], broken, 'txt')
+            self.jobs.flush()
+        failed = self.jobs.status(job['id'])
+        self.assertEqual(failed['status'], FAILED)
+        self.assertFalse(os.path.exists(self.jobs.artifact_path(failed)))
+
+        orphan = dict(failed, id='x' * 22, status=QUEUED, pid=2 ** 22 + 1, expires_at=None)
+        self.jobs._write_state(orphan)
+        self.assertEqual(self.jobs.status(orphan['id'])['status'], FAILED)
+        self.assertIsNone(self.jobs.status('../../etc/passwd'))
+
+
+class TestCohortExportEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.warehouse = ResultsWarehouse(os.path.join(self.tmp_dir, 'results.db'), flush_interval=0.01)
+        self.jobs = ExportJobs(os.path.join(self.tmp_dir, 'exports'))
+        for i in range(3):
+            self.warehouse.record('class-a', 'v1', {'Visual': i}, ['Visual'], [5, 0, 3])
+        self.warehouse.flush()
+        self.patchers = [patch('main.results_warehouse', self.warehouse), patch('main.cohort_exports', self.jobs)]
+        for patcher in self.patchers:
+            patcher.start()
+        self.client = flask_app.test_client()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_submit_poll_and_download(self):
+        response = self.client.post('/api/v1/cohorts/class-a/exports?format=jsonl')
+        self.assertEqual(response.status_code, 202)
+        job = response.get_json()
+        self.assertEqual(response.headers['Location'], job['status_url'])
+        self.assertEqual(job['total'], 3)
+        self.jobs.flush()
+
+        status = self.client.get(job['status_url']).get_json()
+        self.assertEqual((status['status'], status['rows'], status['progress']), ('done', 3, 1.0))
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertIn('cohort_class-a.jsonl', download.headers['Content-Disposition'])
+        self.assertEqual(len(download.data.splitlines()), 4)  # 3 respondents and the summary
+        download.close()
+
+    def export_lines(self, report_format):
+        job = self.client.post(f'/api/v1/cohorts/class-a/exports?format={report_format}').get_json()
+        self.jobs.flush()
+        download = self.client.get(self.client.get(job['status_url']).get_json()['download_url'])
+        lines = download.get_data(as_text=True).splitlines()
+        download.close()
+        return lines
+
+    def test_rows_use_the_catalog_version_that_scored_them(self):
+        catalog = catalog_manager.current
+        answers = [5] * len(catalog.questions)
+        scored = catalog.engine.score(answers)
+        self.warehouse.record('class-a', catalog.version, scored.scores, scored.primary_styles, answers)
+        self.warehouse.flush()
+
+        lines = [json.loads(line) for line in self.export_lines('jsonl')]
+        unknown_version, current_version, summary = lines[0], lines[3], lines[4]['summary']
+        self.assertEqual(set(unknown_version['percentages'].values()), {None})  # 'v1' is not loaded
+        self.assertEqual(unknown_version['recommendations'], {})
+        self.assertEqual(current_version['percentages'], scored.percentages)
+        self.assertEqual(set(current_version['recommendations']), set(scored.primary_styles))
+        self.assertEqual(summary['respondents'], 4)
+        self.assertEqual(summary['primary_styles']['Visual'], 4)
+
+        csv_lines = self.export_lines('csv')
+        self.assertEqual(csv_lines[-len(summary['primary_styles']) - 1:][0], 'primary_style,respondents')
+
+    def test_bad_requests_and_unknown_jobs(self):
+        self.assertEqual(self.client.post('/api/v1/cohorts/class-a/exports?format=xls').status_code, 400)
+        self.assertEqual(self.client.post('/api/v1/cohorts/bad%20name/exports').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/exports/' + 'x' * 22).status_code, 404)
+
+        with patch.object(self.jobs, 'submit', side_effect=ExportQueueFull()):
+            response = self.client.post('/api/v1/cohorts/class-a/exports')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
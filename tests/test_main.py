@@ -1,4 +1,5 @@
 import os
+import tempfile
 import unittest
 import json
 from unittest.mock import patch, mock_open
@@ -8,7 +9,14 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import the Flask app object and the data loading function from main.py
-from main import app as flask_app, load_and_transform_data, ALL_QUESTIONS as main_ALL_QUESTIONS, learning_styles as main_learning_styles
+import main
+from page_cache import PageCache
+from warehouse import ResultsWarehouse
+from analytics import ResponseAnalytics
+from answer_codec import encode_answers
+from catalog import CatalogManager, CatalogSnapshot
+from rate_limit import RateLimiter, parse_limits
+from main import app as flask_app, load_and_transform_data, result_store
 
 # Global test data
 MOCK_JSON_CONTENT_FOR_TESTS = [
@@ -42,14 +50,13 @@ MOCK_ALL_QUESTIONS_LIST = [
     {'id': 4, 'text': 'Q1K (Kinesthetic Question 1)', 'style': 'Kinesthetic'},
 ]
 
-MOCK_LEARNING_STYLES_DICT = {
-    item['style_name']: {
-        "questions": item["questions"],
-        "recommendations": item["recommendations"],
-        "category": item["category"],
-        "description": item["description"]
-    } for item in MOCK_JSON_CONTENT_FOR_TESTS
-}
+MOCK_CATALOG = CatalogSnapshot(MOCK_JSON_CONTENT_FOR_TESTS)
+
+
+def packed_answers(*scores):
+    """Encodes scores for MOCK_ALL_QUESTIONS_LIST the way the app stores them in the session."""
+    padded = list(scores) + [0] * (len(MOCK_ALL_QUESTIONS_LIST) - len(scores))
+    return encode_answers(padded, MOCK_CATALOG.version)
 
 
 class TestMainAppPaginated(unittest.TestCase):
@@ -62,36 +69,35 @@ class TestMainAppPaginated(unittest.TestCase):
         cls.client = flask_app.test_client()
 
     def setUp(self):
-        # Patch the global variables in main.py for each test
+        # Patch the current catalog snapshot for each test
         # This ensures that each test runs with a known, consistent set of questions and styles
-        self.all_questions_patcher = patch('main.ALL_QUESTIONS', MOCK_ALL_QUESTIONS_LIST)
-        self.learning_styles_patcher = patch('main.learning_styles', MOCK_LEARNING_STYLES_DICT)
-        
-        self.mock_all_questions = self.all_questions_patcher.start()
-        self.mock_learning_styles = self.learning_styles_patcher.start()
+        self.catalog_patcher = patch.object(main.catalog_manager, 'current', MOCK_CATALOG)
+        self.mock_catalog = self.catalog_patcher.start()
 
         # Clear session before each test
         with self.client.session_transaction() as sess:
             sess.clear()
 
     def tearDown(self):
-        self.all_questions_patcher.stop()
-        self.learning_styles_patcher.stop()
+        self.catalog_patcher.stop()
         # Session is cleared in setUp for the next test
 
     # --- Data Loading Tests (Remain similar, but ensure they work with new structure if needed) ---
-    @patch('main.open', new_callable=mock_open, read_data=json.dumps(MOCK_JSON_CONTENT_FOR_TESTS))
-    @patch('main.json.load')
+    @patch('catalog.os.stat')
+    @patch('catalog.open', new_callable=mock_open, read_data=json.dumps(MOCK_JSON_CONTENT_FOR_TESTS))
     @patch('main.app.logger')
-    def test_load_valid_json_and_populates_all_questions(self, mock_logger, mock_json_load, mock_file_open):
-        mock_json_load.return_value = MOCK_JSON_CONTENT_FOR_TESTS
-        load_and_transform_data() # Call the refactored load function
+    def test_load_valid_json_and_populates_all_questions(self, mock_logger, mock_file_open, mock_stat):
+        # Load into a throwaway manager so the app's real catalog is left alone
+        with patch('main.catalog_manager', CatalogManager('learning_data.json')):
+            load_and_transform_data() # Call the refactored load function
+            loaded = main.catalog_manager.current
         
-        # Check global vars from main module after loading (they are re-imported or accessed via main module)
-        self.assertEqual(main_learning_styles["Visual"]["category"], "Sensory")
-        self.assertEqual(len(main_ALL_QUESTIONS), 4) # 2 Visual, 1 Auditory, 1 Kinesthetic
-        self.assertEqual(main_ALL_QUESTIONS[0]['text'], "Q1V (Visual Question 1)")
-        self.assertEqual(main_ALL_QUESTIONS[3]['style'], "Kinesthetic")
+        # Check the snapshot that became current after loading
+        self.assertEqual(loaded.learning_styles["Visual"]["category"], "Sensory")
+        self.assertEqual(len(loaded.questions), 4) # 2 Visual, 1 Auditory, 1 Kinesthetic
+        self.assertEqual(loaded.questions[0]['text'], "Q1V (Visual Question 1)")
+        self.assertEqual(loaded.questions[3]['style'], "Kinesthetic")
+        self.assertEqual(loaded.questions, MOCK_ALL_QUESTIONS_LIST)
         mock_logger.info.assert_any_call(f"Successfully loaded and processed data from learning_data.json. {len(MOCK_JSON_CONTENT_FOR_TESTS[0]['questions'] + MOCK_JSON_CONTENT_FOR_TESTS[1]['questions'] + MOCK_JSON_CONTENT_FOR_TESTS[2]['questions'])} questions loaded.")
 
 
@@ -103,7 +109,7 @@ class TestMainAppPaginated(unittest.TestCase):
         self.assertTrue(response.headers['Location'].endswith('/assessment/1'))
         with self.client.session_transaction() as sess:
             self.assertIn('assessment_answers', sess)
-            self.assertEqual(sess['assessment_answers'], {})
+            self.assertEqual(sess['assessment_answers'], packed_answers())
 
     def test_assessment_get_specific_question(self):
         """Test GET /assessment/<question_num> - valid question."""
@@ -129,38 +135,58 @@ class TestMainAppPaginated(unittest.TestCase):
 
     def test_assessment_get_question_with_existing_answer(self):
         with self.client.session_transaction() as sess:
-            sess['assessment_answers'] = {'1': {'score': 4, 'style': 'Visual'}}
+            sess['assessment_answers'] = packed_answers(4)
         
         response = self.client.get('/assessment/1')
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'value="4" required checked', response.data) # Check if score 4 is checked
 
+    def test_question_page_supports_conditional_get(self):
+        self.client.get('/assessment')
+        response = self.client.get('/assessment/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+
+        response = self.client.get('/assessment/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        # Answering the question changes the page (the radio is checked), so the old ETag no longer matches
+        self.client.post('/assessment/1', data={'score': '2'})
+        response = self.client.get('/assessment/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'value="2" required checked', response.data)
+
+    def test_question_pages_are_served_from_cache(self):
+        with patch('main.page_cache', PageCache(max_entries=8)) as cache:
+            self.client.get('/assessment')
+            self.client.get('/assessment/2')
+            self.client.get('/assessment/2')
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            cache.retain_versions(['some-other-version']) # e.g. after a catalog reload
+            self.assertEqual(len(cache), 0)
+
     def test_assessment_post_answer_first_question(self):
         self.client.get('/assessment') # Initialize session
         response = self.client.post('/assessment/1', data={'score': '5'})
         self.assertEqual(response.status_code, 302) # Redirect to next question
         self.assertTrue(response.headers['Location'].endswith('/assessment/2'))
         with self.client.session_transaction() as sess:
-            self.assertIn('1', sess['assessment_answers'])
-            self.assertEqual(sess['assessment_answers']['1']['score'], 5)
-            self.assertEqual(sess['assessment_answers']['1']['style'], MOCK_ALL_QUESTIONS_LIST[0]['style'])
+            # Only the score is stored; the style is implied by the question's position
+            self.assertEqual(sess['assessment_answers'], packed_answers(5))
 
     def test_assessment_post_answer_last_question(self):
         self.client.get('/assessment') # Initialize session
         # Simulate answering previous questions
         with self.client.session_transaction() as sess:
-            sess['assessment_answers'] = {
-                '1': {'score': 1, 'style': 'Visual'},
-                '2': {'score': 2, 'style': 'Visual'},
-                '3': {'score': 3, 'style': 'Auditory'},
-            }
+            sess['assessment_answers'] = packed_answers(1, 2, 3)
         
         response = self.client.post(f'/assessment/{len(MOCK_ALL_QUESTIONS_LIST)}', data={'score': '4'}) # Post to last q
         self.assertEqual(response.status_code, 302) # Redirect to results
         self.assertTrue(response.headers['Location'].endswith('/results'))
         with self.client.session_transaction() as sess:
-            self.assertIn(str(len(MOCK_ALL_QUESTIONS_LIST)), sess['assessment_answers'])
-            self.assertEqual(sess['assessment_answers'][str(len(MOCK_ALL_QUESTIONS_LIST))]['score'], 4)
+            self.assertEqual(sess['assessment_answers'], packed_answers(1, 2, 3, 4))
 
     def test_assessment_post_invalid_score(self):
         self.client.get('/assessment') # Initialize session
@@ -195,41 +221,288 @@ class TestMainAppPaginated(unittest.TestCase):
         response = self.client.get('/results')
         self.assertEqual(response.status_code, 200)
         self.assertIn(b"Your Learning Style Results", response.data)
+        self.assertIn(b'style="width: 90.0%;"', response.data)
+        self.assertIn(b"9 of 10 points", response.data)
 
         with self.client.session_transaction() as sess:
             # Check that assessment_answers is cleared
             self.assertNotIn('assessment_answers', sess) 
-            # Check that assessment_results (for download) is populated
-            self.assertIn('assessment_results', sess)
-            results_for_download = sess['assessment_results']
+            # Only the opaque result ID travels in the cookie; the result itself is stored server-side
+            self.assertNotIn('assessment_results', sess)
+            self.assertIn('result_id', sess)
+            results_for_download = result_store.get(sess['result_id'])
             
             self.assertEqual(results_for_download['scores']['Visual'], 9)
             self.assertEqual(results_for_download['scores']['Auditory'], 3)
             self.assertEqual(results_for_download['scores']['Kinesthetic'], 5)
-            self.assertCountEqual(results_for_download['primary_styles'], ['Visual'])
-            self.assertIn('Visual', results_for_download['recommendations'])
+            # Compared as percentages: Kinesthetic's 5/5 beats Visual's 9/10
+            self.assertCountEqual(results_for_download['primary_styles'], ['Kinesthetic'])
+            self.assertEqual(results_for_download['percentages']['Visual'], 90.0)
+            self.assertEqual(results_for_download['max_scores']['Visual'], 10)
+
+    def test_download_results_without_stored_result(self):
+        with self.client.session_transaction() as sess:
+            sess['result_id'] = 'unknown-or-expired'
+        response = self.client.get('/download_results')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.headers['Location'].endswith('/'))
+
+    def test_answers_from_another_catalog_version_restart_the_assessment(self):
+        with self.client.session_transaction() as sess:
+            sess['assessment_answers'] = encode_answers([5, 4, 3, 2], 'stale000')
+        response = self.client.get('/assessment/2')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.headers['Location'].endswith('/assessment'))
+        response = self.client.get('/results')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.headers['Location'].endswith('/assessment'))
+
+    def test_in_flight_session_is_scored_against_its_original_catalog(self):
+        self.client.get('/assessment')
+        self.client.post('/assessment/1', data={'score': '5'})
+        self.client.post('/assessment/2', data={'score': '5'})
+
+        # The catalog is reloaded mid-assessment with an extra question
+        reloaded = CatalogSnapshot(MOCK_JSON_CONTENT_FOR_TESTS + [{
+            "style_name": "Reading", "questions": ["Q1R"], "recommendations": ["R1R"],
+            "category": "Text", "description": "Learns by reading."
+        }])
+        with patch.object(main.catalog_manager, '_retained', {MOCK_CATALOG.version: (MOCK_CATALOG, main.catalog_manager._clock())}):
+            main.catalog_manager.current = reloaded
+            response = self.client.get('/assessment/3')
+            self.assertIn(b"Question 3 of 4", response.data) # Still the catalog the session started on
+            self.client.post('/assessment/3', data={'score': '1'})
+            self.client.post('/assessment/4', data={'score': '1'})
+            response = self.client.get('/results')
+            self.assertEqual(response.status_code, 200)
+            with self.client.session_transaction() as sess:
+                stored = result_store.get(sess['result_id'])
+            self.assertEqual(stored['scores'], {'Visual': 10, 'Auditory': 1, 'Kinesthetic': 1})
+
+            # A new attempt starts on the reloaded catalog
+            self.client.get('/assessment')
+            response = self.client.get('/assessment/1')
+            self.assertIn(b"Question 1 of 5", response.data)
 
     def test_results_get_with_no_session_answers(self):
         response = self.client.get('/results')
         self.assertEqual(response.status_code, 302)
         self.assertTrue(response.headers['Location'].endswith('/assessment')) # Redirect to start assessment
 
+    # --- Single-Page Mode ---
+    def test_single_page_lists_every_question(self):
+        response = self.client.get('/assessment/all')
+        self.assertEqual(response.status_code, 200)
+        for question in MOCK_ALL_QUESTIONS_LIST:
+            self.assertIn(question['text'].encode(), response.data)
+        self.assertIn(f'data-catalog-version="{MOCK_CATALOG.version}"'.encode(), response.data)
+
+    def test_single_page_submit_scores_and_shows_results(self):
+        response = self.client.post('/assessment/submit', json={'version': MOCK_CATALOG.version, 'answers': [5, 4, 3, 5]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['redirect'].endswith('/results'))
+        with self.client.session_transaction() as sess:
+            stored = result_store.get(sess['result_id'])
+        self.assertEqual(stored['scores'], {'Visual': 9, 'Auditory': 3, 'Kinesthetic': 5})
+        self.assertEqual(stored['primary_styles'], ['Kinesthetic'])
+
+        response = self.client.get('/results') # Renders the stored result
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Your Learning Style Results", response.data)
+
+    def test_single_page_submit_rejects_incomplete_or_stale_answers(self):
+        response = self.client.post('/assessment/submit', json={'version': MOCK_CATALOG.version, 'answers': [5, 0, 3, 9]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['invalid_questions'], [2, 4])
+
+        response = self.client.post('/assessment/submit', json={'version': MOCK_CATALOG.version, 'answers': [5, 4]})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/assessment/submit', json={'version': 'stale000', 'answers': [5, 4, 3, 5]})
+        self.assertEqual(response.status_code, 409)
+        with self.client.session_transaction() as sess:
+            self.assertNotIn('result_id', sess)
+
+    # --- Adaptive Mode ---
+    def test_adaptive_mode_interleaves_and_stops_once_decided(self):
+        response = self.client.get('/assessment/adaptive')
+        self.assertTrue(response.headers['Location'].endswith('/assessment/adaptive/1'))
+
+        # Interleaved order: Visual 1, Auditory 1, Kinesthetic 1, Visual 2
+        self.assertIn(b"Q1V (Visual Question 1)", self.client.get('/assessment/adaptive/1').data)
+        self.assertIn(b"Question 1 of at most 4", self.client.get('/assessment/adaptive/1').data)
+        self.assertIn(b"Q1A (Auditory Question 1)", self.client.get('/assessment/adaptive/2').data)
+
+        self.assertTrue(self.client.post('/assessment/adaptive/1', data={'score': '2'}).headers['Location'].endswith('/assessment/adaptive/2'))
+        self.assertTrue(self.client.post('/assessment/adaptive/2', data={'score': '1'}).headers['Location'].endswith('/assessment/adaptive/3'))
+        # Visual can no longer be caught (at least 2 + 1 vs at most 1), so the fourth question is skipped
+        response = self.client.post('/assessment/adaptive/3', data={'score': '1'})
+        self.assertTrue(response.headers['Location'].endswith('/results'))
+
+        response = self.client.get('/results')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"after 3 of 4 questions", response.data)
+        stored = result_store.get(self._session_result_id())
+        self.assertEqual(stored['scores'], {'Visual': 4, 'Auditory': 1, 'Kinesthetic': 1}) # Skipped Visual 2 estimated as 2
+        self.assertEqual(stored['primary_styles'], ['Visual'])
+
+    def _session_result_id(self):
+        with self.client.session_transaction() as sess:
+            self.assertNotIn('assessment_mode', sess)
+            return sess['result_id']
+
+    def test_adaptive_step_without_a_run_restarts(self):
+        response = self.client.get('/assessment/adaptive/2')
+        self.assertTrue(response.headers['Location'].endswith('/assessment/adaptive'))
+
+    def test_adaptive_rejects_invalid_scores(self):
+        self.client.get('/assessment/adaptive')
+        response = self.client.post('/assessment/adaptive/1', data={'score': '7'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Please select a valid score", response.data)
+
+    # --- Resumable Attempts ---
+    def test_starting_again_resumes_an_unfinished_attempt(self):
+        self.client.get('/assessment')
+        self.client.post('/assessment/1', data={'score': '5'})
+        self.client.post('/assessment/2', data={'score': '4'})
+        response = self.client.get('/assessment')
+        self.assertTrue(response.headers['Location'].endswith('/assessment/3'))
+        with self.client.session_transaction() as sess:
+            self.assertEqual(sess['assessment_answers'], packed_answers(5, 4))
+
+        response = self.client.get('/assessment?restart=1')
+        self.assertTrue(response.headers['Location'].endswith('/assessment/1'))
+        with self.client.session_transaction() as sess:
+            self.assertEqual(sess['assessment_answers'], packed_answers())
+
+    def test_starting_an_assessment_writes_no_progress_until_the_first_answer(self):
+        with patch.object(main.progress_store, 'save') as save:
+            for path in ('/assessment', '/assessment/adaptive'):
+                fresh_client = flask_app.test_client()
+                self.assertEqual(fresh_client.get(path).status_code, 302)
+                with fresh_client.session_transaction() as sess:
+                    self.assertNotIn('resume_token', sess)
+            save.assert_not_called()
+            self.client.get('/assessment')
+            self.client.post('/assessment/1', data={'score': '5'})
+            save.assert_called_once()
+
+    def test_attempt_can_be_resumed_with_its_code_after_losing_the_session(self):
+        self.client.get('/assessment?cohort=class-7b')
+        self.client.post('/assessment/1', data={'score': '5'})
+        page = self.client.get('/assessment/resume').get_data(as_text=True)
+        with self.client.session_transaction() as sess:
+            token = sess['resume_token']
+            code = f"{token[:5]}-{token[5:]}"
+            self.assertIn(code, page)
+            sess.clear() # The student closed the browser
+
+        response = self.client.post('/assessment/resume', data={'code': code.lower()})
+        self.assertTrue(response.headers['Location'].endswith('/assessment/2'))
+        with self.client.session_transaction() as sess:
+            self.assertEqual(sess['assessment_answers'], packed_answers(5))
+            self.assertEqual(sess['cohort'], 'class-7b')
+
+        for score, question_num in ((4, 2), (3, 3), (2, 4)):
+            self.client.post(f'/assessment/{question_num}', data={'score': str(score)})
+        self.assertEqual(self.client.get('/results').status_code, 200)
+        self.assertIsNone(main.progress_store.load(token)) # Finished attempts can't be resumed
+        self.assertEqual(self.client.get(f'/assessment/resume/{code}').status_code, 404)
+
+    def test_unknown_resume_code_is_reported_on_the_home_page(self):
+        response = self.client.post('/assessment/resume', data={'code': 'not a code'})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(b"doesn&#39;t match an unfinished assessment", response.data)
+
+    # --- Cohort Reporting ---
+    def test_completed_results_are_reported_per_cohort(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            warehouse = ResultsWarehouse(os.path.join(tmp_dir, 'results.db'), flush_interval=0.01)
+            with patch('main.results_warehouse', warehouse):
+                self.client.get('/assessment?cohort=class-7b')
+                for question_num, score in enumerate([5, 4, 3, 5], start=1):
+                    self.client.post(f'/assessment/{question_num}', data={'score': str(score)})
+                self.client.get('/results')
+                self.client.post('/assessment/submit', json={'version': MOCK_CATALOG.version, 'answers': [1, 1, 5, 1]})
+                warehouse.flush()
+
+                self.assertEqual(self.client.get('/api/v1/cohorts').get_json()['cohorts'], {'class-7b': 2})
+                primary = self.client.get('/api/v1/cohorts/class-7b/primary-styles').get_json()
+                self.assertEqual(primary['primary_styles'], {'Auditory': 1, 'Kinesthetic': 1})
+                distributions = self.client.get('/api/v1/cohorts/class-7b/score-distributions').get_json()
+                self.assertEqual(distributions['distributions']['Visual'], {'2': 1, '9': 1})
+                timeline = self.client.get('/api/v1/cohorts/class-7b/timeline?bucket=day').get_json()
+                self.assertEqual(sum(bucket['count'] for bucket in timeline['timeline']), 2)
+                self.assertEqual(self.client.get('/api/v1/cohorts/class-7b/timeline?bucket=week').status_code, 400)
+
+    def test_item_analysis_follows_stored_results(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            warehouse = ResultsWarehouse(os.path.join(tmp_dir, 'results.db'), flush_interval=0.01)
+            with patch('main.results_warehouse', warehouse), patch('main.response_analytics', ResponseAnalytics()):
+                for answers in ([5, 4, 3, 5], [1, 1, 5, 1]):
+                    self.client.post('/assessment/submit', json={'version': MOCK_CATALOG.version, 'answers': answers})
+                warehouse.flush()
+                self.assertEqual(self.client.get('/api/v1/item-analysis').get_json()['responses'], 2)
+
+                self.client.post('/assessment/submit', json={'version': MOCK_CATALOG.version, 'answers': [3, 3, 1, 2]})
+                warehouse.flush()
+                report = self.client.get('/api/v1/item-analysis').get_json()
+                self.assertEqual(report['version'], MOCK_CATALOG.version)
+                self.assertEqual(report['responses'], 3)
+                self.assertAlmostEqual(report['styles']['Visual']['alpha'], 2 * (1 - (4 + 7 / 3) / (37 / 3)))
+                self.assertIsNone(report['styles']['Auditory']['alpha'])  # One item: no reliability estimate
+                self.assertEqual([item['id'] for item in report['items']], [1, 2, 3, 4])
+                self.assertEqual(self.client.get('/api/v1/item-analysis?version=gone').status_code, 409)
+
+    def rate_limited(self, spec):
+        """Turns rate limiting on with the given limits (the test app is otherwise never limited)."""
+        limiter = RateLimiter(parse_limits(spec))
+        return patch.object(main.rate_limit_middleware, 'limiter', limiter), patch.dict(flask_app.config, {'TESTING': False})
+
+    def test_results_are_rate_limited_per_client(self):
+        client = {'REMOTE_ADDR': '203.0.113.9'}
+        limiter_patch, config_patch = self.rate_limited('results=3/1m')
+        with limiter_patch, config_patch:
+            statuses = [self.client.get('/results', environ_base=client).status_code for _ in range(4)]
+            self.assertNotIn(429, statuses[:3])
+            self.assertEqual(statuses[-1], 429)
+            self.assertNotEqual(self.client.get('/results', environ_base={'REMOTE_ADDR': '203.0.113.10'}).status_code, 429)
+            self.assertIn(b'rate_limited_requests_total{endpoint="results"}', self.client.get('/metrics').data)
+
+    def test_clients_behind_a_trusted_proxy_are_limited_by_forwarded_address(self):
+        proxy = {'REMOTE_ADDR': '10.0.0.1'}  # Every request arrives from the load balancer
+
+        def get(client_address):
+            return self.client.get('/results', environ_base=proxy,
+                                   headers={'X-Forwarded-For': client_address}).status_code
+
+        limiter_patch, config_patch = self.rate_limited('results=2/1m')
+        with limiter_patch, config_patch, patch.object(main.proxy_fix, 'x_for', 1):
+            self.assertEqual([get('198.51.100.1') == 429 for _ in range(3)], [False, False, True])
+            self.assertNotEqual(get('198.51.100.2'), 429)  # A different student behind the same proxy
+            # The proxy appends the address it saw, so a client cannot pick its own bucket by sending the header
+            self.assertEqual(get('203.0.113.50, 198.51.100.1'), 429)
+
+        # Without trusted hops the header is ignored
+        limiter_patch, config_patch = self.rate_limited('results=2/1m')
+        with limiter_patch, config_patch:
+            self.assertEqual([get(f"198.51.100.{i}") == 429 for i in range(3)], [False, False, True])
+
     # --- Edge Case: No Questions Loaded ---
-    @patch('main.ALL_QUESTIONS', []) # Simulate no questions loaded
-    @patch('main.learning_styles', {})
+    @patch.object(main.catalog_manager, 'current', CatalogSnapshot.empty()) # Simulate no questions loaded
     def test_assessment_start_no_questions_loaded(self):
         response = self.client.get('/assessment')
         self.assertEqual(response.status_code, 200) # Renders assessment page with error
         self.assertIn(b"Assessment data is unavailable.", response.data)
 
-    @patch('main.ALL_QUESTIONS', [])
-    @patch('main.learning_styles', {})
+    @patch.object(main.catalog_manager, 'current', CatalogSnapshot.empty())
     def test_results_no_questions_or_styles_loaded(self):
         # Simulate trying to go to results when no data was ever loaded
         # This might happen if user bookmarks /results and json fails to load
         with self.client.session_transaction() as sess:
             # Put some dummy answers, but learning_styles will be empty
-            sess['assessment_answers'] = {'1': {'score': 5, 'style': 'NonExistentStyle'}}
+            sess['assessment_answers'] = packed_answers(5)
         
         response = self.client.get('/results')
         self.assertEqual(response.status_code, 500) # Error because learning_styles is empty
@@ -253,9 +526,31 @@ class TestMainAppPaginated(unittest.TestCase):
         self.assertEqual(response_download.mimetype, 'text/plain')
         content = response_download.data.decode('utf-8')
         self.assertIn("Visual: Learns by seeing.", content)
-        self.assertIn("Visual (Sensory): 9/25", content) # 5+4
-        self.assertIn("Auditory (Sensory): 2/25", content)
-        self.assertIn("Kinesthetic (Physical): 1/25", content)
+        self.assertIn("Visual (Sensory): 9/10 (90.0%)", content) # 5+4 out of two questions
+        self.assertIn("Auditory (Sensory): 2/5 (40.0%)", content)
+        self.assertIn("Kinesthetic (Physical): 1/5 (20.0%)", content)
+        self.assertIn("For Visual Learners:\n- R1V\n- R2V", content)
+
+    def test_download_results_in_other_formats(self):
+        with self.client.session_transaction() as sess:
+            sess['result_id'] = result_store.put({'scores': {'Visual': 9, 'Auditory': 3, 'Kinesthetic': 5},
+                                                  'percentages': {'Visual': 90.0, 'Auditory': 60.0, 'Kinesthetic': 100.0},
+                                                  'max_scores': {'Visual': 10, 'Auditory': 5, 'Kinesthetic': 5},
+                                                  'primary_styles': ['Visual']})
+
+        response = self.client.get('/download_results?format=csv')
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('learning_style_results.csv', response.headers['Content-Disposition'])
+        self.assertIn('Visual,Sensory,9,10,90.0,yes', response.data.decode('utf-8'))
+
+        response = self.client.get('/download_results?format=json')
+        self.assertEqual(json.loads(response.data)['recommendations'], {'Visual': ['R1V', 'R2V']})
+
+        response = self.client.get('/download_results?format=html')
+        self.assertEqual(response.mimetype, 'text/html')
+        self.assertIn(b'<td>Visual</td>', response.data)
+
+        self.assertEqual(self.client.get('/download_results?format=exe').status_code, 400)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+import os
+import threading
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import app as flask_app
+from metrics import REDIRECT_LOOP_HOPS, MetricsRegistry
+
+
+def sample(text, series):
+    """Returns the value of one exposition line, e.g. sample(text, 'x_total{a="b"}'), or 0 if absent."""
+    for line in text.splitlines():
+        name, _, value = line.rpartition(' ')
+        if name == series:
+            return float(value)
+    return 0
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_counter_and_histogram_exposition(self):
+        registry = MetricsRegistry()
+        requests = registry.counter('requests_total', 'Requests.', ('route',))
+        latency = registry.histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0))
+        requests.inc('a')
+        requests.inc('a', amount=2)
+        latency.observe(0.05, 'a')
+        latency.observe(0.5, 'a')
+        latency.observe(3.0, 'a')
+
+        text = registry.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertEqual(sample(text, 'requests_total{route="a"}'), 3)
+        self.assertEqual(sample(text, 'latency_seconds_bucket{route="a",le="0.1"}'), 1)
+        self.assertEqual(sample(text, 'latency_seconds_bucket{route="a",le="1.0"}'), 2)
+        self.assertEqual(sample(text, 'latency_seconds_bucket{route="a",le="+Inf"}'), 3)
+        self.assertEqual(sample(text, 'latency_seconds_count{route="a"}'), 3)
+        self.assertAlmostEqual(sample(text, 'latency_seconds_sum{route="a"}'), 3.55)
+
+    def test_shards_of_finished_threads_are_kept(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('work_total', 'Work.')
+        threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(100)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc()
+        self.assertEqual(sample(registry.render(), 'work_total'), 801)
+        self.assertEqual(sample(registry.render(), 'work_total'), 801)  # Retired shards are folded in only once
+
+    def test_finished_threads_are_retired_without_a_scrape(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('work_total', 'Work.')
+        for _ in range(50):  # One short-lived thread per connection, and nothing scraping
+            thread = threading.Thread(target=counter.inc)
+            thread.start()
+            thread.join()
+        self.assertLessEqual(len(registry._shards), 2)
+        self.assertEqual(sample(registry.render(), 'work_total'), 50)
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter('odd_total', 'Odd.', ('value',)).inc('say "hi"\n')
+        self.assertIn('odd_total{value="say \\"hi\\"\\n"} 1', registry.render())
+
+
+class TestAppMetrics(unittest.TestCase):
+
+    def setUp(self):
+        flask_app.config['TESTING'] = True
+        self.client = flask_app.test_client()
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        return response.get_data(as_text=True)
+
+    def test_requests_templates_and_session_are_measured(self):
+        before = self.scrape()
+        self.client.get('/assessment')
+        self.client.get('/assessment/1')
+        after = self.scrape()
+
+        series = 'http_requests_total{endpoint="assessment",method="GET",status="200"}'
+        self.assertEqual(sample(after, series) - sample(before, series), 1)
+        self.assertGreater(sample(after, 'http_request_duration_seconds_count{endpoint="assessment",method="GET"}'), 0)
+        self.assertIn('template_render_seconds_count{template="assessment.html"}', after)
+        self.assertGreater(sample(after, 'session_serialization_seconds_count{operation="open"}'), 0)
+        self.assertGreater(sample(after, 'session_cookie_bytes_count{direction="set"}'), 0)
+        self.assertIn('page_cache_hits_total', after)
+
+    def test_invalid_scores_are_counted(self):
+        series = 'assessment_invalid_scores_total{mode="paginated"}'
+        before = sample(self.scrape(), series)
+        self.client.get('/assessment')
+        self.client.post('/assessment/1', data={'score': '9'})
+        self.assertEqual(sample(self.scrape(), series) - before, 1)
+
+    def test_redirect_loop_is_counted_once_and_reset_by_a_page(self):
+        series = 'redirect_loops_total{endpoint="results"}'
+        before = sample(self.scrape(), series)
+        for _ in range(REDIRECT_LOOP_HOPS + 2):
+            self.assertEqual(self.client.get('/results').status_code, 302)  # No answers: bounces to /assessment
+        self.assertEqual(sample(self.scrape(), series) - before, 1)
+        for _ in range(REDIRECT_LOOP_HOPS):  # The scrape was a page, so this is a new chain
+            self.client.get('/results')
+        self.assertEqual(sample(self.scrape(), series) - before, 2)
+
+    def test_redirects_set_no_cookie_for_cookieless_visitors(self):
+        client = flask_app.test_client(use_cookies=False)
+        for _ in range(REDIRECT_LOOP_HOPS + 1):
+            response = client.get('/download_results')
+            self.assertEqual(response.status_code, 302)
+            self.assertNotIn('Set-Cookie', response.headers)
+
+    def test_revalidated_pages_leave_the_session_alone(self):
+        series = 'redirect_loops_total{endpoint="assessment"}'
+        before = sample(self.scrape(), series)
+        self.client.get('/assessment')
+        etag = self.client.get('/assessment/1').headers['ETag']
+        for _ in range(REDIRECT_LOOP_HOPS + 1):
+            response = self.client.get('/assessment/1', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual(sample(self.scrape(), series), before)
+
+    def test_stateless_api_still_leaves_the_session_alone(self):
+        response = self.client.get('/api/v1/catalog')
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertNotIn('Cookie', response.headers.get('Vary', ''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from page_cache import PageCache
+
+
+class TestPageCache(unittest.TestCase):
+
+    def test_renders_once_per_key(self):
+        cache = PageCache(max_entries=4)
+        renders = []
+        render = lambda: renders.append(1) or 'page'
+        first = cache.get_or_render(('v1', 1, None), render, last_modified=0)
+        second = cache.get_or_render(('v1', 1, None), render, last_modified=0)
+        self.assertIs(first, second)
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(first.body, b'page')
+
+    def test_least_recently_used_page_is_evicted(self):
+        cache = PageCache(max_entries=2)
+        cache.get_or_render(('v1', 1, None), lambda: 'one', 0)
+        cache.get_or_render(('v1', 2, None), lambda: 'two', 0)
+        cache.get_or_render(('v1', 1, None), lambda: 'unused', 0)
+        cache.get_or_render(('v1', 3, None), lambda: 'three', 0)
+        self.assertEqual(cache.get_or_render(('v1', 2, None), lambda: 'two again', 0).body, b'two again')
+
+    def test_etag_depends_on_body(self):
+        cache = PageCache()
+        a = cache.get_or_render(('v1', 1, None), lambda: 'a', 0)
+        b = cache.get_or_render(('v1', 1, 3), lambda: 'b', 0)
+        self.assertNotEqual(a.etag, b.etag)
+
+    def test_disabled_cache_always_renders(self):
+        cache = PageCache(max_entries=0)
+        cache.get_or_render(('v1', 1, None), lambda: 'a', 0)
+        self.assertEqual(cache.get_or_render(('v1', 1, None), lambda: 'b', 0).body, b'b')
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from process_local import ProcessThreads, ThreadConnections
+
+
+class TestProcessLocal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_each_thread_gets_its_own_connection(self):
+        connections = ThreadConnections(os.path.join(self.tmp_dir, 'a.db'), pragmas=("PRAGMA synchronous=NORMAL",))
+        conn = connections.get()
+        self.assertIs(connections.get(), conn)
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(connections.get()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], conn)
+
+    def test_threads_start_once_and_restart_when_dead(self):
+        calls = []
+        stop = threading.Event()
+
+        def start(forked):
+            calls.append(forked)
+            thread = threading.Thread(target=stop.wait, daemon=True)
+            thread.start()
+            return [thread]
+
+        threads = ProcessThreads(start)
+        self.assertFalse(threads.started)
+        threads.ensure()
+        threads.ensure()
+        self.assertEqual(calls, [False])
+        self.assertTrue(threads.started)
+
+        stop.set()
+        threads._threads[0].join()
+        threads.ensure()  # The thread died, so it is started again
+        self.assertEqual(calls, [False, False])
+
+        kept = ProcessThreads(start, restart_dead=False)
+        kept.ensure()
+        kept._threads[0].join()
+        kept.ensure()
+        self.assertEqual(calls, [False, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from progress_store import ProgressStore, format_token, new_resume_token, normalize_token
+
+
+class TestProgressStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'progress.db')
+        self.now = 1000.0
+        # A long flush interval keeps the background writer out of the way; tests flush explicitly
+        self.store = ProgressStore(self.path, flush_interval=3600, max_pending=3, ttl=60, clock=lambda: self.now)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_a_burst_of_answers_is_one_write(self):
+        for digits in ('5000', '5400', '5430'):
+            self.store.save('AAAAABBBBB', f'v1:{digits}', cohort='class-a')
+        self.assertEqual(self.store.load('AAAAABBBBB')['answers'], 'v1:5430')  # Served from memory
+        self.assertEqual(len(self.store), 0)
+        self.store.flush()
+        self.assertEqual((self.store.saves, self.store.writes), (3, 1))
+
+        # A new instance (e.g. after a worker restart) reads it back from disk
+        restarted = ProgressStore(self.path, clock=lambda: self.now)
+        self.assertEqual(restarted.load('AAAAABBBBB'), {'answers': 'v1:5430', 'mode': None, 'cohort': 'class-a',
+                                                        'updated_at': 1000.0})
+
+    def test_pending_attempts_are_bounded(self):
+        for i in range(7):
+            self.store.save(f'TOKEN{i:05d}', 'v1:1')
+        self.assertLess(self.store.pending, 3)
+        self.assertGreaterEqual(len(self.store), 6)
+
+    def test_deleted_and_abandoned_attempts_go_away(self):
+        self.store.save('AAAAABBBBB', 'v1:5')
+        self.store.save('CCCCCDDDDD', 'v1:3')
+        self.store.flush()
+        self.store.delete('AAAAABBBBB')
+        self.assertIsNone(self.store.load('AAAAABBBBB'))
+        self.store.flush()
+
+        self.now += 61
+        self.assertIsNone(self.store.load('CCCCCDDDDD'))
+        self.assertEqual(self.store.compact(), 1)
+        self.assertEqual(len(self.store), 0)
+
+    def test_tokens_are_short_and_forgiving_to_type(self):
+        token = new_resume_token()
+        self.assertEqual(normalize_token(format_token(token).lower()), token)
+        self.assertEqual(normalize_token(' abcde fghjk '), 'ABCDEFGHJK')
+        for bad in (None, '', 'ABCDE-FGHJ', 'ABCDE-FGHJ0', 'ABCDE-FGHJK-M'):
+            self.assertIsNone(normalize_token(bad))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, render_template_string
+
+from rate_limit import (DEFAULT_LIMITS, TOO_MANY_REQUESTS_BODY, MemoryBuckets, RateLimit, RateLimiter,
+                        RateLimitMiddleware, SQLiteBuckets, parse_limits)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestParseLimits(unittest.TestCase):
+
+    def test_specs_override_and_remove_defaults(self):
+        defaults = parse_limits(DEFAULT_LIMITS)
+        self.assertEqual(defaults['results'], RateLimit(600, 60.0))
+        limits = parse_limits('results=5/10s, api_score=off, page=100/1m, other=3/0.5', defaults)
+        self.assertEqual(limits['results'], RateLimit(5, 10.0))
+        self.assertEqual(limits['page'], RateLimit(100, 60.0))
+        self.assertEqual(limits['other'], RateLimit(3, 0.5))
+        self.assertNotIn('api_score', limits)
+        self.assertEqual(parse_limits('off', defaults), {})
+        self.assertEqual(parse_limits(None, defaults), defaults)
+        self.assertEqual(parse_limits('on', defaults), defaults)
+        self.assertEqual(parse_limits('on, results=5/10s', defaults)['results'], RateLimit(5, 10.0))
+
+    def test_malformed_specs_are_rejected(self):
+        for spec in ('results', 'results=5', 'results=five/10s', 'results=0/10s', 'results=5/0s', '=5/10s'):
+            with self.assertRaises(ValueError, msg=spec):
+                parse_limits(spec)
+
+
+class TestTokenBuckets(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check_bucket(self, store):
+        limiter = RateLimiter({'results': RateLimit(3, 30)}, store=store, clock=self.clock)
+        self.assertEqual([limiter.retry_after('results', '203.0.113.1') for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(limiter.retry_after('results', '203.0.113.1'), 10.0)  # One token per 10 seconds
+        self.assertEqual(limiter.retry_after('results', '203.0.113.2'), 0)  # Other clients have their own bucket
+        self.assertEqual(limiter.retry_after('index', '203.0.113.1'), 0)  # Unlimited endpoint
+
+        self.clock.now += 10
+        self.assertEqual(limiter.retry_after('results', '203.0.113.1'), 0)
+        self.assertGreater(limiter.retry_after('results', '203.0.113.1'), 0)
+
+    def test_memory_buckets(self):
+        self.check_bucket(MemoryBuckets(shards=4))
+
+    def test_sqlite_buckets_are_shared_between_instances(self):
+        path = os.path.join(self.tmp_dir, 'limits.db')
+        self.check_bucket(SQLiteBuckets(path))
+        other_worker = RateLimiter({'results': RateLimit(3, 30)}, store=SQLiteBuckets(path), clock=self.clock)
+        self.assertGreater(other_worker.retry_after('results', '203.0.113.1'), 0)
+
+    def test_memory_stays_bounded(self):
+        store = MemoryBuckets(shards=2, max_entries=20)
+        for i in range(200):
+            store.acquire(f"results|client-{i}", 1.0, 10.0, self.clock.now)
+        self.assertLessEqual(len(store), 20)
+        self.assertGreaterEqual(store.evicted, 180)
+
+
+class TestRateLimitMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.rendered = 0
+
+        @self.app.route('/results')
+        def results():
+            self.rendered += 1
+            return render_template_string("Results")
+
+        @self.app.route('/')
+        def index():
+            return "Home"
+
+        self.rejected = []
+        self.enabled = True
+        self.limiter = RateLimiter({'results': RateLimit(2, 60)}, clock=FakeClock())
+        self.app.wsgi_app = RateLimitMiddleware(self.app.wsgi_app, self.app.url_map, self.limiter,
+                                                enabled=lambda: self.enabled, on_reject=self.rejected.append)
+        self.client = self.app.test_client()
+
+    def test_over_limit_requests_get_a_prebuilt_429(self):
+        self.assertEqual([self.client.get('/results').status_code for _ in range(2)], [200, 200])
+        response = self.client.get('/results')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.data, TOO_MANY_REQUESTS_BODY)
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual(self.rendered, 2)  # The refused request never reached the view
+        self.assertEqual(self.rejected, ['results'])
+
+        # Other routes, unknown URLs and other clients are unaffected
+        self.assertEqual(self.client.get('/').status_code, 200)
+        self.assertEqual(self.client.get('/missing').status_code, 404)
+        self.assertEqual(self.client.get('/results', environ_base={'REMOTE_ADDR': '198.51.100.7'}).status_code, 200)
+
+    def test_disabled_limiter_passes_everything_through(self):
+        self.enabled = False
+        self.assertEqual({self.client.get('/results').status_code for _ in range(5)}, {200})
+
+
+if __name__ == '__main__':
+    unittest.main()
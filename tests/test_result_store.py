@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from result_store import InMemoryResultStore, SQLiteResultStore, create_result_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestInMemoryResultStore(unittest.TestCase):
+
+    def test_put_and_get_round_trip(self):
+        store = InMemoryResultStore()
+        result_id = store.put({'scores': {'Visual': 9}})
+        self.assertEqual(store.get(result_id), {'scores': {'Visual': 9}})
+        self.assertIsNone(store.get('missing'))
+        self.assertIsNone(store.get(None))
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        store = InMemoryResultStore(ttl_seconds=10, clock=clock)
+        result_id = store.put({'scores': {}})
+        clock.now += 11
+        self.assertIsNone(store.get(result_id))
+        self.assertEqual(len(store), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        store = InMemoryResultStore(max_entries=2)
+        first = store.put({'n': 1})
+        second = store.put({'n': 2})
+        store.get(first)  # first is now the most recently used
+        store.put({'n': 3})
+        self.assertIsNotNone(store.get(first))
+        self.assertIsNone(store.get(second))
+
+
+class TestSQLiteResultStore(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.db_path)
+
+    def test_results_are_shared_between_store_instances(self):
+        result_id = SQLiteResultStore(self.db_path).put({'primary_styles': ['Visual']})
+        self.assertEqual(SQLiteResultStore(self.db_path).get(result_id), {'primary_styles': ['Visual']})
+
+    def test_expired_results_are_not_returned(self):
+        clock = FakeClock()
+        store = SQLiteResultStore(self.db_path, ttl_seconds=5, clock=clock)
+        result_id = store.put({'scores': {}})
+        clock.now += 6
+        self.assertIsNone(store.get(result_id))
+
+    def test_factory_selects_backend_from_url(self):
+        self.assertIsInstance(create_result_store('memory://'), InMemoryResultStore)
+        self.assertIsInstance(create_result_store(f'sqlite:///{self.db_path}'), SQLiteResultStore)
+        with self.assertRaises(ValueError):
+            create_result_store('redis://localhost')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scoring import ScoringEngine
+
+LEARNING_STYLES = {'Visual': {}, 'Auditory': {}, 'Kinesthetic': {}}
+QUESTIONS = [
+    {'id': 1, 'text': 'Q1V', 'style': 'Visual'},
+    {'id': 2, 'text': 'Q2V', 'style': 'Visual'},
+    {'id': 3, 'text': 'Q1A', 'style': 'Auditory'},
+    {'id': 4, 'text': 'Q1K', 'style': 'Kinesthetic'},
+]
+
+
+class TestScoringEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = ScoringEngine(LEARNING_STYLES, QUESTIONS)
+
+    def test_index_and_max_scores_are_precomputed(self):
+        self.assertEqual(self.engine.question_styles, (0, 0, 1, 2))
+        self.assertEqual(self.engine.max_scores, (10, 5, 5))
+
+    def test_score_returns_totals_percentages_and_primary_styles(self):
+        result = self.engine.score([5, 4, 3, 5])
+        self.assertEqual(result.scores, {'Visual': 9, 'Auditory': 3, 'Kinesthetic': 5})
+        self.assertEqual(result.percentages, {'Visual': 90.0, 'Auditory': 60.0, 'Kinesthetic': 100.0})
+        # Styles are compared on percentages, so one question at 5/5 beats two at 9/10
+        self.assertEqual(result.primary_styles, ['Kinesthetic'])
+        self.assertEqual(self.engine.score([5, 5, 3, 4]).primary_styles, ['Visual'])
+
+    def test_ties_and_unanswered_questions(self):
+        self.assertEqual(self.engine.score([3, 3, 3, 3]).primary_styles, ['Visual', 'Auditory', 'Kinesthetic'])
+        self.assertEqual(self.engine.score([3, 0, 3, 3]).primary_styles, ['Auditory', 'Kinesthetic'])
+        self.assertEqual(self.engine.score([0, 0, 0, 0]).primary_styles, [])
+
+    def test_score_batch_matches_single_scoring(self):
+        vectors = [[5, 4, 3, 5], [1, 1, 5, 2], [0, 0, 0, 0]]
+        self.assertEqual(list(self.engine.score_batch(vectors)), [self.engine.score(v) for v in vectors])
+
+    def test_precomputed_percentages_match_computed_ones(self):
+        engine = ScoringEngine({'Visual': {}, 'Auditory': {'normalization': 'range'}},
+                               [{'style': 'Visual', 'weight': 3}, {'style': 'Visual', 'reverse': True},
+                                {'style': 'Auditory'}, {'style': 'Auditory', 'weight': 2}])
+        self.assertIsNotNone(engine._percent_tables)
+        for totals in ([0, 0], [7, 3], [20, 15], [13, 11]):
+            percentages = engine.normalized(totals)
+            self.assertEqual(engine._build_result(totals).percentages,
+                             {'Visual': round(percentages[0], 1), 'Auditory': round(percentages[1], 1)})
+        # Totals outside the tables (answers above MAX_SCORE) fall back to computing them
+        self.assertEqual(engine._build_result([40, 15]).percentages, {'Visual': 200.0, 'Auditory': 100.0})
+
+    def test_weights_reverse_keying_and_normalization(self):
+        learning_styles = {'Visual': {}, 'Auditory': {'normalization': 'range'}}
+        questions = [
+            {'style': 'Visual', 'weight': 2},
+            {'style': 'Visual', 'reverse': True},
+            {'style': 'Auditory', 'weight': 0.5, 'reverse': True},
+            {'style': 'Auditory', 'weight': 1.5},
+        ]
+        engine = ScoringEngine(learning_styles, questions)
+        self.assertEqual(engine.slopes, (2, -1, -0.5, 1.5))
+        self.assertEqual(engine.offsets, (0, 6, 3.0, 0))
+        self.assertEqual((engine.max_scores, engine.min_scores), ((15, 10.0), (3, 2.0)))
+
+        result = engine.score([4, 1, 5, 2])
+        # Visual: 2*4 + (6-1) = 13 of 15; Auditory: 0.5*(6-5) + 1.5*2 = 3.5, (3.5-2)/(10-2) on the range scale
+        self.assertEqual(result.scores, {'Visual': 13, 'Auditory': 3.5})
+        self.assertEqual(result.percentages, {'Visual': 86.7, 'Auditory': 18.8})
+        self.assertEqual(result.primary_styles, ['Visual'])
+        # An unanswered reverse-keyed question adds nothing
+        self.assertEqual(engine.score([4, 0, 0, 2]).scores, {'Visual': 8, 'Auditory': 3.0})
+        self.assertEqual(list(engine.score_batch([[4, 1, 5, 2]])), [result])
+
+    def test_range_normalization_never_goes_below_zero(self):
+        engine = ScoringEngine({'A': {'normalization': 'range'}}, [{'style': 'A'}] * 3)
+        # Unanswered questions count 0, under the all-1s floor of 3
+        self.assertEqual(engine.score([1, 0, 1]).percentages, {'A': 0.0})
+        self.assertEqual(engine.score([0, 0, 0]), ({'A': 0}, {'A': 0.0}, []))
+        self.assertEqual(engine.score([5, 0, 5]).percentages, {'A': 58.3})
+
+    def test_wrong_vector_length_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.engine.score([5, 4])
+        with self.assertRaises(ValueError):
+            list(self.engine.score_batch([[5, 4, 3, 5], [1]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from main import app as flask_app
+from serve import InFlightRequests
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def streaming_app(release):
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain'), ('Connection', 'keep-alive')])
+        yield b'first'
+        release.wait(5)
+        yield b'second'
+    return app
+
+
+class TestInFlightRequests(unittest.TestCase):
+
+    def test_counts_a_request_until_its_response_is_closed(self):
+        release = threading.Event()
+        tracked = InFlightRequests(streaming_app(release), threading.Event())
+        response = tracked({}, lambda status, headers, exc_info=None: None)
+        self.assertEqual(len(tracked), 1)
+        self.assertFalse(tracked.wait_idle(0.01))
+        release.set()
+        self.assertEqual(b''.join(response), b'firstsecond')
+        response.close()
+        self.assertEqual(len(tracked), 0)
+        self.assertTrue(tracked.wait_idle(0.01))
+
+    def test_draining_responses_close_the_connection(self):
+        draining = threading.Event()
+        draining.set()
+        seen = {}
+        tracked = InFlightRequests(streaming_app(threading.Event()), draining)
+        response = tracked({}, lambda status, headers, exc_info=None: seen.update(headers=headers))
+        next(iter(response))
+        response.close()
+        self.assertEqual([value for name, value in seen['headers'] if name == 'Connection'], ['close'])
+
+
+class TestHealthChecks(unittest.TestCase):
+
+    def setUp(self):
+        flask_app.config['TESTING'] = True
+        self.client = flask_app.test_client()
+
+    def tearDown(self):
+        main.draining.clear()
+
+    def test_healthz_and_readyz(self):
+        self.assertEqual(self.client.get('/healthz').get_json()['status'], 'ok')
+        ready = self.client.get('/readyz')
+        self.assertEqual(ready.status_code, 200)
+        self.assertEqual(ready.get_json()['catalog_version'], main.catalog_manager.current.version)
+
+    def test_readyz_fails_while_draining(self):
+        main.draining.set()
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['status'], 'draining')
+        self.assertEqual(self.client.get('/healthz').status_code, 200)
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), "pre-fork serving needs os.fork")
+class TestPreForkServer(unittest.TestCase):
+
+    def get_json(self, port, path):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    def test_workers_serve_the_shared_socket_and_stop_on_sigterm(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = dict(os.environ,
+                       RESULT_STORE_URL=f"sqlite:///{os.path.join(tmp_dir, 'store.db')}",
+                       RESULTS_WAREHOUSE_PATH=os.path.join(tmp_dir, 'warehouse.db'),
+                       CATALOG_WATCH_INTERVAL='0')
+            server = subprocess.Popen([sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port), '--workers', '2'],
+                                      cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                deadline = time.monotonic() + 15
+                while True:
+                    try:
+                        status, body = self.get_json(port, '/readyz')
+                        break
+                    except OSError:
+                        self.assertLess(time.monotonic(), deadline, "server did not start")
+                        time.sleep(0.1)
+                self.assertEqual(status, 200)
+                pids = {self.get_json(port, '/healthz')[1]['pid'] for _ in range(20)}
+                self.assertNotIn(server.pid, pids)  # Requests are served by the forked workers
+            finally:
+                server.send_signal(signal.SIGTERM)
+                exit_code = server.wait(timeout=15)
+        self.assertEqual(exit_code, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
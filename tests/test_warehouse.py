@@ -0,0 +1,111 @@
+import os
+import queue
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from warehouse import DEFAULT_COHORT, ResultsWarehouse
+
+DAY = 24 * 3600
+
+
+class TestResultsWarehouse(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.warehouse = ResultsWarehouse(os.path.join(self.tmp_dir, 'results.db'), flush_interval=0.01)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def record(self, cohort, scores, primary_styles, recorded_at):
+        self.warehouse.record(cohort, 'v1', scores, primary_styles, [5, 0, 3], recorded_at=recorded_at)
+
+    def test_rollups_are_maintained_incrementally(self):
+        start = 10 * DAY
+        self.record('class-a', {'Visual': 9, 'Auditory': 3}, ['Visual'], start + 60)
+        self.record('class-a', {'Visual': 9, 'Auditory': 9}, ['Visual', 'Auditory'], start + 2 * 3600)
+        self.record('class-b', {'Visual': 1, 'Auditory': 5}, ['Auditory'], start + DAY + 5)
+        self.warehouse.flush()
+
+        self.assertEqual(self.warehouse.cohorts(), {'class-a': 2, 'class-b': 1})
+        self.assertEqual(self.warehouse.score_distributions('class-a'), {'Auditory': {3: 1, 9: 1}, 'Visual': {9: 2}})
+        self.assertEqual(self.warehouse.primary_style_counts('class-a'), {'Visual': 2, 'Auditory': 1})
+        self.assertEqual(self.warehouse.timeline('class-a'), [(start, 1), (start + 2 * 3600, 1)])
+        self.assertEqual(self.warehouse.timeline('class-a', bucket='day'), [(start, 2)])
+
+        # A later batch adds to the existing rollup rows
+        self.record('class-a', {'Visual': 9, 'Auditory': 1}, ['Visual'], start + 3 * 3600)
+        self.warehouse.flush()
+        self.assertEqual(self.warehouse.score_distributions('class-a')['Visual'], {9: 3})
+
+    def test_raw_results_are_kept_and_streamed_in_order(self):
+        for i in range(5):
+            self.record('class-a', {'Visual': i}, [], 1000 + i)
+        self.warehouse.flush()
+        results = list(self.warehouse.iter_results('class-a', batch_size=2))
+        self.assertEqual([r['scores']['Visual'] for r in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[0]['answers'], [5, 0, 3])
+
+    def test_invalid_cohort_falls_back_to_default(self):
+        self.record('not a valid cohort!', {'Visual': 1}, ['Visual'], 1000)
+        self.record(None, {'Visual': 1}, ['Visual'], 1000)
+        self.warehouse.flush()
+        self.assertEqual(self.warehouse.cohorts(), {DEFAULT_COHORT: 2})
+
+    def test_tenants_sharing_a_cohort_name_are_kept_apart(self):
+        self.warehouse.record('class-a', 'v1', {'Visual': 9}, ['Visual'], [5], recorded_at=1000, tenant='lincoln')
+        self.warehouse.record('class-a', 'v2', {'Auditory': 4}, ['Auditory'], [4], recorded_at=1000, tenant='riverside')
+        self.record('class-a', {'Visual': 1}, [], 1000)  # No tenant
+        self.warehouse.flush()
+
+        self.assertEqual(self.warehouse.cohorts(tenant='lincoln'), {'class-a': 1})
+        self.assertEqual(self.warehouse.cohorts(), {'class-a': 1})
+        self.assertEqual(self.warehouse.score_distributions('class-a', tenant='riverside'), {'Auditory': {4: 1}})
+        self.assertEqual(self.warehouse.primary_style_counts('class-a', tenant='lincoln'), {'Visual': 1})
+        self.assertEqual(self.warehouse.timeline('class-a', tenant='riverside'), [(0, 1)])
+        self.assertEqual([r['catalog_version'] for r in self.warehouse.iter_results('class-a', tenant='riverside')], ['v2'])
+        self.assertEqual(self.warehouse.cohorts(tenant='nobody'), {})
+
+    def test_warehouses_from_before_tenants_are_migrated(self):
+        path = os.path.join(self.tmp_dir, 'old.db')
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE results (id INTEGER PRIMARY KEY, recorded_at REAL NOT NULL, cohort TEXT NOT NULL,
+                catalog_version TEXT NOT NULL, scores TEXT NOT NULL, primary_styles TEXT NOT NULL, answers TEXT NOT NULL);
+            CREATE INDEX results_cohort ON results (cohort, id);
+            CREATE TABLE rollup_style_scores (cohort TEXT NOT NULL, style TEXT NOT NULL, score INTEGER NOT NULL,
+                count INTEGER NOT NULL, PRIMARY KEY (cohort, style, score));
+            CREATE TABLE rollup_primary_styles (cohort TEXT NOT NULL, style TEXT NOT NULL, count INTEGER NOT NULL,
+                PRIMARY KEY (cohort, style));
+            CREATE TABLE rollup_hourly (cohort TEXT NOT NULL, bucket_start INTEGER NOT NULL, count INTEGER NOT NULL,
+                PRIMARY KEY (cohort, bucket_start));
+            INSERT INTO results VALUES (1, 1000, 'class-a', 'v1', '{"Visual": 9}', '["Visual"]', '5');
+            INSERT INTO rollup_style_scores VALUES ('class-a', 'Visual', 9, 1);
+            INSERT INTO rollup_primary_styles VALUES ('class-a', 'Visual', 1);
+            INSERT INTO rollup_hourly VALUES ('class-a', 0, 1);
+        """)
+        conn.close()
+
+        warehouse = ResultsWarehouse(path, flush_interval=0.01)
+        warehouse.record('class-a', 'v1', {'Visual': 9}, ['Visual'], [5], recorded_at=1000)
+        warehouse.flush()
+        self.assertEqual(warehouse.cohorts(), {'class-a': 2})
+        self.assertEqual(warehouse.score_distributions('class-a'), {'Visual': {9: 2}})
+        self.assertEqual(warehouse.primary_style_counts('class-a'), {'Visual': 2})
+        self.assertEqual([r['respondent_id'] for r in warehouse.iter_results('class-a')], [1, 2])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        # Stand in for a writer that has fallen behind: a full queue that nobody drains
+        self.warehouse._ensure_writer = lambda: None
+        self.warehouse._queue = queue.Queue(maxsize=1)
+        self.warehouse._queue.put_nowait(None)
+        self.warehouse.record('class-a', 'v1', {}, [], [])
+        self.assertEqual(self.warehouse.dropped, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+"""Append-only SQLite warehouse of completed results, with rollups for cohort reporting.
+
+Request handlers call record(), which only enqueues. A background writer
+thread drains the queue in batches and, in the same transaction as the
+raw inserts, folds each batch into small rollup tables (score
+distributions, primary-style counts, hourly counts). Aggregate queries
+read the rollups, so their cost does not grow with the number of results.
+
+Results, rollups and the cohort queries are scoped by tenant, so schools
+that happen to use the same cohort name never see each other's results.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from process_local import ProcessThreads, ThreadConnections
+
+DEFAULT_COHORT = 'default'
+DEFAULT_TENANT = ''  # Results taken on the default catalog, by requests that name no tenant
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_QUEUE_SIZE = 10000
+HOUR = 3600
+BUCKET_SECONDS = {'hour': HOUR, 'day': 24 * HOUR}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    tenant TEXT NOT NULL,
+    cohort TEXT NOT NULL,
+    catalog_version TEXT NOT NULL,
+    scores TEXT NOT NULL,
+    primary_styles TEXT NOT NULL,
+    answers TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_tenant_cohort ON results (tenant, cohort, id);
+CREATE INDEX IF NOT EXISTS results_catalog_version ON results (catalog_version, id);
+CREATE TABLE IF NOT EXISTS rollup_style_scores (
+    tenant TEXT NOT NULL, cohort TEXT NOT NULL, style TEXT NOT NULL, score INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, cohort, style, score)
+);
+CREATE TABLE IF NOT EXISTS rollup_primary_styles (
+    tenant TEXT NOT NULL, cohort TEXT NOT NULL, style TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, cohort, style)
+);
+CREATE TABLE IF NOT EXISTS rollup_hourly (
+    tenant TEXT NOT NULL, cohort TEXT NOT NULL, bucket_start INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, cohort, bucket_start)
+);
+"""
+
+ROLLUP_TABLES = ('rollup_style_scores', 'rollup_primary_styles', 'rollup_hourly')
+
+# Warehouses created before results were scoped by tenant: their results and rollups move to DEFAULT_TENANT
+ADD_TENANT = (
+    "BEGIN;"
+    "ALTER TABLE results ADD COLUMN tenant TEXT NOT NULL DEFAULT '';"
+    "DROP INDEX IF EXISTS results_cohort;"
+    + "".join(f"ALTER TABLE {table} RENAME TO {table}_untenanted;" for table in ROLLUP_TABLES)
+    + SCHEMA
+    + "".join(f"INSERT INTO {table} SELECT '', * FROM {table}_untenanted; DROP TABLE {table}_untenanted;"
+              for table in ROLLUP_TABLES)
+    + "COMMIT;"
+)
+
+
+def valid_cohort(name):
+    """Cohort names are short identifiers, e.g. 'class-7b' or 'school_12.2026'."""
+    return (isinstance(name, str) and 0 < len(name) <= 64
+            and all(c.isalnum() or c in '-_.' for c in name))
+
+
+class ResultsWarehouse:
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 queue_size=DEFAULT_QUEUE_SIZE, logger=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.logger = logger or logging.getLogger(__name__)
+        self.dropped = 0
+        self._connections = ThreadConnections(path, timeout=10.0, pragmas=("PRAGMA synchronous=NORMAL",))
+        self._queue = None
+        self._writer = ProcessThreads(self._start_writer)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(results)")]
+        if columns and 'tenant' not in columns:
+            self.logger.info(f"Scoping the results in '{path}' by tenant.")
+            conn.executescript(ADD_TENANT)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def _connect(self):
+        return self._connections.get()
+
+    def _ensure_writer(self):
+        self._writer.ensure()
+
+    def _start_writer(self, forked):
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        writer = threading.Thread(target=self._run_writer, args=(self._queue,), name='results-warehouse-writer',
+                                  daemon=True)
+        writer.start()
+        return [writer]
+
+    def record(self, cohort, catalog_version, scores, primary_styles, answers, recorded_at=None,
+               tenant=DEFAULT_TENANT):
+        """Queues one completed result. Never blocks; drops (and counts) the result if the queue is full."""
+        self._ensure_writer()
+        row = (recorded_at or time.time(), tenant, cohort if valid_cohort(cohort) else DEFAULT_COHORT,
+               catalog_version, scores, primary_styles, answers)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            self.logger.warning(f"Results warehouse queue is full; dropped a result ({self.dropped} dropped so far).")
+
+    def flush(self):
+        """Blocks until every result queued so far has been written."""
+        if self._queue is not None and self._writer.started:
+            self._queue.join()
+
+    def _run_writer(self, work_queue):
+        while True:
+            batch = [work_queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(work_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except sqlite3.Error as e:
+                self.logger.error(f"Failed to write {len(batch)} results to the warehouse: {e}")
+            finally:
+                for _ in batch:
+                    work_queue.task_done()
+
+    def _write_batch(self, batch):
+        style_scores = Counter()
+        primary_counts = Counter()
+        hourly = Counter()
+        rows = []
+        for recorded_at, tenant, cohort, catalog_version, scores, primary_styles, answers in batch:
+            rows.append((recorded_at, tenant, cohort, catalog_version, json.dumps(scores),
+                         json.dumps(primary_styles), ''.join(str(score) for score in answers)))
+            for style, score in scores.items():
+                style_scores[(tenant, cohort, style, score)] += 1
+            for style in primary_styles:
+                primary_counts[(tenant, cohort, style)] += 1
+            hourly[(tenant, cohort, int(recorded_at) // HOUR * HOUR)] += 1
+
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO results (recorded_at, tenant, cohort, catalog_version, scores, primary_styles, answers)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT INTO rollup_style_scores (tenant, cohort, style, score, count) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (tenant, cohort, style, score) DO UPDATE SET count = count + excluded.count",
+                [key + (count,) for key, count in style_scores.items()])
+            conn.executemany(
+                "INSERT INTO rollup_primary_styles (tenant, cohort, style, count) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (tenant, cohort, style) DO UPDATE SET count = count + excluded.count",
+                [key + (count,) for key, count in primary_counts.items()])
+            conn.executemany(
+                "INSERT INTO rollup_hourly (tenant, cohort, bucket_start, count) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (tenant, cohort, bucket_start) DO UPDATE SET count = count + excluded.count",
+                [key + (count,) for key, count in hourly.items()])
+
+    # --- Aggregate queries (served from the rollup tables) ---
+
+    def cohorts(self, tenant=DEFAULT_TENANT):
+        rows = self._connect().execute(
+            "SELECT cohort, SUM(count) FROM rollup_hourly WHERE tenant = ? GROUP BY cohort ORDER BY cohort",
+            (tenant,)).fetchall()
+        return {cohort: total for cohort, total in rows}
+
+    def score_distributions(self, cohort, tenant=DEFAULT_TENANT):
+        """Returns {style: {score: respondents}} for a cohort."""
+        distributions = {}
+        for style, score, count in self._connect().execute(
+                "SELECT style, score, count FROM rollup_style_scores WHERE tenant = ? AND cohort = ?"
+                " ORDER BY style, score", (tenant, cohort)):
+            distributions.setdefault(style, {})[score] = count
+        return distributions
+
+    def primary_style_counts(self, cohort, tenant=DEFAULT_TENANT):
+        rows = self._connect().execute(
+            "SELECT style, count FROM rollup_primary_styles WHERE tenant = ? AND cohort = ?"
+            " ORDER BY count DESC, style", (tenant, cohort))
+        return {style: count for style, count in rows}
+
+    def timeline(self, cohort, bucket='hour', since=None, tenant=DEFAULT_TENANT):
+        """Returns [(bucket_start, results)] for a cohort, in 'hour' or 'day' buckets."""
+        width = BUCKET_SECONDS[bucket]
+        rows = self._connect().execute(
+            "SELECT bucket_start - (bucket_start % ?) AS bucket, SUM(count) FROM rollup_hourly"
+            " WHERE tenant = ? AND cohort = ? AND bucket_start >= ? GROUP BY bucket ORDER BY bucket",
+            (width, tenant, cohort, int(since or 0)))
+        return [(bucket_start, count) for bucket_start, count in rows]
+
+    def iter_results(self, cohort, batch_size=1000, tenant=DEFAULT_TENANT):
+        """Streams a cohort's raw results in insertion order, one page of rows at a time."""
+        last_id = 0
+        while True:
+            rows = self._connect().execute(
+                "SELECT id, recorded_at, catalog_version, scores, primary_styles, answers FROM results"
+                " WHERE tenant = ? AND cohort = ? AND id > ? ORDER BY id LIMIT ?",
+                (tenant, cohort, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row_id, recorded_at, catalog_version, scores, primary_styles, answers in rows:
+                yield {
+                    'respondent_id': row_id,
+                    'recorded_at': recorded_at,
+                    'catalog_version': catalog_version,
+                    'scores': json.loads(scores),
+                    'primary_styles': json.loads(primary_styles),
+                    'answers': [int(digit) for digit in answers]
+                }
+            last_id = rows[-1][0]
+
+    def iter_answers(self, catalog_version, after_id=0, batch_size=1000):
+        """Streams (id, answers) for one catalog version's results recorded after after_id, in insertion order."""
+        while True:
+            rows = self._connect().execute(
+                "SELECT id, answers FROM results WHERE catalog_version = ? AND id > ? ORDER BY id LIMIT ?",
+                (catalog_version, after_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row_id, answers in rows:
+                yield row_id, [int(digit) for digit in answers]
+            after_id = rows[-1][0]